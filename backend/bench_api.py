@@ -0,0 +1,464 @@
+"""
+API 부하 테스트/성능 측정
+
+사용법:
+    python bench_api.py seed --patients 100000          # 로컬 DB 에 벤치마크용 환자/진료/예약 생성
+    python bench_api.py run                              # 기본 시나리오(mixed) 30초, 동시 16
+    python bench_api.py run --scenario search --concurrency 64 --duration 60
+    python bench_api.py compare results/old.json results/new.json
+
+seed
+- 환자번호 PB0000001 부터 순서대로 생성 (기존 데이터와 구분, 같은 --seed 면 같은 데이터)
+- 이미 있는 벤치마크 환자 수부터 이어서 생성 (10만 -> 100만으로 늘릴 때 추가분만 생성)
+- 진료/예약은 환자당 평균 --visits / --appointments 건 (일부 환자에 몰리는 긴 꼬리 분포)
+
+run
+- --concurrency 개 스레드가 응답을 받는 즉시 다음 요청을 보냄 (closed loop)
+- 엔드포인트별 처리량, 평균, p50/p95/p99, 최대 지연과 오류 수를 출력하고 JSON 으로 저장
+  (results/<시각>_<커밋>.json, 커밋 간 비교는 compare)
+- 클라이언트도 Python 스레드이므로 아주 높은 처리량에서는 측정 장비의 CPU 를 함께 확인
+"""
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, date, timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from bulk_insert import insert_many, select_in
+
+BASE_URL = os.getenv('BENCH_BASE_URL', 'http://localhost:8000')
+RESULTS_DIR = "results"
+
+# 벤치마크 데이터 환자번호 접두어 (PB + 7자리, 최대 9,999,999명)
+PATIENT_PREFIX = "PB"
+SEED_CHUNK = 2000
+DOCTORS_PER_DEPARTMENT = 3
+
+SURNAMES = "김이박최정강조윤장임한오서신권황안송류홍"
+SYLLABLES = "민서준지현우도하윤은수영진성연유아예주재원태정혜경승희동건"
+DIAGNOSES = ("급성 상기도염", "위염", "고혈압", "당뇨병 정기검진", "요통", "알레르기성 비염",
+             "편두통", "피부염", "결막염", "골절 후 경과 관찰", "건강검진", "불면증")
+
+# 시나리오별 (엔드포인트 이름, 가중치)
+SCENARIOS = {
+    "mixed": [("search", 30), ("detail", 25), ("patients_list", 10), ("visits_list", 10),
+              ("appointments_list", 10), ("stats", 10), ("create_visit", 3), ("create_appointment", 2)],
+    "search": [("search", 1)],
+    "detail": [("detail", 1)],
+    "list": [("patients_list", 1), ("visits_list", 1), ("appointments_list", 1)],
+    "stats": [("stats", 1)],
+    "create": [("create_visit", 1), ("create_appointment", 1)],
+}
+WRITE_ENDPOINTS = ("create_visit", "create_appointment")
+
+
+# ---------------------------------------------------------------- seed
+
+def _bench_name(rng):
+    # 성씨는 앞쪽일수록 많이 (김/이/박 ...)
+    surname = SURNAMES[min(int(rng.expovariate(0.35)), len(SURNAMES) - 1)]
+    return surname + "".join(rng.choice(SYLLABLES) for _ in range(2))
+
+
+def _history_count(rng, mean):
+    """환자당 기록 수 (지수 분포 - 대부분 적고 일부 환자가 많음)"""
+    if mean <= 0:
+        return 0
+    return int(rng.expovariate(1.0 / mean) + 0.5)
+
+
+def _weekday(day):
+    """토/일이면 다음 월요일 (진료 시간표 기본값은 평일 종일 진료)"""
+    return day + timedelta(days=(7 - day.weekday()) % 7) if day.weekday() >= 5 else day
+
+
+def _slot_time(rng, day):
+    """진료 시간표 기본값 안의 30분 단위 시각"""
+    minute = rng.choice([m for m in range(9 * 60, 18 * 60, 30) if not 12 * 60 <= m < 13 * 60])
+    return datetime.combine(day, datetime.min.time()) + timedelta(minutes=minute)
+
+
+def _bench_rows(index, seed, doctors, args, today):
+    """index 번째 벤치마크 환자와 진료/예약 행 (같은 seed, index 면 항상 같은 결과)"""
+    rng = random.Random(seed * 10_000_019 + index)
+    patient = (
+        f"{PATIENT_PREFIX}{index:07d}",
+        _bench_name(rng),
+        date(1940, 1, 1) + timedelta(days=rng.randrange(365 * 80)),
+        rng.choice("MF"),
+        f"010-{rng.randrange(10000):04d}-{rng.randrange(10000):04d}",
+    )
+    visits = []
+    for _ in range(_history_count(rng, args.visits)):
+        department, doctor = rng.choice(doctors)
+        visit_date = _slot_time(rng, today - timedelta(days=rng.randrange(1, 365 * 3)))
+        visits.append((visit_date, department, doctor, rng.choice(DIAGNOSES), '완료'))
+    appointments = []
+    for _ in range(_history_count(rng, args.appointments)):
+        department, doctor = rng.choice(doctors)
+        offset = rng.randrange(-180, 90)
+        status = '예약' if offset > 0 else rng.choice(('완료', '완료', '완료', '취소'))
+        appointments.append((_slot_time(rng, today + timedelta(days=offset)), department, doctor, status))
+    return patient, visits, appointments
+
+
+def _ensure_doctors(cursor, seed):
+    """진료과마다 벤치마크용 담당의를 등록하고 (진료과, 담당의) 목록 반환"""
+    cursor.execute("SELECT dept_id, dept_name FROM departments WHERE is_active = 1 ORDER BY dept_code")
+    departments = cursor.fetchall()
+    if not departments:
+        raise RuntimeError("진료과가 없습니다 (python migrations.py 로 진료과를 먼저 적재하세요)")
+    rng = random.Random(seed)
+    doctors = [
+        (dept_id, dept_name, _bench_name(rng))
+        for dept_id, dept_name in departments
+        for _ in range(DOCTORS_PER_DEPARTMENT)
+    ]
+    cursor.executemany("INSERT IGNORE INTO doctors (dept_id, name) VALUES (%s, %s)",
+                       [(dept_id, name) for dept_id, _, name in doctors])
+    return [(dept_name, name) for _, dept_name, name in doctors]
+
+
+def _seed_chunk(cursor, start, end, seed, doctors, args, today):
+    """환자 [start, end) 와 그 진료/예약 추가 (한 트랜잭션), (환자, 진료, 예약) 수 반환"""
+    generated = [_bench_rows(index, seed, doctors, args, today) for index in range(start, end)]
+    insert_many(cursor, "INSERT IGNORE INTO patients (patient_no, name, birth_date, gender, phone)", 5,
+                [patient for patient, _, _ in generated])
+    ids = dict(select_in(cursor, "SELECT patient_no, patient_id FROM patients WHERE patient_no IN ",
+                         [patient[0] for patient, _, _ in generated]))
+
+    visits = [(ids[patient[0]], *visit) for patient, rows, _ in generated for visit in rows]
+    appointments = [(ids[patient[0]], *appointment) for patient, _, rows in generated for appointment in rows]
+    if visits:
+        insert_many(cursor, "INSERT INTO visits (patient_id, visit_date, department, doctor_name, diagnosis, status)",
+                    6, visits)
+    if appointments:
+        insert_many(cursor, "INSERT INTO appointments (patient_id, appointment_date, department, doctor_name, status)",
+                    5, appointments)
+    return end - start, len(visits), len(appointments)
+
+
+def seed(args):
+    from database import execute_single_query, run_transaction
+    from migrations import migrate
+    from patient_summary import rebuild as rebuild_summary
+
+    if not 1 <= args.patients <= 9_999_999:
+        print("✗ --patients 는 1 ~ 9,999,999 사이여야 합니다")
+        return 2
+
+    migrate()
+    existing = execute_single_query(
+        "SELECT COUNT(*) AS count FROM patients WHERE patient_no LIKE %s", (PATIENT_PREFIX + "%",)
+    )
+    if existing is None:
+        print("✗ 데이터베이스 연결 실패")
+        return 2
+    start = existing['count'] + 1
+    if start > args.patients:
+        print(f"✓ 이미 벤치마크 환자 {existing['count']:,}명이 있습니다")
+        return 0
+
+    doctors = run_transaction(_ensure_doctors, args.seed)
+    today = date.today()
+    print(f"=== 벤치마크 데이터 생성: 환자 {start:,} ~ {args.patients:,} "
+          f"(환자당 진료 {args.visits}, 예약 {args.appointments}건 평균, seed {args.seed}) ===")
+
+    started = time.perf_counter()
+    totals = [0, 0, 0]
+    for chunk_start in range(start, args.patients + 1, SEED_CHUNK):
+        chunk_end = min(chunk_start + SEED_CHUNK, args.patients + 1)
+        counts = run_transaction(_seed_chunk, chunk_start, chunk_end, args.seed, doctors, args, today)
+        totals = [total + count for total, count in zip(totals, counts)]
+        elapsed = time.perf_counter() - started
+        if (chunk_start - start) // SEED_CHUNK % 25 == 0 or chunk_end > args.patients:
+            print(f"  환자 {chunk_end - 1:,}명까지 ({totals[0] / elapsed:,.0f}명/초, "
+                  f"진료 {totals[1]:,}건, 예약 {totals[2]:,}건)")
+
+    if totals[1]:
+        print(f"✓ 진료 요약 재계산: {rebuild_summary():,}명")
+    print(f"\n✓ 환자 {totals[0]:,}명, 진료 {totals[1]:,}건, 예약 {totals[2]:,}건 "
+          f"({time.perf_counter() - started:.1f}초)")
+    print("실행 중인 서버는 재시작하거나 검색 색인 갱신(SEARCH_INDEX_REFRESH_INTERVAL)을 기다린 뒤 측정하세요")
+    return 0
+
+
+# ---------------------------------------------------------------- run
+
+class Targets:
+    """요청에 쓸 환자 ID, 검색어, 진료과 (API 로 미리 조회)"""
+
+    def __init__(self, patients, departments):
+        self.patients = patients
+        self.departments = departments
+        terms = []
+        for patient in patients:
+            name = patient['name']
+            terms.extend([name[:2], name[1:], patient['patient_no'][:6]])
+        self.search_terms = terms or ["김"]
+
+    @classmethod
+    def load(cls, session, base_url, sample):
+        patients, cursor = [], None
+        while len(patients) < sample:
+            params = {"limit": min(500, sample - len(patients))}
+            if cursor:
+                params["cursor"] = cursor
+            response = session.get(f"{base_url}/api/patients/", params=params, timeout=30)
+            response.raise_for_status()
+            patients.extend(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        response = session.get(f"{base_url}/api/departments/", timeout=30)
+        response.raise_for_status()
+        departments = [(d['dept_name'], d['doctors']) for d in response.json() if d['doctors']]
+        return cls(patients, departments)
+
+
+def _request(session, base_url, endpoint, targets, rng):
+    """endpoint 요청 1건, (HTTP 상태, 응답 바이트) 반환"""
+    if endpoint == "search":
+        response = session.get(f"{base_url}/api/patients/search",
+                               params={"query": rng.choice(targets.search_terms)}, timeout=30)
+    elif endpoint == "detail":
+        response = session.get(f"{base_url}/api/patients/{rng.choice(targets.patients)['patient_id']}", timeout=30)
+    elif endpoint == "patients_list":
+        response = session.get(f"{base_url}/api/patients/", params={"limit": 50}, timeout=30)
+    elif endpoint == "visits_list":
+        start = date.today() - timedelta(days=rng.randrange(365))
+        response = session.get(f"{base_url}/api/visits/",
+                               params={"date_from": start, "date_to": start + timedelta(days=7), "limit": 50},
+                               timeout=30)
+    elif endpoint == "appointments_list":
+        department, _ = rng.choice(targets.departments)
+        response = session.get(f"{base_url}/api/appointments/",
+                               params={"department": department, "date_from": date.today(), "limit": 50},
+                               timeout=30)
+    elif endpoint == "stats":
+        response = session.get(f"{base_url}/api/patients/stats/today", timeout=30)
+    elif endpoint == "create_visit":
+        department, doctors = rng.choice(targets.departments)
+        response = session.post(f"{base_url}/api/visits/", json={
+            "patient_id": rng.choice(targets.patients)['patient_id'],
+            "visit_date": datetime.now().replace(microsecond=0).isoformat(sep=" "),
+            "department": department, "doctor_name": rng.choice(doctors),
+            "diagnosis": rng.choice(DIAGNOSES), "status": "완료",
+        }, timeout=30)
+    elif endpoint == "create_appointment":
+        department, doctors = rng.choice(targets.departments)
+        day = _weekday(date.today() + timedelta(days=rng.randrange(1, 60)))
+        response = session.post(f"{base_url}/api/appointments/", json={
+            "patient_id": rng.choice(targets.patients)['patient_id'],
+            "appointment_date": _slot_time(rng, day).isoformat(sep=" "),
+            "department": department, "doctor_name": rng.choice(doctors),
+        }, timeout=30)
+    else:
+        raise ValueError(f"알 수 없는 엔드포인트: {endpoint}")
+    return response.status_code, len(response.content)
+
+
+def _percentile(values, percent):
+    """정렬된 값의 백분위수 (nearest-rank)"""
+    if not values:
+        return None
+    rank = max(1, math.ceil(len(values) * percent / 100))
+    return values[rank - 1]
+
+
+def summarize_latencies(latencies, errors, statuses, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "statuses": statuses,
+        "rps": round(count / elapsed, 1) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(latencies) / count * 1000, 2) if count else None,
+        **{
+            f"p{percent}_ms": round(_percentile(latencies, percent) * 1000, 2) if count else None
+            for percent in (50, 95, 99)
+        },
+        "max_ms": round(latencies[-1] * 1000, 2) if count else None,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(args):
+    base_url = args.url.rstrip("/")
+    mix = [(name, weight) for name, weight in SCENARIOS[args.scenario]
+           if not (args.read_only and name in WRITE_ENDPOINTS)]
+    if not mix:
+        print("✗ --read-only 로 실행할 엔드포인트가 없습니다")
+        return 2
+    names, weights = zip(*mix)
+
+    session = requests.Session()
+    try:
+        targets = Targets.load(session, base_url, args.sample)
+        stats = session.get(f"{base_url}/api/patients/stats/today", timeout=30).json()
+    except (requests.RequestException, ValueError) as e:
+        print(f"✗ 서버에 연결할 수 없습니다 ({base_url}): {e}")
+        return 2
+    if not targets.patients or not targets.departments:
+        print("✗ 환자 또는 담당의가 없습니다 (python bench_api.py seed 로 데이터를 먼저 생성하세요)")
+        return 2
+
+    print(f"=== {args.scenario} 시나리오: 동시 {args.concurrency}, {args.duration}초 (워밍업 {args.warmup}초) ===")
+    print(f"대상: {base_url}, 환자 {stats.get('total_patients', 0):,}명 (표본 {len(targets.patients):,}명)")
+
+    lock = threading.Lock()
+    results = {name: {"latencies": [], "errors": 0, "statuses": {}} for name in names}
+    started = time.perf_counter()
+    measure_from = started + args.warmup
+    stop_at = measure_from + args.duration
+
+    def worker(number):
+        rng = random.Random(args.seed * 1000 + number)
+        local = requests.Session()
+        local.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        while True:
+            endpoint = rng.choices(names, weights)[0]
+            request_started = time.perf_counter()
+            if request_started >= stop_at:
+                break
+            try:
+                status, _ = _request(local, base_url, endpoint, targets, rng)
+            except requests.RequestException:
+                status = "connection_error"
+            elapsed = time.perf_counter() - request_started
+            if request_started < measure_from:
+                continue
+            with lock:
+                result = results[endpoint]
+                result["statuses"][str(status)] = result["statuses"].get(str(status), 0) + 1
+                # 예약 충돌(409)은 정상 응답으로 보고 그 외 4xx/5xx 와 연결 오류만 오류로 집계
+                if status == "connection_error" or (status >= 400 and status != 409):
+                    result["errors"] += 1
+                else:
+                    result["latencies"].append(elapsed)
+        local.close()
+
+    threads = [threading.Thread(target=worker, args=(number,), daemon=True) for number in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - measure_from
+
+    endpoints = {
+        name: summarize_latencies(result["latencies"], result["errors"], result["statuses"], elapsed)
+        for name, result in results.items()
+    }
+    total = summarize_latencies(
+        [latency for result in results.values() for latency in result["latencies"]],
+        sum(result["errors"] for result in results.values()), {}, elapsed
+    )
+    del total["statuses"]
+
+    print(f"\n{'엔드포인트':<20}{'요청':>8}{'오류':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for name, summary in [*endpoints.items(), ("전체", total)]:
+        print(f"{name:<20}{summary['requests']:>8,}{summary['errors']:>6,}{summary['rps']:>9,.1f}"
+              + "".join(f"{summary[key]:>9,.1f}" if summary[key] is not None else f"{'-':>9}"
+                        for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")))
+
+    commit = _git_commit()
+    report = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "base_url": base_url,
+        "scenario": args.scenario,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "warmup": args.warmup,
+        "read_only": args.read_only,
+        "dataset": {"total_patients": stats.get("total_patients"), "sample_patients": len(targets.patients)},
+        "total": total,
+        "endpoints": endpoints,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d_%H%M%S}_{commit or 'nocommit'}_{args.scenario}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"\n✓ 결과 저장: {output}")
+    return 1 if total["errors"] else 0
+
+
+# ---------------------------------------------------------------- compare
+
+def compare(args):
+    """두 결과 파일의 엔드포인트별 처리량/지연 비교 (두 번째가 새 결과)"""
+    reports = []
+    for path in (args.before, args.after):
+        with open(path, "r", encoding="utf-8") as file:
+            reports.append(json.load(file))
+    before, after = reports
+    print(f"이전: {before.get('commit')} ({before['started_at']}, {before['scenario']}, 동시 {before['concurrency']})")
+    print(f"이후: {after.get('commit')} ({after['started_at']}, {after['scenario']}, 동시 {after['concurrency']})")
+
+    def change(old, new):
+        if not old or new is None:
+            return f"{'-':>8}"
+        return f"{(new - old) / old * 100:>+7.1f}%"
+
+    print(f"\n{'엔드포인트':<20}{'req/s':>10}{'변화':>9}{'p50':>9}{'변화':>9}{'p95':>9}{'변화':>9}{'p99':>9}{'변화':>9}")
+    rows = [(name, before['endpoints'].get(name), summary) for name, summary in after['endpoints'].items()]
+    rows.append(("전체", before['total'], after['total']))
+    for name, old, new in rows:
+        old = old or {}
+        print(f"{name:<20}{new['rps']:>10,.1f}{change(old.get('rps'), new['rps'])}"
+              + "".join(
+                  (f"{new[key]:>9,.1f}" if new[key] is not None else f"{'-':>9}") + change(old.get(key), new[key])
+                  for key in ("p50_ms", "p95_ms", "p99_ms")
+              ))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API 부하 테스트/성능 측정")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="로컬 DB 에 벤치마크 데이터 생성")
+    seed_parser.add_argument("--patients", type=int, default=10000, help="벤치마크 환자 수 (1만 ~ 500만)")
+    seed_parser.add_argument("--visits", type=float, default=5.0, help="환자당 평균 진료 수")
+    seed_parser.add_argument("--appointments", type=float, default=1.0, help="환자당 평균 예약 수")
+    seed_parser.add_argument("--seed", type=int, default=42, help="난수 시드 (같으면 같은 데이터)")
+
+    run_parser = commands.add_parser("run", help="부하를 걸고 엔드포인트별 지연/처리량 측정")
+    run_parser.add_argument("--url", default=BASE_URL, help="API 주소")
+    run_parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed", help="요청 구성")
+    run_parser.add_argument("--concurrency", type=int, default=16, help="동시 요청 수")
+    run_parser.add_argument("--duration", type=float, default=30, help="측정 시간 (초)")
+    run_parser.add_argument("--warmup", type=float, default=5, help="측정 전 워밍업 시간 (초)")
+    run_parser.add_argument("--sample", type=int, default=2000, help="요청에 쓸 환자 표본 수")
+    run_parser.add_argument("--read-only", action="store_true", help="등록 요청 제외")
+    run_parser.add_argument("--seed", type=int, default=42, help="요청 순서 난수 시드")
+    run_parser.add_argument("--output", help="결과 JSON 경로 (기본: results/<시각>_<커밋>_<시나리오>.json)")
+
+    compare_parser = commands.add_parser("compare", help="두 결과 JSON 비교")
+    compare_parser.add_argument("before", help="이전 결과 JSON")
+    compare_parser.add_argument("after", help="새 결과 JSON")
+
+    args = parser.parse_args()
+    return {"seed": seed, "run": run, "compare": compare}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+목록 응답 직렬화 성능 비교 (DB 없이 CPU 만 측정)
+
+사용법:
+    python bench_serialization.py                       # 50, 1000, 10000 행
+    python bench_serialization.py --rows 500 5000 --repeat 20
+
+- 기존: response_model 검증 + 직렬화 (FastAPI serialize_response) 후 JSONResponse
+- 개선: fast_json.rows_response (검증 없이 모델 필드만 골라 orjson 직렬화)
+- 두 방식의 응답 본문이 같은 JSON 인지 함께 확인
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+import fast_json
+from fast_json import rows_response
+from schemas import Visit, Appointment, PatientSearch
+
+ROW_COUNTS = (50, 1000, 10000)
+
+
+def _visit_rows(count):
+    """GET /api/visits 조회 결과와 같은 형태의 행 (JOIN 한 환자 정보 포함)"""
+    base = datetime(2024, 12, 1, 9, 0)
+    return [
+        {
+            "visit_id": i, "patient_id": 1000 + i % 500, "visit_date": base + timedelta(minutes=i),
+            "department": "내과", "doctor_name": "김철수", "diagnosis": "급성 기관지염, 3일 후 재방문",
+            "status": "완료", "created_at": base, "patient_name": "홍길동", "patient_no": f"P2024{i:05d}",
+        }
+        for i in range(count)
+    ]
+
+
+def _appointment_rows(count):
+    base = datetime(2024, 12, 1, 9, 0)
+    return [
+        {
+            "appointment_id": i, "patient_id": 1000 + i % 500, "appointment_date": base + timedelta(minutes=i),
+            "department": "정형외과", "doctor_name": "이영희", "status": "예약", "created_at": base,
+            "patient_name": "홍길동", "patient_no": f"P2024{i:05d}", "phone": "010-1234-5678",
+        }
+        for i in range(count)
+    ]
+
+
+def _search_rows(count):
+    base = datetime(2024, 12, 1, 9, 0)
+    return [
+        {
+            "patient_id": i, "patient_no": f"P2024{i:05d}", "name": "홍길동", "birth_date": base.date(),
+            "gender": "M", "phone": "010-1234-5678", "visit_count": i % 20, "last_visit_date": base,
+        }
+        for i in range(count)
+    ]
+
+
+CASES = [
+    ("Visit", Visit, _visit_rows),
+    ("Appointment", Appointment, _appointment_rows),
+    ("PatientSearch", PatientSearch, _search_rows),
+]
+
+
+async def _pydantic_body(field, rows):
+    content = await serialize_response(field=field, response_content=rows)
+    return JSONResponse(content).body
+
+
+def _measure(func, repeat):
+    """가장 빠른 1회 실행 시간 (초)"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="목록 응답 직렬화 성능 비교")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(ROW_COUNTS), help="행 수 목록")
+    parser.add_argument("--repeat", type=int, default=10, help="반복 횟수 (가장 빠른 값 사용)")
+    args = parser.parse_args()
+
+    print(f"JSON 라이브러리: {'orjson' if fast_json.orjson is not None else 'json (orjson 미설치)'}")
+    print(f"{'모델':<14}{'행 수':>8}{'기존 rows/s':>14}{'개선 rows/s':>14}{'배수':>8}")
+
+    loop = asyncio.new_event_loop()
+    mismatches = 0
+    try:
+        for name, model, make_rows in CASES:
+            field = create_response_field(name=f"Response_{name}", type_=List[model])
+            for count in args.rows:
+                rows = make_rows(count)
+
+                before = loop.run_until_complete(_pydantic_body(field, rows))
+                after = rows_response(rows, model).body
+                if json.loads(before) != json.loads(after):
+                    mismatches += 1
+                    print(f"✗ {name} {count}행: 두 방식의 응답이 다릅니다")
+
+                slow = _measure(lambda: loop.run_until_complete(_pydantic_body(field, rows)), args.repeat)
+                fast = _measure(lambda: rows_response(rows, model).body, args.repeat)
+                print(f"{name:<14}{count:>8,}{count / slow:>14,.0f}{count / fast:>14,.0f}{slow / fast:>7.1f}x")
+    finally:
+        loop.close()
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
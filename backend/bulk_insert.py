@@ -0,0 +1,196 @@
+from datetime import datetime, date
+
+# 요청 1건에 담을 수 있는 최대 행 수
+MAX_BULK_ROWS = 1000
+# INSERT 문 1개에 담는 행 수
+INSERT_CHUNK = 500
+
+
+class RowError(ValueError):
+    """행 단위 검증 오류 (해당 행만 실패 처리)"""
+
+
+def parse_date(value, field, required=False):
+    """YYYY-MM-DD 문자열을 date 로 변환 (빈 값은 None)"""
+    if value in (None, ""):
+        if required:
+            raise RowError(f"{field} 값이 필요합니다")
+        return None
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        raise RowError(f"{field} 형식이 올바르지 않습니다: {value}")
+
+
+def parse_datetime(value, field, required=True):
+    """YYYY-MM-DD HH:MM:SS (또는 ISO 형식) 문자열을 datetime 으로 변환"""
+    if value in (None, ""):
+        if required:
+            raise RowError(f"{field} 값이 필요합니다")
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise RowError(f"{field} 형식이 올바르지 않습니다: {value}")
+
+
+def required_text(row, field, max_length=None):
+    """필수 문자열 필드"""
+    value = optional_text(row, field, max_length)
+    if value is None:
+        raise RowError(f"{field} 값이 필요합니다")
+    return value
+
+
+def optional_text(row, field, max_length=None):
+    """선택 문자열 필드 (빈 값은 None)"""
+    value = row.get(field)
+    if value is None:
+        return None
+    value = str(value).strip()
+    if value == "":
+        return None
+    if max_length is not None and len(value) > max_length:
+        raise RowError(f"{field} 값이 너무 깁니다 (최대 {max_length}자)")
+    return value
+
+
+def patient_no_key(patient_no):
+    """
+    환자번호 비교용 키 (DB 의 대소문자 무시, 끝 공백 무시 비교와 같게)
+    - 요청 값과 DB 가 돌려준 값을 같은 키로 맞출 때 사용
+    """
+    return str(patient_no).rstrip(" ").upper()
+
+
+def patient_values(row):
+    """환자 행 검증 후 (patient_no, name, birth_date, gender, phone) 튜플 반환"""
+    gender = optional_text(row, 'gender')
+    if gender is not None and gender not in ('M', 'F'):
+        raise RowError(f"gender 는 M 또는 F 여야 합니다: {gender}")
+    return (
+        required_text(row, 'patient_no', 20),
+        required_text(row, 'name', 50),
+        parse_date(row.get('birth_date'), 'birth_date'),
+        gender,
+        optional_text(row, 'phone', 15)
+    )
+
+
+def _multi_row_chunks(insert_head, width, rows):
+    """'INSERT ... (열 목록)' 뒤에 VALUES 를 붙인 (SQL, 값 목록, 행 목록) 을 INSERT_CHUNK 행씩 생성"""
+    placeholders = "(" + ", ".join(["%s"] * width) + ")"
+    for start in range(0, len(rows), INSERT_CHUNK):
+        chunk = rows[start:start + INSERT_CHUNK]
+        sql = insert_head + " VALUES " + ", ".join([placeholders] * len(chunk))
+        yield sql, [value for row in chunk for value in row], chunk
+
+
+def insert_rows(cursor, table, id_column, columns, rows):
+    """
+    여러 행을 다중 VALUES INSERT 로 추가하고 부여된 ID 목록 반환
+    - 행 수가 정해진 단일 INSERT 는 첫 ID(lastrowid)부터 auto_increment_increment 간격으로 ID 를 받으므로 그대로 계산
+    - 다른 문장과 ID 가 섞일 수 있는 경우(innodb_autoinc_lock_mode=2 에서 동시 INSERT ... SELECT/LOAD DATA 등)를 대비해
+      계산한 ID 의 행을 다시 읽어 첫 열 값이 넣은 값과 같은지 확인, 다르면 예외 (트랜잭션 롤백)
+    """
+    cursor.execute("SELECT @@auto_increment_increment")
+    step = cursor.fetchall()[0][0]
+    ids = []
+    insert_head = f"INSERT INTO {table} ({', '.join(columns)})"
+    for sql, params, chunk in _multi_row_chunks(insert_head, len(columns), rows):
+        cursor.execute(sql, params)
+        first_id = cursor.lastrowid
+        chunk_ids = list(range(first_id, first_id + len(chunk) * step, step))
+        inserted = dict(select_in(
+            cursor, f"SELECT {id_column}, {columns[0]} FROM {table} WHERE {id_column} IN ", chunk_ids
+        ))
+        if any(inserted.get(row_id) != row[0] for row_id, row in zip(chunk_ids, chunk)):
+            raise RuntimeError(f"{table} 에 부여된 {id_column} 가 연속되지 않아 확인할 수 없습니다 (다시 시도하세요)")
+        ids.extend(chunk_ids)
+    return ids
+
+
+def insert_many(cursor, insert_head, width, rows):
+    """
+    여러 행을 다중 VALUES INSERT 로 추가하고 실제로 추가된 행 수 반환
+    - insert_head 예: 'INSERT IGNORE INTO patients (patient_no, name)'
+    """
+    inserted = 0
+    for sql, params, _ in _multi_row_chunks(insert_head, width, rows):
+        cursor.execute(sql, params)
+        inserted += cursor.rowcount
+    return inserted
+
+
+def select_in(cursor, sql_prefix, values, chunk=1000):
+    """
+    IN 조건 조회를 chunk 단위로 나눠 실행하고 전체 결과 반환
+    - sql_prefix 는 '... WHERE col IN ' 까지의 SQL
+    """
+    values = list(values)
+    rows = []
+    for start in range(0, len(values), chunk):
+        part = values[start:start + chunk]
+        cursor.execute(sql_prefix + "(" + ", ".join(["%s"] * len(part)) + ")", part)
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+def lookup_patients(cursor, rows):
+    """
+    행에 지정된 환자(patient_id 또는 patient_no)를 한 번에 조회
+    - {'id': {patient_id: (patient_id, name, patient_no)}, 'no': {patient_no: (...)}} 반환
+    """
+    patient_ids = set()
+    patient_nos = set()
+    for row in rows:
+        if row.get('patient_id') not in (None, ""):
+            try:
+                patient_ids.add(int(row['patient_id']))
+            except (TypeError, ValueError):
+                pass
+        elif row.get('patient_no'):
+            patient_nos.add(str(row['patient_no']).strip())
+
+    found = {'id': {}, 'no': {}}
+    columns = "SELECT patient_id, name, patient_no FROM patients WHERE "
+    for patient in select_in(cursor, columns + "patient_id IN ", patient_ids):
+        found['id'][patient[0]] = patient
+    for patient in select_in(cursor, columns + "patient_no IN ", patient_nos):
+        found['no'][patient_no_key(patient[2])] = patient
+    return found
+
+
+def patient_for_row(row, patients):
+    """lookup_patients 결과에서 행의 환자 정보를 찾음 (없으면 RowError)"""
+    if row.get('patient_id') not in (None, ""):
+        try:
+            patient = patients['id'].get(int(row['patient_id']))
+        except (TypeError, ValueError):
+            raise RowError(f"patient_id 형식이 올바르지 않습니다: {row['patient_id']}")
+    elif row.get('patient_no'):
+        patient = patients['no'].get(patient_no_key(str(row['patient_no']).strip()))
+    else:
+        raise RowError("patient_id 또는 patient_no 값이 필요합니다")
+
+    if patient is None:
+        raise RowError("존재하지 않는 환자입니다")
+    return patient
+
+
+def summarize(results):
+    """행별 결과 목록을 응답 형식으로 정리"""
+    counts = {"created": 0, "exists": 0, "error": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    return {
+        "total": len(results),
+        "created": counts["created"],
+        "exists": counts["exists"],
+        "failed": counts["error"],
+        "results": results
+    }
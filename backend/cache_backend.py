@@ -0,0 +1,412 @@
+"""
+캐시 저장소 (워커/서버 간 공유)
+
+- CACHE_BACKEND=memory : 프로세스 메모리 LRU (단일 워커, 기본값)
+- CACHE_BACKEND=redis  : Redis 프로토콜 서버 (여러 워커/서버가 같은 캐시와 버전 카운터 공유)
+
+사용법:
+    python cache_backend.py check    # 설정된 저장소에 읽기/쓰기/카운터/잠금 동작 확인
+"""
+import asyncio
+import functools
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory').lower()
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+# 같은 Redis 를 다른 서비스와 함께 쓸 때 키 구분
+CACHE_KEY_PREFIX = os.getenv('CACHE_KEY_PREFIX', 'hospital:')
+CACHE_REDIS_POOL_SIZE = int(os.getenv('CACHE_REDIS_POOL_SIZE', 8))
+CACHE_REDIS_TIMEOUT = float(os.getenv('CACHE_REDIS_TIMEOUT', 1.0))
+# 메모리 저장소 최대 항목 수 (가장 오래 사용하지 않은 항목부터 제거, 버전 카운터는 제외)
+CACHE_MEMORY_SIZE = int(os.getenv('CACHE_MEMORY_SIZE', 1024))
+# 메모리 저장소 최대 버전 카운터 수 (가장 오래 사용하지 않은 카운터부터 제거)
+CACHE_MEMORY_COUNTERS = int(os.getenv('CACHE_MEMORY_COUNTERS', 100000))
+# 캐시 서버 오류 후 다시 시도할 때까지 캐시를 쓰지 않는 시간 (초)
+CACHE_RETRY_INTERVAL = float(os.getenv('CACHE_RETRY_INTERVAL', 30))
+
+# 버전 카운터 키 접두사 (메모리 저장소는 없는 카운터를 이 접두사로 구분)
+VERSION_KEY_PREFIX = "ver:"
+# 제거된 카운터 대신 읽히는 값의 구역 수
+_COUNTER_FLOOR_BUCKETS = 1024
+
+# 값이 일치할 때만 삭제 (다른 워커가 다시 잡은 잠금을 지우지 않도록)
+_DELETE_IF_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class CacheError(Exception):
+    """캐시 서버 연결/응답 오류"""
+    pass
+
+
+def _to_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode("utf-8")
+
+
+class MemoryCache:
+    """
+    프로세스 메모리 LRU 저장소
+    - 값은 bytes, 만료 시간(초) 지정
+    - 버전 카운터(incr)는 항목과 따로 max_counters 개까지 LRU 로 보관
+    - 카운터 값은 저장소 전체에서 한 번씩만 쓰는 일련번호라 같은 값이 다시 나오지 않음
+    - 제거된 카운터는 키 구역별 새 일련번호(floor)로 읽혀 그 키를 쓰는 저장 응답은 모두 오래된 것으로 처리
+    """
+    remote = False
+
+    def __init__(self, max_size=CACHE_MEMORY_SIZE, max_counters=CACHE_MEMORY_COUNTERS):
+        self.max_size = max_size
+        self.max_counters = max_counters
+        self._entries = OrderedDict()   # key -> (value, 만료 시각)
+        self._counters = OrderedDict()  # key -> 일련번호
+        self._sequence = 0
+        self._floors = [0] * _COUNTER_FLOOR_BUCKETS
+        self._evicted_counters = 0
+        self._lock = threading.Lock()
+
+    def _next_sequence(self):
+        self._sequence += 1
+        return self._sequence
+
+    def _get(self, key, now):
+        value = self._counters.get(key)
+        if value is not None:
+            self._counters.move_to_end(key)
+            return _to_bytes(value)
+        if key.startswith(VERSION_KEY_PREFIX):
+            floor = self._floors[hash(key) % _COUNTER_FLOOR_BUCKETS]
+            return _to_bytes(floor) if floor else None
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        if item[1] <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return item[0]
+
+    def _set(self, key, value, ttl):
+        self._entries[key] = (_to_bytes(value), time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            return [self._get(key, now) for key in keys]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._set(key, value, ttl)
+
+    def add(self, key, value, ttl):
+        """키가 없을 때만 저장, 저장했으면 True"""
+        with self._lock:
+            if self._get(key, time.monotonic()) is not None:
+                return False
+            self._set(key, value, ttl)
+            return True
+
+    def delete_if(self, key, value):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] == _to_bytes(value):
+                del self._entries[key]
+
+    def incr_many(self, keys):
+        with self._lock:
+            values = []
+            for key in keys:
+                self._counters[key] = self._next_sequence()
+                self._counters.move_to_end(key)
+                values.append(self._counters[key])
+            while len(self._counters) > self.max_counters:
+                evicted, _ = self._counters.popitem(last=False)
+                self._floors[hash(evicted) % _COUNTER_FLOOR_BUCKETS] = self._next_sequence()
+                self._evicted_counters += 1
+            return values
+
+    def close(self):
+        pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "counters": len(self._counters),
+                "max_counters": self.max_counters,
+                "evicted_counters": self._evicted_counters,
+            }
+
+
+class RedisCache:
+    """
+    Redis 프로토콜(RESP) 저장소 - 추가 패키지 없이 소켓으로 통신
+    - 연결은 최대 pool_size 개까지 재사용
+    - 여러 명령은 한 번에 보내고 응답을 모아 읽음 (파이프라인)
+    """
+    remote = True
+
+    def __init__(self, url=CACHE_REDIS_URL, prefix=CACHE_KEY_PREFIX,
+                 pool_size=CACHE_REDIS_POOL_SIZE, timeout=CACHE_REDIS_TIMEOUT):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = (sock, sock.makefile("rb"))
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            self._send(connection, setup)
+        return connection
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def _release(self, connection):
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(connection)
+                return
+        self._discard(connection)
+
+    def _discard(self, connection):
+        sock, file = connection
+        try:
+            file.close()
+            sock.close()
+        except OSError:
+            pass
+
+    @staticmethod
+    def _encode(command):
+        parts = [b"*%d\r\n" % len(command)]
+        for arg in command:
+            data = _to_bytes(arg)
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    def _read(self, file):
+        line = file.readline()
+        if not line.endswith(b"\r\n"):
+            raise CacheError("캐시 서버 연결이 끊어졌습니다")
+        kind, data = line[:1], line[1:-2]
+        if kind == b"+":
+            return data.decode("utf-8")
+        if kind == b"-":
+            raise CacheError(data.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(data)
+        if kind == b"$":
+            length = int(data)
+            if length < 0:
+                return None
+            return file.read(length + 2)[:-2]
+        if kind == b"*":
+            length = int(data)
+            if length < 0:
+                return None
+            return [self._read(file) for _ in range(length)]
+        raise CacheError(f"알 수 없는 응답: {line[:20]!r}")
+
+    def _send(self, connection, commands):
+        sock, file = connection
+        sock.sendall(b"".join(self._encode(command) for command in commands))
+        return [self._read(file) for _ in commands]
+
+    def _execute(self, *commands):
+        """명령 목록을 파이프라인으로 실행하고 응답 목록 반환 (오류가 난 연결은 버림)"""
+        try:
+            connection = self._acquire()
+        except OSError as e:
+            raise CacheError(f"캐시 서버 연결 실패 ({self.host}:{self.port}): {e}") from e
+        try:
+            replies = self._send(connection, commands)
+        except (OSError, ValueError, CacheError) as e:
+            self._discard(connection)
+            raise CacheError(str(e)) from e
+        self._release(connection)
+        return replies
+
+    def _key(self, key):
+        return self.prefix + key
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        return self._execute(("MGET", *[self._key(key) for key in keys]))[0]
+
+    def set(self, key, value, ttl):
+        self._execute(("SET", self._key(key), value, "PX", max(1, int(ttl * 1000))))
+
+    def add(self, key, value, ttl):
+        return self._execute(("SET", self._key(key), value, "NX", "PX", max(1, int(ttl * 1000))))[0] == "OK"
+
+    def delete_if(self, key, value):
+        self._execute(("EVAL", _DELETE_IF_SCRIPT, 1, self._key(key), value))
+
+    def incr_many(self, keys):
+        return self._execute(*[("INCR", self._key(key)) for key in keys])
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._lock:
+            idle = len(self._idle)
+        return {
+            "backend": "redis",
+            "server": f"{self.host}:{self.port}/{self.db}",
+            "idle_connections": idle,
+        }
+
+
+class Cache:
+    """
+    라우터/미들웨어가 사용하는 비동기 캐시 (저장소는 CACHE_BACKEND 로 선택)
+    - Redis 저장소 호출은 스레드에서 실행해 이벤트 루프를 막지 않음
+    - 캐시 서버 오류 시 CACHE_RETRY_INTERVAL 동안 캐시 없이 동작 (조회는 미적중, 쓰기는 무시)
+    - 반영하지 못한 버전 증가(incr)는 모아 두었다가 복구 후 가장 먼저 다시 반영,
+      반영하기 전에는 저장된 응답을 읽지 않음 (다른 워커가 오래된 응답을 계속 쓰지 않도록)
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._down_until = 0.0
+        self._errors = 0
+        self._pending_incr = set()      # 반영하지 못한 버전 카운터 키 (이벤트 루프 스레드에서만 사용)
+
+    @property
+    def available(self):
+        return time.monotonic() >= self._down_until
+
+    async def _call(self, default, method, *args):
+        if not self.available:
+            return default
+        try:
+            if self.backend.remote:
+                return await asyncio.get_running_loop().run_in_executor(None, functools.partial(method, *args))
+            return method(*args)
+        except CacheError as e:
+            self._errors += 1
+            self._down_until = time.monotonic() + CACHE_RETRY_INTERVAL
+            print(f"캐시 서버 오류 ({CACHE_RETRY_INTERVAL:.0f}초 동안 캐시 사용 안 함): {e}")
+            return default
+
+    async def get_many(self, keys):
+        """키별 값 (bytes, 없으면 None), 밀린 버전 증가를 반영하지 못했으면 모두 None"""
+        if self._pending_incr and not await self.incr_many([]):
+            return [None] * len(keys)
+        return await self._call([None] * len(keys), self.backend.get_many, list(keys))
+
+    async def set(self, key, value, ttl):
+        await self._call(None, self.backend.set, key, value, ttl)
+
+    async def incr_many(self, keys):
+        """버전 증가 (밀린 증가와 함께), 반영했으면 True - 실패한 키는 모아 두었다가 다음 호출에서 다시 반영"""
+        keys = set(keys) | self._pending_incr
+        if not keys:
+            return True
+        result = await self._call(None, self.backend.incr_many, list(keys))
+        if result is None:
+            self._pending_incr |= keys
+            return False
+        self._pending_incr -= keys
+        return True
+
+    async def acquire_lock(self, name, ttl):
+        """
+        여러 워커 중 한 곳만 계산하도록 잠금, 잡았으면 해제용 토큰 반환 (다른 곳이 잡고 있으면 None)
+        - 캐시 서버 오류 시에는 잠금 없이 진행하도록 토큰 반환
+        - 잡은 쪽이 죽어도 ttl 초 뒤 자동 해제
+        """
+        token = uuid.uuid4().hex
+        added = await self._call(True, self.backend.add, "lock:" + name, token, ttl)
+        return token if added else None
+
+    async def release_lock(self, name, token):
+        await self._call(None, self.backend.delete_if, "lock:" + name, token)
+
+    def close(self):
+        self.backend.close()
+
+    def stats(self):
+        return {**self.backend.stats(), "available": self.available, "errors_total": self._errors,
+                "pending_invalidations": len(self._pending_incr)}
+
+
+def create_backend(kind=CACHE_BACKEND):
+    if kind == "redis":
+        return RedisCache()
+    if kind != "memory":
+        print(f"알 수 없는 CACHE_BACKEND '{kind}', 메모리 캐시를 사용합니다")
+    return MemoryCache()
+
+
+# 모든 요청이 공유하는 캐시
+cache = Cache(create_backend())
+
+
+def main():
+    backend = cache.backend
+    print(f"캐시 저장소: {backend.stats()}")
+    try:
+        backend.set("check:value", b"ok", 5)
+        assert backend.get_many(["check:value", "check:missing"]) == [b"ok", None]
+        before = int(backend.get_many(["check:counter"])[0] or 0)
+        assert backend.incr_many(["check:counter"]) == [before + 1]
+        assert backend.add("check:lock", "a", 5) is True
+        assert backend.add("check:lock", "b", 5) is False
+        backend.delete_if("check:lock", "b")
+        assert backend.add("check:lock", "c", 5) is False
+        backend.delete_if("check:lock", "a")
+        assert backend.add("check:lock", "c", 5) is True
+        backend.delete_if("check:lock", "c")
+    except CacheError as e:
+        print(f"✗ 캐시 서버 오류: {e}")
+        return 2
+    except AssertionError:
+        print("✗ 캐시 저장소 응답이 예상과 다릅니다")
+        return 1
+    finally:
+        backend.close()
+    print("✓ 읽기/쓰기, 버전 카운터, 잠금 확인 완료")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import gzip
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 이보다 작은 응답은 압축하지 않음 (바이트) - 작은 응답은 압축 이득보다 CPU 비용이 큼
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))
+
+# 압축하지 않는 Content-Type (SSE 는 이벤트마다 바로 전달되어야 함, 이미 압축된 형식)
+EXCLUDED_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip", "application/gzip")
+
+
+def _accepted_encodings(header):
+    """Accept-Encoding 헤더에서 q=0 이 아닌 인코딩 집합"""
+    accepted = set()
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def choose_encoding(header):
+    """사용할 압축 방식 (br 우선, 설치되지 않았거나 받지 않으면 gzip), 없으면 None"""
+    if not header:
+        return None
+    accepted = _accepted_encodings(header)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    """스트리밍 압축기 - 청크마다 flush 해서 받은 만큼 바로 전송"""
+
+    def __init__(self, encoding):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+def compress_body(encoding, body):
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    응답 압축 (brotli/gzip, ASGI 미들웨어)
+    - 본문이 min_size 이상일 때만 압축
+    - 스트리밍 응답(내보내기 등)은 청크마다 압축해 바로 전송
+    - SSE, 이미 Content-Encoding 이 있는 응답, 본문 없는 응답(304 등)은 그대로 전달
+    """
+
+    def __init__(self, app, min_size=COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+        pending = b""
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough, pending
+
+            if message["type"] == "http.response.start":
+                start = message
+                response_headers = {key.lower(): value for key, value in message.get("headers", [])}
+                content_type = response_headers.get(b"content-type", b"").decode("latin-1")
+                passthrough = (
+                    b"content-encoding" in response_headers
+                    or message["status"] in (204, 304)
+                    or content_type.startswith(EXCLUDED_TYPES)
+                )
+                if passthrough:
+                    await send(start)
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                # 앞부분을 min_size 까지 모아 압축 여부 결정 (미들웨어를 거친 응답은 여러 청크로 옴)
+                pending += body
+                if more_body and len(pending) < self.min_size:
+                    return
+                if not more_body:
+                    if len(pending) < self.min_size:
+                        await send(start)
+                        await send({"type": "http.response.body", "body": pending})
+                        return
+                    body = compress_body(encoding, pending)
+                    await send(self._with_headers(start, encoding, len(body)))
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                # 스트리밍 응답 (내보내기 등)
+                compressor = _Compressor(encoding)
+                await send(self._with_headers(start, encoding, None))
+                body, pending = pending, b""
+
+            data = compressor.compress(body) if body else b""
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _with_headers(start, encoding, length):
+        """Content-Encoding / Vary 추가, 길이를 압축 후 값으로 교체 (스트리밍이면 제거)"""
+        headers = [
+            (key, value) for key, value in start.get("headers", [])
+            if key.lower() not in (b"content-length", b"vary")
+        ]
+        vary = [value for key, value in start.get("headers", []) if key.lower() == b"vary"]
+        vary_values = b", ".join(vary)
+        if b"accept-encoding" not in vary_values.lower():
+            vary_values = (vary_values + b", Accept-Encoding") if vary_values else b"Accept-Encoding"
+        headers.append((b"vary", vary_values))
+        headers.append((b"content-encoding", encoding.encode("latin-1")))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode("latin-1")))
+        return {**start, "headers": headers}
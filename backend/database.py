@@ -1,66 +1,787 @@
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, InterfaceError, OperationalError
+import asyncio
+import contextvars
+import functools
+import itertools
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+import metrics
+
 # 환경변수 로드
 load_dotenv()
 
+# 커넥션 풀 설정
+POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 2))
+POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))              # 커넥션 대기 최대 시간(초)
+POOL_RECYCLE = float(os.getenv('DB_POOL_RECYCLE', 1800))           # 커넥션 최대 수명(초)
+POOL_PING_INTERVAL = float(os.getenv('DB_POOL_PING_INTERVAL', 30)) # 이 시간 이상 유휴 상태면 사용 전 검증(초)
+
+# 읽기 전용 복제 DB (쉼표로 구분한 host 또는 host:port, 비어 있으면 주 DB 만 사용)
+REPLICA_HOSTS = [host.strip() for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', 5))                # 허용하는 복제 지연(초), 쓰기 후 주 DB 읽기 유지 시간
+REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 5))  # 복제 지연 확인 주기(초)
+REPLICA_RETRY_INTERVAL = float(os.getenv('DB_REPLICA_RETRY_INTERVAL', 30)) # 연결 실패한 복제 DB 재시도 간격(초)
+
+# 내보내기 스트리밍: 한 번에 읽어 전송하는 행 수, 느린 클라이언트를 기다리는 최대 시간(초)
+STREAM_BATCH_SIZE = int(os.getenv('DB_STREAM_BATCH_SIZE', 1000))
+STREAM_NET_WRITE_TIMEOUT = int(os.getenv('DB_STREAM_NET_WRITE_TIMEOUT', 600))
+
+# 비동기 DB 호출용 스레드 수 (기본값: 풀 최대 크기 - 스레드가 커넥션을 기다리며 놀지 않도록)
+ASYNC_WORKERS = int(os.getenv('DB_ASYNC_WORKERS', POOL_MAX_SIZE))
+
+
+def _connection_config():
+    """DB 접속 정보"""
+    return {
+        'host': os.getenv('DB_HOST'),
+        'user': os.getenv('DB_USER'),
+        'password': os.getenv('DB_PASSWORD'),
+        'database': os.getenv('DB_NAME'),
+        'port': int(os.getenv('DB_PORT', 3306)),
+    }
+
+
+class PoolTimeoutError(Error):
+    """풀에서 제한 시간 내에 커넥션을 얻지 못함"""
+
+
+class DatabaseConnectionError(Error):
+    """트랜잭션 실행을 위한 커넥션을 얻지 못함"""
+
+
+class _PoolEntry:
+    """풀이 관리하는 실제 커넥션과 생성/반납 시각"""
+
+    __slots__ = ('connection', 'created_at', 'released_at')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.released_at = self.created_at
+
+
+class _TimedCursor:
+    """
+    실행 시간/행 수를 기록하는 커서 (metrics.py)
+    - execute 부터 다음 execute 또는 close 까지 (결과 읽기 포함)를 쿼리 하나로 기록
+    - 행 수는 SELECT 면 읽은 행 수, 그 외에는 변경된 행 수(rowcount)
+    - 나머지 속성/메서드는 원래 커서로 위임
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._query = None
+        self._elapsed = 0.0
+        self._rows = 0
+        self._fetched = False
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _finish(self):
+        if self._query is None:
+            return
+        rows = self._rows if self._fetched else max(self._cursor.rowcount, 0)
+        metrics.record_query(self._query, self._elapsed, rows)
+        self._query = None
+
+    def execute(self, query, *args, **kwargs):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            result = self._cursor.execute(query, *args, **kwargs)
+        except Exception:
+            metrics.record_query(query, time.perf_counter() - started, 0, error=True)
+            raise
+        self._query = query
+        self._elapsed = time.perf_counter() - started
+        self._rows = 0
+        self._fetched = False
+        return result
+
+    def executemany(self, query, seq_params, *args, **kwargs):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            result = self._cursor.executemany(query, seq_params, *args, **kwargs)
+        except Exception:
+            metrics.record_query(query, time.perf_counter() - started, 0, error=True)
+            raise
+        metrics.record_query(query, time.perf_counter() - started, max(self._cursor.rowcount, 0))
+        return result
+
+    def _fetch(self, method, *args):
+        started = time.perf_counter()
+        result = method(*args)
+        self._elapsed += time.perf_counter() - started
+        self._fetched = True
+        return result
+
+    def fetchone(self):
+        row = self._fetch(self._cursor.fetchone)
+        if row is not None:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._fetch(self._cursor.fetchmany, *args)
+        self._rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(self._cursor.fetchall)
+        self._rows += len(rows)
+        return rows
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+
+class PooledConnection:
+    """
+    풀에서 대여한 커넥션
+    - close() 호출 시 실제로 끊지 않고 풀에 반납
+    - cursor() 는 METRICS_ENABLED 이면 실행 시간을 기록하는 커서
+    - 나머지 속성/메서드는 원래 커넥션으로 위임
+    """
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name):
+        entry = self.__dict__.get('_entry')
+        if entry is None:
+            raise Error("이미 풀에 반납된 커넥션입니다")
+        return getattr(entry.connection, name)
+
+    def cursor(self, *args, **kwargs):
+        if self._entry is None:
+            raise Error("이미 풀에 반납된 커넥션입니다")
+        cursor = self._entry.connection.cursor(*args, **kwargs)
+        return _TimedCursor(cursor) if metrics.METRICS_ENABLED else cursor
+
+    def close(self):
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool.release(entry)
+
+    def discard(self):
+        """풀에 반납하지 않고 연결 종료 (읽지 않은 대량 결과가 남아 있을 때)"""
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool.release(entry, reusable=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    MySQL 커넥션 풀
+    - min_size 만큼 미리 연결, max_size 까지 필요할 때 생성
+    - 모두 사용 중이면 timeout 초 동안 반납을 기다림
+    - 오래 유휴 상태였던 커넥션은 ping 으로 검증, recycle 초가 지난 커넥션은 재생성
+    """
+
+    def __init__(self, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE, timeout=POOL_TIMEOUT,
+                 recycle=POOL_RECYCLE, ping_interval=POOL_PING_INTERVAL, name="primary", **connect_kwargs):
+        self.name = name            # 메트릭 레이블
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self._connect_kwargs = connect_kwargs or _connection_config()
+
+        self._idle = deque()
+        self._size = 0          # 생성된(대여 중 + 유휴) 커넥션 수
+        self._in_use = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+        # 통계
+        self._acquired = 0
+        self._created = 0
+        self._recycled = 0
+        self._invalidated = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _connect(self):
+        return _PoolEntry(mysql.connector.connect(**self._connect_kwargs))
+
+    def _discard(self, entry):
+        try:
+            entry.connection.close()
+        except Error:
+            pass
+
+    def _check_idle(self, entry):
+        """
+        유휴 커넥션 재사용 가능 여부 확인 (수명, 연결 상태) - ping 은 네트워크 호출이므로 락 밖에서 호출
+        - 재사용 가능하면 None, 아니면 버리는 이유 ('recycled' / 'invalidated')
+        """
+        now = time.monotonic()
+        if self.recycle and now - entry.created_at > self.recycle:
+            return 'recycled'
+        if now - entry.released_at > self.ping_interval:
+            try:
+                entry.connection.ping(reconnect=False)
+            except Error:
+                return 'invalidated'
+        return None
+
+    def fill(self):
+        """min_size 만큼 커넥션을 미리 생성"""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                entry = self._connect()
+            except Error:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._created += 1
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def acquire(self, timeout=None):
+        """커넥션 대여 (PooledConnection 반환)"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            entry = None
+            with self._cond:
+                self._waiting += 1
+                try:
+                    while True:
+                        if self._idle:
+                            entry = self._idle.pop()
+                            break
+
+                        if self._size < self.max_size:
+                            self._size += 1
+                            break
+
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._timeouts += 1
+                            raise PoolTimeoutError(
+                                msg=f"커넥션 풀 대기 시간 초과 ({timeout}초, 최대 {self.max_size}개 사용 중)"
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            if entry is None:
+                break
+
+            # 유휴 커넥션 검증(ping)과 종료는 락 밖에서 수행 - 응답 없는 연결이 다른 대여/반납을 막지 않도록
+            reason = self._check_idle(entry)
+            if reason is None:
+                with self._cond:
+                    return self._checkout(entry, started)
+            self._discard(entry)
+            with self._cond:
+                self._size -= 1
+                if reason == 'recycled':
+                    self._recycled += 1
+                else:
+                    self._invalidated += 1
+                self._cond.notify()
+
+        # 새 커넥션 생성은 락 밖에서 수행
+        try:
+            entry = self._connect()
+        except Error:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._created += 1
+            return self._checkout(entry, started)
+
+    def _checkout(self, entry, started):
+        waited = time.monotonic() - started
+        self._in_use += 1
+        self._acquired += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        metrics.record_acquire(self.name, waited)
+        return PooledConnection(self, entry)
+
+    def release(self, entry, reusable=True):
+        """커넥션 반납 (열린 트랜잭션은 롤백), reusable=False 면 연결 종료"""
+        # is_connected() 는 매번 ping 을 보내므로 사용하지 않음 (검증은 대여 시점에 수행)
+        try:
+            if reusable and entry.connection.unread_result:
+                entry.connection.consume_results()
+            if reusable and entry.connection.in_transaction:
+                entry.connection.rollback()
+        except Error:
+            reusable = False
+
+        if not reusable:
+            self._discard(entry)
+
+        with self._cond:
+            self._in_use -= 1
+            if reusable:
+                entry.released_at = time.monotonic()
+                self._idle.append(entry)
+            else:
+                self._size -= 1
+                self._invalidated += 1
+            self._cond.notify()
+
+    def close_all(self):
+        """유휴 커넥션 모두 종료 (대여 중인 커넥션은 반납 시 풀로 돌아옴)"""
+        with self._cond:
+            entries = list(self._idle)
+            self._idle.clear()
+            self._size -= len(entries)
+            self._cond.notify_all()
+        for entry in entries:
+            self._discard(entry)
+
+    def stats(self):
+        """풀 사용 현황"""
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "acquired_total": self._acquired,
+                "created_total": self._created,
+                "recycled_total": self._recycled,
+                "invalidated_total": self._invalidated,
+                "timeouts_total": self._timeouts,
+                "wait_time_total_ms": round(self._wait_total * 1000, 3),
+                "wait_time_avg_ms": round(self._wait_total * 1000 / self._acquired, 3) if self._acquired else 0.0,
+                "wait_time_max_ms": round(self._wait_max * 1000, 3),
+            }
+
+
+class Replica:
+    """복제 DB 1개의 커넥션 풀과 상태 (복제 지연, 장애 시각)"""
+
+    def __init__(self, address):
+        host, _, port = address.partition(':')
+        self.address = address
+        config = _connection_config()
+        config['host'] = host
+        if port:
+            config['port'] = int(port)
+        self.pool = ConnectionPool(name=f"replica {address}", **config)
+        self.lag = None           # 마지막으로 확인한 복제 지연(초), 확인 전/복제 중단 시 None
+        self.checked_at = 0.0
+        self.down_until = 0.0
+        self.error = None
+        self.check_lock = threading.Lock()
+
+
+class ReplicaSet:
+    """
+    읽기 전용 복제 DB 묶음
+    - 복제 지연이 max_lag 이하인 복제 DB 를 돌아가며 사용
+    - 연결 실패한 복제 DB 는 retry_interval 동안 제외
+    - 사용할 수 있는 복제 DB 가 없으면 None (호출 측에서 주 DB 사용)
+    """
+
+    def __init__(self, addresses, max_lag=REPLICA_MAX_LAG, check_interval=REPLICA_CHECK_INTERVAL,
+                 retry_interval=REPLICA_RETRY_INTERVAL):
+        self.replicas = [Replica(address) for address in addresses]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_interval = retry_interval
+        self._next = itertools.count()
+        self._fallbacks = 0
+
+    def _mark_down(self, replica, error):
+        replica.down_until = time.monotonic() + self.retry_interval
+        replica.lag = None
+        replica.error = str(error)
+        print(f"복제 DB {replica.address} 사용 중지 ({self.retry_interval:.0f}초 후 재시도): {error}")
+
+    def _measure_lag(self, connection):
+        """복제 지연(초) 조회 - 복제 상태가 없는 단독 인스턴스는 0, 복제 중단 시 None"""
+        cursor = connection.cursor(dictionary=True, buffered=True)
+        try:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except Error:
+                # MySQL 8.0.22 이전 문법
+                cursor.execute("SHOW SLAVE STATUS")
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        if row is None:
+            return 0
+        lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+        return None if lag is None else float(lag)
+
+    def _refresh(self, replica):
+        """check_interval 마다 복제 지연 확인 (다른 스레드가 확인 중이면 이전 값 사용)"""
+        if time.monotonic() - replica.checked_at < self.check_interval:
+            return
+        if not replica.check_lock.acquire(blocking=False):
+            return
+        try:
+            connection = replica.pool.acquire()
+            try:
+                replica.lag = self._measure_lag(connection)
+                replica.error = None if replica.lag is not None else "복제 중단"
+            finally:
+                connection.close()
+        except Error as e:
+            self._mark_down(replica, e)
+        finally:
+            replica.checked_at = time.monotonic()
+            replica.check_lock.release()
+
+    def _is_available(self, replica):
+        if time.monotonic() < replica.down_until:
+            return False
+        self._refresh(replica)
+        return replica.lag is not None and replica.lag <= self.max_lag
+
+    def acquire(self):
+        """사용할 수 있는 복제 DB 커넥션 대여 (없으면 None)"""
+        if self.replicas:
+            start = next(self._next)
+            for i in range(len(self.replicas)):
+                replica = self.replicas[(start + i) % len(self.replicas)]
+                if not self._is_available(replica):
+                    continue
+                try:
+                    return replica.pool.acquire()
+                except PoolTimeoutError:
+                    # 풀이 가득 찬 것은 장애가 아니므로 제외하지 않고 다음 복제 DB 시도
+                    continue
+                except Error as e:
+                    self._mark_down(replica, e)
+        self._fallbacks += 1
+        return None
+
+    def report_failure(self, connection, error):
+        """
+        복제 DB 커넥션에서 쿼리가 실패했을 때 호출, 복제 DB 커넥션이었으면 True
+        - 연결 끊김/서버 오류면 그 복제 DB 를 retry_interval 동안 제외 (SQL 오류는 주 DB 에서도 같으므로 제외하지 않음)
+        """
+        for replica in self.replicas:
+            if connection._pool is replica.pool:
+                if isinstance(error, (InterfaceError, OperationalError)):
+                    self._mark_down(replica, error)
+                return True
+        return False
+
+    def close_all(self):
+        for replica in self.replicas:
+            replica.pool.close_all()
+
+    def stats(self):
+        return {
+            "max_lag": self.max_lag,
+            "fallbacks_total": self._fallbacks,
+            "replicas": [
+                {
+                    "address": replica.address,
+                    "available": time.monotonic() >= replica.down_until
+                        and replica.lag is not None and replica.lag <= self.max_lag,
+                    "lag": replica.lag,
+                    "error": replica.error,
+                    "pool": replica.pool.stats(),
+                }
+                for replica in self.replicas
+            ],
+        }
+
+
+# 모든 라우터가 공유하는 커넥션 풀 (주 DB, 모든 쓰기와 일관성이 필요한 읽기)
+pool = ConnectionPool()
+
+# 읽기 전용 복제 DB (DB_REPLICA_HOSTS 미설정 시 비어 있음)
+replicas = ReplicaSet(REPLICA_HOSTS)
+
+# 현재 요청의 읽기 쿼리를 복제 DB 로 보낼지 여부 (GET 요청에서 main.py 미들웨어가 설정)
+_read_from_replica = contextvars.ContextVar('read_from_replica', default=False)
+
+
+def use_replica_reads(enabled=True):
+    """
+    현재 컨텍스트(요청)의 execute_query / execute_single_query 를 복제 DB 로 보냄
+    - 되돌릴 때 쓰는 토큰 반환 (reset_replica_reads)
+    - run_transaction 은 항상 주 DB 사용
+    """
+    return _read_from_replica.set(enabled)
+
+
+def reset_replica_reads(token):
+    _read_from_replica.reset(token)
+
+
+# 현재 요청에서 복제 DB 로 읽은 횟수 기록 (조회 응답 캐시가 설정, DB 스레드에서도 같은 목록을 갱신)
+_replica_read_log = contextvars.ContextVar('replica_read_log', default=None)
+
+
+def track_replica_reads():
+    """
+    현재 컨텍스트(요청)에서 복제 DB 읽기 기록 시작, (토큰, 기록) 반환
+    - 기록[0] 이 0 보다 크면 복제 지연만큼 오래된 결과가 섞였을 수 있는 응답
+    - 끝나면 reset_replica_read_log(토큰)
+    """
+    log = [0]
+    return _replica_read_log.set(log), log
+
+
+def reset_replica_read_log(token):
+    _replica_read_log.reset(token)
+
+
 def get_db_connection():
-    """데이터베이스 연결 생성"""
+    """커넥션 풀에서 데이터베이스 연결 대여 (close() 호출 시 풀에 반납)"""
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv('DB_HOST'),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD'),
-            database=os.getenv('DB_NAME'),
-            port=int(os.getenv('DB_PORT', 3306))
-        )
-        return connection
+        return pool.acquire()
     except Error as e:
         print(f"데이터베이스 연결 오류: {e}")
         return None
 
+
+def get_read_connection():
+    """읽기용 연결 대여 - 복제 DB 읽기가 켜져 있고 사용 가능한 복제 DB 가 있으면 복제 DB, 아니면 주 DB"""
+    if _read_from_replica.get() and replicas.replicas:
+        connection = replicas.acquire()
+        if connection is not None:
+            log = _replica_read_log.get()
+            if log is not None:
+                log[0] += 1
+            return connection
+    return get_db_connection()
+
+
+def get_pool_metrics():
+    """풀 이름 -> 풀 통계 (/metrics 게이지용)"""
+    stats = {pool.name: pool.stats()}
+    for replica in replicas.replicas:
+        stats[replica.pool.name] = replica.pool.stats()
+    return stats
+
+
+def get_pool_stats():
+    """커넥션 풀 통계 조회 (복제 DB 가 있으면 replicas 항목 포함)"""
+    stats = pool.stats()
+    if replicas.replicas:
+        stats["replicas"] = replicas.stats()
+    return stats
+
+
+def _read_query(query, params, fetch):
+    """
+    읽기 연결에서 쿼리 실행 후 fetch(cursor) 결과 반환 (오류 시 None)
+    - 복제 DB 에서 실패하면 (연결 끊김 등) 주 DB 에서 한 번 다시 실행
+    """
+    connection = get_read_connection()
+    for attempt in range(2):
+        if connection is None:
+            return None
+
+        cursor = None
+        broken = False
+        try:
+            cursor = connection.cursor(dictionary=True)
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            return fetch(cursor)
+        except Error as e:
+            broken = isinstance(e, (InterfaceError, OperationalError))
+            if attempt == 0 and replicas.report_failure(connection, e):
+                print(f"복제 DB 쿼리 실행 오류 (주 DB 에서 다시 실행): {e}")
+            else:
+                print(f"쿼리 실행 오류: {e}")
+                return None
+        finally:
+            if broken:
+                # 끊긴 커넥션은 풀에 돌려보내지 않음
+                connection.discard()
+            else:
+                if cursor is not None:
+                    cursor.close()
+                connection.close()
+        connection = get_db_connection()
+
+
 def execute_query(query, params=None):
     """SELECT 쿼리 실행"""
-    connection = get_db_connection()
-    if connection is None:
-        return None
-    
-    try:
-        cursor = connection.cursor(dictionary=True)
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        result = cursor.fetchall()
-        return result
-    except Error as e:
-        print(f"쿼리 실행 오류: {e}")
-        return None
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    return _read_query(query, params, lambda cursor: cursor.fetchall())
+
 
 def execute_single_query(query, params=None):
     """단일 결과 반환 쿼리"""
+    return _read_query(query, params, lambda cursor: cursor.fetchone())
+
+
+def run_transaction(func, *args, dictionary=False):
+    """
+    하나의 커넥션에서 func(cursor, *args) 를 트랜잭션으로 실행
+    - 정상 종료 시 커밋 후 func 의 반환값을 돌려줌
+    - 예외 발생 시 롤백 후 예외를 그대로 전달
+    """
     connection = get_db_connection()
     if connection is None:
-        return None
-    
+        raise DatabaseConnectionError(msg="데이터베이스 연결 실패")
+
+    cursor = None
     try:
-        cursor = connection.cursor(dictionary=True)
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        result = cursor.fetchone()
+        cursor = connection.cursor(dictionary=dictionary)
+        result = func(cursor, *args)
+        connection.commit()
         return result
-    except Error as e:
-        print(f"쿼리 실행 오류: {e}")
-        return None
+    except Exception:
+        connection.rollback()
+        raise
     finally:
-        if connection.is_connected():
+        if cursor is not None:
+            cursor.close()
+        connection.close()
+
+
+class QueryStream:
+    """
+    서버 측(비버퍼) 커서로 SELECT 결과를 batch_size 행씩 읽음 (대량 내보내기용)
+    - 전체 결과를 메모리에 올리지 않으므로 행 수와 관계없이 메모리 사용량 일정
+    - open() 부터 close() 까지 커넥션 하나를 점유
+    - 끝까지 읽지 않고 닫으면 남은 결과를 읽지 않도록 커넥션을 풀에 반납하지 않고 끊음
+    """
+
+    def __init__(self, query, params=None, batch_size=STREAM_BATCH_SIZE):
+        self.query = query
+        self.params = params
+        self.batch_size = batch_size
+        self.rows = 0
+        self._connection = None
+        self._cursor = None
+        self._done = False
+
+    def open(self):
+        """쿼리 실행 (연결 실패 시 DatabaseConnectionError, 쿼리 오류는 Error)"""
+        connection = get_read_connection()
+        if connection is None:
+            raise DatabaseConnectionError(msg="데이터베이스 연결 실패")
+        self._connection = connection
+        try:
+            # 클라이언트가 느려 서버가 결과 전송을 기다리는 동안 연결이 끊기지 않도록
+            cursor = connection.cursor()
+            cursor.execute(f"SET SESSION net_write_timeout = {int(STREAM_NET_WRITE_TIMEOUT)}")
+            cursor.close()
+            self._cursor = connection.cursor(dictionary=True)
+            self._cursor.execute(self.query, self.params or ())
+        except Error:
+            self.close()
+            raise
+
+    def fetch(self):
+        """다음 batch_size 행 (끝나면 빈 목록)"""
+        if self._done:
+            return []
+        rows = self._cursor.fetchmany(self.batch_size)
+        if not rows:
+            self._done = True
+        self.rows += len(rows)
+        return rows
+
+    def close(self):
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        if not self._done:
+            connection.discard()
+            return
+        try:
+            self._cursor.close()
+            cursor = connection.cursor()
+            cursor.execute("SET SESSION net_write_timeout = DEFAULT")
             cursor.close()
-            connection.close()
\ No newline at end of file
+        except Error:
+            connection.discard()
+            return
+        connection.close()
+
+
+# ===== 비동기 API =====
+# mysql.connector 는 블로킹 드라이버이므로 전용 스레드 풀에서 실행해
+# 이벤트 루프가 쿼리 대기 중에도 다른 요청을 처리할 수 있도록 함
+
+_executor = ThreadPoolExecutor(max_workers=max(1, ASYNC_WORKERS), thread_name_prefix="db")
+
+
+async def run_in_db_thread(func, *args, **kwargs):
+    """블로킹 DB 함수를 DB 전용 스레드 풀에서 실행 (복제 DB 읽기 설정 등 컨텍스트 유지)"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+async def execute_query_async(query, params=None):
+    """SELECT 쿼리 실행 (비동기)"""
+    return await run_in_db_thread(execute_query, query, params)
+
+
+async def execute_single_query_async(query, params=None):
+    """단일 결과 반환 쿼리 (비동기)"""
+    return await run_in_db_thread(execute_single_query, query, params)
+
+
+async def iter_query_stream(stream):
+    """
+    open() 한 QueryStream 의 행 묶음을 차례로 반환 (각 fetch 는 DB 스레드에서 실행)
+    - 중간에 오류가 나면 로그 후 예외 전달 (응답이 완료되지 않아 클라이언트가 잘린 결과임을 알 수 있음)
+    """
+    try:
+        while True:
+            try:
+                rows = await run_in_db_thread(stream.fetch)
+            except Error as e:
+                print(f"스트리밍 조회 오류 ({stream.rows}행 전송 후): {e}")
+                raise
+            if not rows:
+                return
+            yield rows
+    finally:
+        await run_in_db_thread(stream.close)
+
+
+async def run_transaction_async(func, *args, dictionary=False):
+    """run_transaction 의 비동기 버전"""
+    return await run_in_db_thread(run_transaction, func, *args, dictionary=dictionary)
+
+
+def shutdown_executor():
+    """DB 스레드 풀 종료"""
+    _executor.shutdown(wait=False)
@@ -0,0 +1,36 @@
+from datetime import datetime, date, timedelta
+
+
+def day_start(day):
+    """날짜의 0시 datetime"""
+    return datetime.combine(day, datetime.min.time())
+
+
+def day_range(date_from=None, date_to=None):
+    """
+    날짜 필터(date_from ~ date_to, 양 끝 포함)를 반열림 datetime 구간 [start, end) 로 변환
+    - DATE(열) 대신 '열 >= start AND 열 < end' 로 비교해야 열의 인덱스를 사용
+    - 지정하지 않은 쪽은 None
+    """
+    start = day_start(date_from) if date_from else None
+    end = day_start(date_to) + timedelta(days=1) if date_to else None
+    return start, end
+
+
+def today_range():
+    """오늘 0시부터 내일 0시 전까지"""
+    today = date.today()
+    return day_range(today, today)
+
+
+def range_condition(column, start, end):
+    """반열림 구간 조건 SQL 조각 목록과 파라미터 (비어 있으면 조건 없음)"""
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append(f"{column} >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append(f"{column} < %s")
+        params.append(end)
+    return conditions, params
@@ -0,0 +1,191 @@
+"""
+진료과/담당의 기준 정보 (departments, doctors 테이블) 와 메모리 캐시
+
+사용법:
+    python departments.py load                  # data/departments.csv 를 departments 테이블에 반영
+    python departments.py load path/to.csv
+"""
+import argparse
+import csv
+import os
+import sys
+import threading
+import time
+
+from database import execute_query, run_transaction, run_in_db_thread
+
+# 캐시 유지 시간 (초) - 다른 워커에서 바뀐 기준 정보는 이 시간 안에 반영
+DEPARTMENT_CACHE_TTL = float(os.getenv('DEPARTMENT_CACHE_TTL', 300))
+
+DEPARTMENTS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "departments.csv")
+
+UPSERT_DEPARTMENT_SQL = """
+    INSERT INTO departments (dept_code, dept_name, location, phone, is_active)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        dept_name = VALUES(dept_name),
+        location = VALUES(location),
+        phone = VALUES(phone),
+        is_active = VALUES(is_active)
+"""
+
+
+def load_csv(cursor, path=DEPARTMENTS_CSV):
+    """진료과 CSV 를 departments 테이블에 반영 (dept_code 기준 추가/수정), 반영한 행 수 반환"""
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        rows = [
+            (
+                row['dept_code'].strip(),
+                row['dept_name'].strip(),
+                (row.get('location') or "").strip() or None,
+                (row.get('phone') or "").strip() or None,
+                1 if (row.get('is_active') or "1").strip() in ("1", "true", "True") else 0
+            )
+            for row in csv.DictReader(file)
+        ]
+    if rows:
+        cursor.executemany(UPSERT_DEPARTMENT_SQL, rows)
+    return len(rows)
+
+
+def seed_doctors(cursor):
+    """기존 진료/예약 기록의 (진료과, 담당의) 를 doctors 테이블에 등록"""
+    for table in ("visits", "appointments"):
+        cursor.execute(
+            f"""
+            INSERT IGNORE INTO doctors (dept_id, name)
+            SELECT DISTINCT d.dept_id, t.doctor_name
+            FROM {table} t
+            JOIN departments d ON d.dept_name = t.department
+            WHERE t.doctor_name IS NOT NULL AND t.doctor_name != ''
+            """
+        )
+
+
+class DepartmentCache:
+    """
+    진료과/담당의 메모리 캐시
+    - 진료/예약 등록 시 진료과 검증을 DB 조회 없이 처리
+    - 기준 정보를 바꾼 뒤에는 invalidate() (POST /api/departments/reload)
+    - DEPARTMENT_CACHE_TTL 이 지나면 다시 적재
+    """
+
+    def __init__(self):
+        self._departments = None   # dept_name -> 진료과 정보 (doctors 포함)
+        self._loaded_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._departments is not None
+
+    def is_stale(self):
+        return self._departments is None or time.monotonic() - self._loaded_at > DEPARTMENT_CACHE_TTL
+
+    def refresh(self):
+        """DB 에서 전체 다시 적재 (다른 스레드가 적재 중이면 건너뜀), 실패 시 기존 캐시 유지"""
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            departments = execute_query(
+                """
+                SELECT dept_id, dept_code, dept_name, location, phone
+                FROM departments
+                WHERE is_active = 1
+                ORDER BY dept_code
+                """
+            )
+            doctors = execute_query(
+                "SELECT dept_id, name FROM doctors WHERE is_active = 1 ORDER BY name"
+            )
+            if departments is None or doctors is None:
+                return
+
+            by_id = {}
+            for department in departments:
+                department['doctors'] = []
+                by_id[department['dept_id']] = department
+            for doctor in doctors:
+                if doctor['dept_id'] in by_id:
+                    by_id[doctor['dept_id']]['doctors'].append(doctor['name'])
+
+            self._departments = {department['dept_name']: department for department in departments}
+            self._loaded_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def invalidate(self):
+        """다음 조회 시 DB 에서 다시 적재"""
+        self._loaded_at = 0.0
+
+    def all(self):
+        """진료과 목록 (dept_code 순, 담당의 포함)"""
+        return list((self._departments or {}).values())
+
+    def names(self):
+        return [department['dept_name'] for department in self.all()]
+
+    def get(self, dept_name):
+        return (self._departments or {}).get(dept_name)
+
+    def has_doctor(self, dept_name, doctor_name):
+        department = self.get(dept_name)
+        return department is not None and doctor_name in department['doctors']
+
+    def add_doctor(self, dept_name, doctor_name):
+        """등록 시 새로 추가된 담당의 반영"""
+        department = self.get(dept_name)
+        if department is not None and doctor_name not in department['doctors']:
+            department['doctors'] = sorted(department['doctors'] + [doctor_name])
+
+
+def check_department(dept_name, doctor_name=None):
+    """
+    진료과 검증 (캐시 사용, DB 조회 없음)
+    - 진료과가 없으면 None, 등록되지 않은 진료과면 ValueError
+    - 처음 보는 담당의면 doctors 테이블에 추가할 (dept_id, 이름) 반환
+    """
+    if dept_name is None:
+        return None
+    department = department_cache.get(dept_name)
+    if department is None:
+        raise ValueError(f"존재하지 않는 진료과입니다: {dept_name}")
+    if doctor_name and not department_cache.has_doctor(dept_name, doctor_name):
+        return (department['dept_id'], doctor_name)
+    return None
+
+
+def register_doctors(cursor, doctors):
+    """처음 보는 담당의를 doctors 테이블에 추가 (진료/예약 INSERT 와 같은 트랜잭션)"""
+    doctors = sorted(set(doctors))
+    if doctors:
+        cursor.executemany("INSERT IGNORE INTO doctors (dept_id, name) VALUES (%s, %s)", doctors)
+
+
+# 모든 요청이 공유하는 진료과 캐시
+department_cache = DepartmentCache()
+
+
+async def ensure_departments_loaded():
+    """캐시가 오래됐으면 DB 스레드에서 다시 적재, 사용할 수 있는 캐시가 있으면 True"""
+    if department_cache.is_stale():
+        await run_in_db_thread(department_cache.refresh)
+    return department_cache.loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="진료과 기준 정보 관리")
+    parser.add_argument("command", choices=("load",))
+    parser.add_argument("path", nargs="?", default=DEPARTMENTS_CSV, help="진료과 CSV 파일")
+    args = parser.parse_args()
+
+    from migrations import migrate
+    migrate()
+    count = run_transaction(load_csv, args.path)
+    print(f"✓ 진료과 {count}건 반영 ({args.path})")
+    print("실행 중인 서버는 POST /api/departments/reload 로 캐시를 갱신하세요")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+목록 API 쿼리 실행 계획(EXPLAIN) 점검
+
+사용법:
+    python explain_check.py              # 모든 목록 쿼리 점검, 전체 테이블 스캔이 있으면 종료 코드 1
+    python explain_check.py --verbose    # 쿼리별 실행 계획 전체 출력
+    python explain_check.py --migrate    # 점검 전에 마이그레이션 적용 (로컬/CI DB 용)
+
+- 각 API 가 실제로 실행하는 SQL 을 같은 함수로 만들어 EXPLAIN
+- 실행 계획에 type = ALL (전체 테이블 스캔) 인 테이블이 있으면 실패
+- 추정 행 수가 --min-rows 보다 적은 테이블은 옵티마이저가 일부러 전체 스캔을 고를 수 있어 건너뜀
+- 읽기만 하는 점검이므로 기본적으로 스키마를 바꾸지 않음 (인덱스가 빠졌으면 migrations.py status 로 확인)
+- 종료 코드: 0 통과, 1 전체 테이블 스캔 있음, 2 DB 연결 실패 (배포 전/CI 점검 명령으로 사용)
+
+단위 테스트가 아닌 스크립트인 이유:
+    실행 계획은 테이블 크기와 통계에 따라 달라지므로 빈 테스트 DB 에서는 의미가 없고,
+    운영과 비슷한 데이터가 적재된 DB(generate_data.py + load_csv_to_db.py)에 대해 실행해야 함
+"""
+import argparse
+import sys
+from datetime import date, timedelta
+
+from database import get_db_connection
+from migrations import migrate
+from pagination import encode_cursor
+from routes.patients import _patients_list_query, _visits_page_query, _appointments_page_query
+from routes.visits import _visits_list_query, _today_visits_query, _visits_export_query
+from routes.appointments import (
+    _appointments_list_query, _today_appointments_query, _upcoming_appointments_query, _appointments_export_query
+)
+
+MIN_ROWS = 1000
+
+
+def _sample(cursor, sql, default):
+    """점검용 샘플 값 조회 (없으면 기본값)"""
+    cursor.execute(sql)
+    row = cursor.fetchone()
+    return row[0] if row and row[0] is not None else default
+
+
+def build_cases(cursor):
+    """(이름, SQL, 파라미터) 목록"""
+    today = date.today()
+    week_ago = today - timedelta(days=7)
+    department = _sample(cursor, "SELECT department FROM visits WHERE department IS NOT NULL LIMIT 1", "내과")
+    patient_id = _sample(cursor, "SELECT MAX(patient_id) FROM patients", 1)
+    latest = _sample(cursor, "SELECT MAX(created_at) FROM patients", today)
+    cursor_token = encode_cursor(latest, patient_id)
+
+    cases = [
+        ("환자 목록", *_patients_list_query(20)),
+        ("환자 목록 (커서)", *_patients_list_query(20, cursor_token)),
+        ("환자 진료 기록", *_visits_page_query(patient_id, 20, None)),
+        ("환자 예약", *_appointments_page_query(patient_id, 20, None)),
+        ("진료 기록", *_visits_list_query()),
+        ("진료 기록 (기간)", *_visits_list_query(week_ago, today)),
+        ("진료 기록 (진료과)", *_visits_list_query(department=department)),
+        ("진료 기록 (진료과+상태+기간)", *_visits_list_query(week_ago, today, department, "완료")),
+        ("진료 기록 (상태)", *_visits_list_query(status="대기")),
+        ("진료 기록 (커서)", *_visits_list_query(cursor=encode_cursor(latest, 1))),
+        ("오늘 진료", *_today_visits_query()),
+        ("진료 내보내기 (기간)", *_visits_export_query(week_ago, today)),
+        ("예약 목록", *_appointments_list_query()),
+        ("예약 목록 (기간)", *_appointments_list_query(week_ago, today)),
+        ("예약 목록 (상태+기간)", *_appointments_list_query(week_ago, today, status="예약")),
+        ("오늘 예약", *_today_appointments_query()),
+        ("향후 예약", *_upcoming_appointments_query(7)),
+        ("예약 내보내기 (기간)", *_appointments_export_query(week_ago, today)),
+    ]
+    return cases
+
+
+def explain(connection, sql, params):
+    cursor = connection.cursor(dictionary=True, buffered=True)
+    try:
+        cursor.execute("EXPLAIN " + sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def full_scans(plan, min_rows=MIN_ROWS):
+    """실행 계획에서 추정 min_rows 행 이상인 테이블의 전체 스캔 목록"""
+    problems = []
+    for row in plan:
+        table = row.get('table') or ""
+        # 서브쿼리 결과(<derived2> 등)는 제외
+        if table.startswith("<") or row.get('type') != "ALL":
+            continue
+        # 전체 스캔이면 rows 는 옵티마이저가 추정한 테이블 행 수
+        rows = row.get('rows') or 0
+        if rows < min_rows:
+            continue
+        problems.append(f"{table} 전체 스캔 (약 {rows:,}행)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="목록 API 쿼리 실행 계획 점검")
+    parser.add_argument("--min-rows", type=int, default=MIN_ROWS, help="이보다 작은 테이블의 전체 스캔은 무시")
+    parser.add_argument("--verbose", action="store_true", help="실행 계획 전체 출력")
+    parser.add_argument("--migrate", action="store_true", help="점검 전에 마이그레이션 적용")
+    args = parser.parse_args()
+
+    if args.migrate:
+        migrate()
+    connection = get_db_connection()
+    if connection is None:
+        print("✗ 데이터베이스 연결 실패")
+        return 2
+
+    failures = 0
+    try:
+        cursor = connection.cursor(buffered=True)
+        try:
+            cases = build_cases(cursor)
+        finally:
+            cursor.close()
+
+        for name, sql, params in cases:
+            plan = explain(connection, sql, params)
+            problems = full_scans(plan, args.min_rows)
+
+            keys = ", ".join(f"{row.get('table')}:{row.get('key') or '-'}" for row in plan)
+            if problems:
+                failures += 1
+                print(f"✗ {name}: {'; '.join(problems)} [{keys}]")
+            else:
+                print(f"✓ {name} [{keys}]")
+
+            if args.verbose:
+                for row in plan:
+                    print(f"    {row}")
+    finally:
+        connection.close()
+
+    if failures:
+        print(f"\n✗ 전체 테이블 스캔 쿼리 {failures}건")
+        return 1
+    print("\n✓ 모든 목록 쿼리가 인덱스를 사용합니다")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
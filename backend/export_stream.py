@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+from datetime import datetime, date
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from mysql.connector import Error
+
+from database import QueryStream, DatabaseConnectionError, iter_query_stream, run_in_db_thread
+
+# 형식 -> (Content-Type, 파일 확장자)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+
+def _text(value):
+    """CSV 셀 값 (None 은 빈 칸, 날짜는 data/*.csv 와 같은 'YYYY-MM-DD HH:MM:SS')"""
+    if value is None:
+        return ""
+    return str(value)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+async def _csv_chunks(batches, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    async for rows in batches:
+        for row in rows:
+            writer.writerow([_text(row[column]) for column in columns])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    # 결과가 없어도 헤더는 전송
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def _ndjson_chunks(batches, columns):
+    async for rows in batches:
+        yield "".join(
+            json.dumps({column: row[column] for column in columns}, ensure_ascii=False, default=_json_default) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+async def export_response(sql, params, columns, export_format, filename):
+    """
+    쿼리 결과를 CSV/NDJSON 으로 스트리밍하는 응답
+    - 쿼리는 응답 전에 실행해 연결/쿼리 오류는 500 으로 반환
+    - 이후 DB 에서 읽은 행 묶음마다 한 청크씩 전송 (chunked), 메모리에는 한 묶음만 유지
+    """
+    media_type, extension = EXPORT_FORMATS[export_format]
+    stream = QueryStream(sql, params)
+    try:
+        await run_in_db_thread(stream.open)
+    except DatabaseConnectionError:
+        raise HTTPException(status_code=500, detail="데이터베이스 연결 실패")
+    except Error as e:
+        print(f"쿼리 실행 오류: {e}")
+        raise HTTPException(status_code=500, detail="내보내기 조회 중 오류가 발생했습니다")
+
+    batches = iter_query_stream(stream)
+    chunks = _csv_chunks(batches, columns) if export_format == "csv" else _ndjson_chunks(batches, columns)
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{extension}"',
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+        }
+    )
@@ -0,0 +1,99 @@
+"""
+빠른 JSON 응답
+
+- DB 조회 결과(dict 행)를 Pydantic 모델로 다시 검증하지 않고 모델 필드만 골라 바로 직렬화
+  (response_model 은 API 문서용으로 그대로 두고, 라우트는 rows_response() 로 Response 를 반환)
+- orjson 이 설치되어 있으면 orjson, 없으면 표준 json 사용 (결과는 같음)
+- 성능 비교: python bench_serialization.py
+"""
+import functools
+import json
+from datetime import datetime, date, time
+from decimal import Decimal
+from time import perf_counter
+
+from fastapi.responses import JSONResponse
+
+from metrics import record_serialize
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    """orjson/json 이 직접 처리하지 못하는 DB 값 (SUM 등의 Decimal, 표준 json 의 날짜)"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    raise TypeError(f"JSON 으로 변환할 수 없는 값: {type(value).__name__}")
+
+
+def dumps(content):
+    """JSON bytes (Pydantic JSON 모드와 같은 형식: 날짜는 ISO 8601, 한글은 그대로)"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson 으로 직렬화하는 JSON 응답 (앱 기본 응답 클래스, 직렬화 시간은 Server-Timing 에 포함)"""
+
+    def render(self, content):
+        started = perf_counter()
+        body = dumps(content)
+        record_serialize(perf_counter() - started)
+        return body
+
+
+@functools.lru_cache(maxsize=None)
+def _fields(model):
+    """모델의 (필드 이름, 기본값) 목록 - 기본값이 없는 필드는 None"""
+    return tuple(
+        (name, None if field.is_required() else field.get_default(call_default_factory=True))
+        for name, field in model.model_fields.items()
+    )
+
+
+def parse_fields(fields, model):
+    """
+    fields 쿼리 파라미터 (쉼표 구분) -> 모델 순서의 필드 이름 튜플
+    - 지정하지 않으면 None (모든 필드), 모델에 없는 필드는 ValueError
+    """
+    if not fields:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = names - set(model.model_fields)
+    if unknown:
+        raise ValueError(f"알 수 없는 필드입니다: {', '.join(sorted(unknown))} (사용 가능: {', '.join(model.model_fields)})")
+    if not names:
+        return None
+    return tuple(name for name in model.model_fields if name in names)
+
+
+def project(row, model):
+    """
+    DB 행을 검증 없이 모델 필드만 가진 dict 로 변환 (response_model 과 같은 응답 형태)
+    - DB 가 돌려준 타입을 그대로 신뢰 (INT -> int, DATETIME -> datetime 등)
+    - 행에 없는 필드는 모델 기본값
+    """
+    if row is None:
+        return None
+    return {name: row.get(name, default) for name, default in _fields(model)}
+
+
+def project_rows(rows, model, fields=None):
+    """DB 행 목록 변환 (fields 를 지정하면 그 필드만)"""
+    selected = _fields(model)
+    if fields is not None:
+        selected = [(name, default) for name, default in selected if name in fields]
+    return [{name: row.get(name, default) for name, default in selected} for row in rows]
+
+
+def rows_response(rows, model, headers=None, fields=None):
+    """DB 행 목록을 검증 없이 model 필드(또는 fields)만 골라 바로 직렬화한 응답"""
+    return FastJSONResponse(project_rows(rows, model, fields), headers=headers)
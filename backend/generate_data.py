@@ -0,0 +1,367 @@
+"""
+대용량 테스트용 병원 데이터 CSV 생성 (부하/마이그레이션 테스트)
+
+사용법:
+    python generate_data.py --patients 1000000                     # data/generated/ 에 환자 100만명
+    python generate_data.py --patients 5000000 --workers 8 --out /tmp/hospital
+    python load_csv_to_db.py --data-dir data/generated              # 생성한 CSV 를 DB 에 적재
+
+- 같은 --seed, --end-date, 옵션이면 항상 같은 파일 (작업자 수와 무관)
+- 환자 CHUNK_PATIENTS 명 단위로 생성해 바로 파일에 쓰므로 행 수와 관계없이 메모리 사용량 일정
+- --workers 로 묶음을 여러 프로세스에서 나눠 생성하고 순서대로 이어 붙임
+- 성씨는 실제 분포(김/이/박 ...), 이름은 출생 연대와 성별에 맞춰 선택
+- 진료과는 departments.csv 의 활성 진료과, 진료과별 비중은 DEPARTMENT_WEIGHTS
+- 환자당 진료/예약 수는 파레토 분포 (대부분 적고 일부 만성 질환 환자가 매우 많음)
+"""
+import argparse
+import bisect
+import csv
+import itertools
+import os
+import random
+import shutil
+import sys
+import time
+from datetime import date, timedelta
+from multiprocessing import Pool
+
+DATA_DIR = "data"
+OUTPUT_DIR = os.path.join(DATA_DIR, "generated")
+# 한 묶음(난수 시드 단위)의 환자 수
+CHUNK_PATIENTS = 20000
+# 환자당 기록 수 분포의 꼬리 두께 (작을수록 긴 꼬리), 최대 기록 수
+HISTORY_ALPHA = 1.8
+MAX_HISTORY = 400
+
+# 성씨 비율 (%, 통계청 인구주택총조사 기준 근사)
+SURNAMES = [
+    ("김", 21.5), ("이", 14.7), ("박", 8.4), ("최", 4.7), ("정", 4.3), ("강", 2.4), ("조", 2.1), ("윤", 2.1),
+    ("장", 2.0), ("임", 1.7), ("한", 1.5), ("오", 1.5), ("서", 1.5), ("신", 1.4), ("권", 1.4), ("황", 1.4),
+    ("안", 1.4), ("송", 1.3), ("전", 1.1), ("홍", 1.1), ("유", 1.1), ("고", 0.9), ("문", 0.9), ("양", 0.9),
+    ("손", 0.9), ("배", 0.8), ("백", 0.8), ("허", 0.6), ("노", 0.5), ("남", 0.5), ("심", 0.5), ("하", 0.5),
+    ("곽", 0.4), ("성", 0.4), ("차", 0.4), ("주", 0.4), ("우", 0.4), ("구", 0.4), ("민", 0.3), ("류", 0.3),
+    ("나", 0.3), ("진", 0.3), ("지", 0.3), ("엄", 0.3), ("채", 0.3), ("원", 0.3), ("천", 0.2), ("방", 0.2),
+    ("공", 0.2), ("현", 0.2), ("남궁", 0.05), ("황보", 0.03), ("제갈", 0.01), ("선우", 0.01),
+]
+
+# (출생 연도 시작, 남자 이름, 여자 이름) - 연대별로 흔한 이름
+GIVEN_NAMES = [
+    (0, "영수 영호 영식 정수 상철 성수 광수 영철 종수 병철 용수 재철",
+        "영숙 정숙 순자 영자 영희 명숙 경숙 옥순 정희 춘자 말순 영순"),
+    (1960, "성호 정훈 성진 상훈 영진 동현 재현 준호 승호 현철 종훈 태호",
+           "미경 미숙 은정 은주 지영 현주 미영 경희 정미 선영 혜경 수정"),
+    (1980, "지훈 동현 성민 현우 준영 민수 상현 재민 승현 진우 우진 건우",
+           "지은 수진 민정 지혜 은지 혜진 유진 지현 수연 민지 예진 소영"),
+    (2000, "민준 서준 도윤 예준 시우 하준 주원 지호 지후 준우 도현 은우",
+           "서연 서윤 지우 서현 민서 하은 하윤 윤서 지유 채원 수아 지아"),
+]
+GIVEN_NAMES = [(year, male.split(), female.split()) for year, male, female in GIVEN_NAMES]
+
+# 진료과별 진료 비중 (없는 진료과는 DEFAULT_DEPARTMENT_WEIGHT)
+DEPARTMENT_WEIGHTS = {
+    "내과": 18, "정형외과": 11, "소아과": 9, "이비인후과": 9, "피부과": 7, "안과": 6, "소화기내과": 6,
+    "산부인과": 5, "신경과": 5, "외과": 5, "심장내과": 4, "호흡기내과": 4, "비뇨기과": 3, "정신과": 3,
+    "흉부외과": 1,
+}
+DEFAULT_DEPARTMENT_WEIGHT = 3
+
+DIAGNOSES = {
+    "내과": "급성 상기도염,위염,고혈압,당뇨병,고지혈증,빈혈,장염,정기검진",
+    "외과": "충수염,탈장,봉와직염,열상 봉합,담석증,치질",
+    "정형외과": "요통,허리디스크,무릎관절염,발목염좌,골절,오십견,회전근개파열,족저근막염",
+    "소아과": "감기,수족구병,장염,중이염,예방접종,모세기관지염,아토피",
+    "산부인과": "정기검진,질염,자궁근종,임신 확인,산전 진찰,갱년기 증상",
+    "이비인후과": "비염,축농증,중이염,편도선염,어지럼증,이명",
+    "안과": "결막염,안구건조증,백내장,녹내장,다래끼,시력검사",
+    "피부과": "아토피피부염,접촉성피부염,두드러기,여드름,대상포진,탈모,사마귀",
+    "신경과": "편두통,어지럼증,뇌졸중 추적관찰,말초신경병증,파킨슨병,치매초기",
+    "정신과": "우울증,불면증,불안장애,공황장애,ADHD",
+    "비뇨기과": "방광염,전립선비대증,요로결석,과민성방광",
+    "흉부외과": "기흉,하지정맥류,폐결절 추적관찰",
+    "심장내과": "부정맥,협심증,심부전,고혈압 추적관찰",
+    "호흡기내과": "천식,만성폐쇄성폐질환,폐렴,기관지염,만성기침",
+    "소화기내과": "역류성식도염,과민성대장증후군,지방간,위내시경,대장내시경,크론병",
+}
+DEFAULT_DIAGNOSES = "정기검진,경과 관찰,상담"
+DIAGNOSES = {name: diagnoses.split(",") for name, diagnoses in {**DIAGNOSES, "": DEFAULT_DIAGNOSES}.items()}
+
+PATIENT_COLUMNS = ("patient_no", "name", "birth_date", "gender", "phone")
+VISIT_COLUMNS = ("patient_no", "visit_date", "department", "doctor_name", "diagnosis", "status")
+APPOINTMENT_COLUMNS = ("patient_no", "appointment_date", "department", "doctor_name", "status")
+TABLES = (("patients", PATIENT_COLUMNS), ("visits", VISIT_COLUMNS), ("appointments", APPOINTMENT_COLUMNS))
+
+# 진료 시각 (10분 단위, 점심시간 제외), 예약 시각 (30분 슬롯, 진료 시간표 기본값)
+VISIT_TIMES = [f" {m // 60:02d}:{m % 60:02d}:00" for m in range(9 * 60, 18 * 60, 10) if not 12 * 60 <= m < 13 * 60]
+SLOT_TIMES = [f" {m // 60:02d}:{m % 60:02d}:00" for m in range(9 * 60, 18 * 60, 30) if not 12 * 60 <= m < 13 * 60]
+# 마지막 날짜 이후 예약 기간 (일)
+APPOINTMENT_AHEAD_DAYS = 90
+
+class _Weighted:
+    """가중치 목록에서 빠르게 뽑기 (누적 가중치 이진 탐색)"""
+
+    def __init__(self, items, weights):
+        self.items = list(items)
+        self._cumulative = list(itertools.accumulate(weights))
+        self._total = self._cumulative[-1]
+
+    def pick(self, rng):
+        return self.items[bisect.bisect_right(self._cumulative, rng.random() * self._total)]
+
+
+_GIVEN_NAME_YEARS = [year for year, _, _ in GIVEN_NAMES]
+_SURNAMES = _Weighted([name for name, _ in SURNAMES], [weight for _, weight in SURNAMES])
+
+
+def korean_name(rng, birth_year, gender):
+    """성씨 분포와 출생 연대/성별에 맞는 이름"""
+    index = bisect.bisect_right(_GIVEN_NAME_YEARS, birth_year) - 1
+    _, male, female = GIVEN_NAMES[max(index, 0)]
+    names = male if gender == "M" else female
+    return _SURNAMES.pick(rng) + names[int(rng.random() * len(names))]
+
+
+def history_count(rng, mean):
+    """환자당 기록 수 (평균 mean 인 파레토 분포, 긴 꼬리)"""
+    if mean <= 0:
+        return 0
+    count = int((rng.paretovariate(HISTORY_ALPHA) - 1) * (HISTORY_ALPHA - 1) * mean + 0.5)
+    return min(count, MAX_HISTORY)
+
+
+def load_departments(path):
+    """departments.csv 의 활성 진료과 이름 목록"""
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        return [
+            row['dept_name'].strip() for row in csv.DictReader(file)
+            if (row.get('is_active') or "1").strip() in ("1", "true", "True")
+        ]
+
+
+def make_doctors(departments, seed):
+    """진료과별 담당의 이름 (진료 비중이 클수록 많이, 같은 seed 면 같은 이름)"""
+    rng = random.Random(seed)
+    doctors = {}
+    for department in departments:
+        count = max(2, DEPARTMENT_WEIGHTS.get(department, DEFAULT_DEPARTMENT_WEIGHT) // 2)
+        names = set()
+        while len(names) < count:
+            gender = rng.choice("MF")
+            names.add(korean_name(rng, rng.randrange(1960, 1992), gender))
+        doctors[department] = sorted(names)
+    return doctors
+
+
+class Generator:
+    """환자 번호 구간별 환자/진료/예약 행 생성 (묶음마다 독립된 난수 시드)"""
+
+    def __init__(self, departments, args):
+        self.args = args
+        self.end = args.end_date
+        self.start = self.end - timedelta(days=365 * args.years)
+        self.departments = departments
+        self.doctors = make_doctors(departments, args.seed)
+        weights = [DEPARTMENT_WEIGHTS.get(name, DEFAULT_DEPARTMENT_WEIGHT) for name in departments]
+        self._all = _Weighted(departments, weights)
+        # 여성 환자만 산부인과, 15세 미만은 소아과 위주
+        self._female = self._all
+        self._male = _Weighted(*zip(*[(n, w) for n, w in zip(departments, weights) if n != "산부인과"]))
+        self._child = "소아과" if "소아과" in departments else None
+
+        # 날짜 문자열은 미리 만들어 둠 (등록 시작일 기준 일수 -> 문자열, 일요일은 휴진이라 월요일로)
+        self._span = (self.end - self.start).days
+        self._end_day = self.end.isoformat()
+        self._years = []
+        self._visit_days = []
+        self._appointment_days = []
+        for offset in range(self._span + APPOINTMENT_AHEAD_DAYS + 1):
+            day = self.start + timedelta(days=offset)
+            self._years.append(day.year)
+            if day.weekday() == 6:
+                day += timedelta(days=1)
+            self._appointment_days.append(day.isoformat())
+            self._visit_days.append(min(day, self.end).isoformat())
+
+    def _department(self, rng, gender, age):
+        if self._child and age < 15 and rng.random() < 0.7:
+            return self._child
+        return (self._female if gender == "F" else self._male).pick(rng)
+
+    def chunk(self, number):
+        """number 번째 묶음의 (환자 행, 진료 행, 예약 행) 목록"""
+        args = self.args
+        rng = random.Random(args.seed * 1_000_003 + number)
+        # 행마다 여러 번 호출하므로 choice/randrange 대신 random() 으로 직접 인덱싱
+        rand = rng.random
+        first = number * CHUNK_PATIENTS + 1
+        last = min(first + CHUNK_PATIENTS, args.patients + 1)
+        span = self._span
+        doctors = self.doctors
+        visit_days, appointment_days, end_day = self._visit_days, self._appointment_days, self._end_day
+        patients, visits, appointments = [], [], []
+
+        for index in range(first, last):
+            # 환자번호 순서대로 등록일이 늘어나도록 (P + 등록 연도 + 일련번호)
+            registered = int(span * (index - 1) / args.patients)
+            age = min(int(rng.triangular(0, 95, 50)), 100)
+            born = span - age * 365 - int(rand() * 365)
+            birth = self.start + timedelta(days=born)
+            gender = "F" if rand() < 0.52 else "M"
+            patient_no = f"P{self._years[registered]}{index:07d}"
+            patients.append((
+                patient_no, korean_name(rng, birth.year, gender), birth.isoformat(), gender,
+                f"010-{int(rand() * 10000):04d}-{int(rand() * 10000):04d}",
+            ))
+
+            # 자주 다니는 진료과/담당의 (기록의 60% 는 같은 곳)
+            usual = self._department(rng, gender, age)
+            usual_doctors = doctors[usual]
+            usual_doctor = usual_doctors[int(rand() * len(usual_doctors))]
+            first_day = max(registered, born)
+            days = span - first_day + 1
+
+            history = []
+            for _ in range(history_count(rng, args.visits)):
+                department = usual if rand() < 0.6 else self._department(rng, gender, age)
+                if department == usual:
+                    doctor = usual_doctor
+                else:
+                    doctor = doctors[department][int(rand() * len(doctors[department]))]
+                day = visit_days[first_day + int(rand() * days)]
+                status = ("대기", "진료중", "완료")[int(rand() * 3)] if day == end_day else "완료"
+                diagnoses = DIAGNOSES.get(department, DIAGNOSES[""])
+                history.append((day + VISIT_TIMES[int(rand() * len(VISIT_TIMES))], department, doctor,
+                                diagnoses[int(rand() * len(diagnoses))], status))
+            history.sort()
+            visits.extend((patient_no, *visit) for visit in history)
+
+            history = []
+            for _ in range(history_count(rng, args.appointments)):
+                department = usual if rand() < 0.6 else self._department(rng, gender, age)
+                if department == usual:
+                    doctor = usual_doctor
+                else:
+                    doctor = doctors[department][int(rand() * len(doctors[department]))]
+                day = appointment_days[first_day + int(rand() * (days + APPOINTMENT_AHEAD_DAYS))]
+                if day > end_day:
+                    status = "취소" if rand() < 0.08 else "예약"
+                else:
+                    status = "취소" if rand() < 0.12 else "완료"
+                history.append((day + SLOT_TIMES[int(rand() * len(SLOT_TIMES))], department, doctor, status))
+            history.sort()
+            appointments.extend((patient_no, *appointment) for appointment in history)
+
+        return patients, visits, appointments
+
+
+# 작업자 프로세스 전역 (Pool initializer 에서 설정)
+_generator = None
+_parts_dir = None
+
+
+def _init_worker(departments, args, parts_dir):
+    global _generator, _parts_dir
+    _generator = Generator(departments, args)
+    _parts_dir = parts_dir
+
+
+def _write_rows(path, rows, header=None, mode="w"):
+    with open(path, mode, encoding="utf-8", newline="") as file:
+        writer = csv.writer(file, lineterminator="\n")
+        if header:
+            writer.writerow(header)
+        writer.writerows(rows)
+
+
+def _generate_part(number):
+    """묶음 하나를 임시 파일에 쓰고 (묶음 번호, 테이블별 행 수) 반환"""
+    counts = []
+    for (table, _), rows in zip(TABLES, _generator.chunk(number)):
+        _write_rows(os.path.join(_parts_dir, f"{table}.{number:06d}.csv"), rows)
+        counts.append(len(rows))
+    return number, counts
+
+
+def generate(departments, args):
+    """CSV 생성, 테이블별 행 수 반환"""
+    os.makedirs(args.out, exist_ok=True)
+    chunks = (args.patients + CHUNK_PATIENTS - 1) // CHUNK_PATIENTS
+    totals = [0, 0, 0]
+    started = time.perf_counter()
+
+    outputs = [open(os.path.join(args.out, f"{table}.csv"), "w", encoding="utf-8", newline="")
+               for table, _ in TABLES]
+    parts_dir = os.path.join(args.out, ".parts")
+    try:
+        for output, (_, columns) in zip(outputs, TABLES):
+            csv.writer(output, lineterminator="\n").writerow(columns)
+
+        def report(number, counts):
+            for index, count in enumerate(counts):
+                totals[index] += count
+            done = min((number + 1) * CHUNK_PATIENTS, args.patients)
+            if number % 25 == 24 or number == chunks - 1:
+                elapsed = time.perf_counter() - started
+                print(f"  환자 {done:,}명 (진료 {totals[1]:,}, 예약 {totals[2]:,}건, "
+                      f"{sum(totals) / elapsed:,.0f}행/초)")
+
+        if args.workers <= 1:
+            generator = Generator(departments, args)
+            for number in range(chunks):
+                rows = generator.chunk(number)
+                for output, table_rows in zip(outputs, rows):
+                    csv.writer(output, lineterminator="\n").writerows(table_rows)
+                report(number, [len(table_rows) for table_rows in rows])
+        else:
+            os.makedirs(parts_dir, exist_ok=True)
+            with Pool(args.workers, initializer=_init_worker, initargs=(departments, args, parts_dir)) as pool:
+                # 완료 순서와 관계없이 묶음 번호 순서대로 이어 붙임 (imap 은 순서 유지)
+                for number, counts in pool.imap(_generate_part, range(chunks)):
+                    for output, (table, _) in zip(outputs, TABLES):
+                        part = os.path.join(parts_dir, f"{table}.{number:06d}.csv")
+                        with open(part, "r", encoding="utf-8", newline="") as file:
+                            shutil.copyfileobj(file, output)
+                        os.remove(part)
+                    report(number, counts)
+    finally:
+        for output in outputs:
+            output.close()
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대용량 테스트용 병원 데이터 CSV 생성")
+    parser.add_argument("--patients", type=int, default=100000, help="환자 수")
+    parser.add_argument("--visits", type=float, default=5.0, help="환자당 평균 진료 수")
+    parser.add_argument("--appointments", type=float, default=1.5, help="환자당 평균 예약 수")
+    parser.add_argument("--years", type=int, default=10, help="환자 등록 기간 (마지막 날짜 이전 연수)")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date.today(),
+                        help="마지막 진료 날짜 YYYY-MM-DD (기본: 오늘, 같은 파일을 다시 만들려면 지정)")
+    parser.add_argument("--seed", type=int, default=42, help="난수 시드")
+    parser.add_argument("--workers", type=int, default=1, help="생성 프로세스 수")
+    parser.add_argument("--departments", default=os.path.join(DATA_DIR, "departments.csv"), help="진료과 CSV")
+    parser.add_argument("--out", default=OUTPUT_DIR, help="출력 폴더")
+    args = parser.parse_args()
+
+    if args.patients < 1:
+        print("✗ --patients 는 1 이상이어야 합니다")
+        return 2
+    departments = load_departments(args.departments)
+    if not departments:
+        print(f"✗ 활성 진료과가 없습니다 ({args.departments})")
+        return 2
+
+    print(f"=== 데이터 생성: 환자 {args.patients:,}명, 환자당 진료 {args.visits}, 예약 {args.appointments}건 평균 ===")
+    print(f"seed {args.seed}, 마지막 날짜 {args.end_date}, 진료과 {len(departments)}개, 작업자 {args.workers}")
+    started = time.perf_counter()
+    patients, visits, appointments = generate(departments, args)
+    elapsed = time.perf_counter() - started
+    total = patients + visits + appointments
+    print(f"\n✓ 환자 {patients:,}명, 진료 {visits:,}건, 예약 {appointments:,}건 -> {args.out}")
+    print(f"  {total:,}행 / {elapsed:.1f}초 = {total / elapsed:,.0f}행/초")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import os
+import uuid
+from collections import deque
+from datetime import datetime, date
+
+# 재연결 시 다시 보내줄 수 있도록 보관하는 최근 이벤트 수
+LIVE_FEED_HISTORY = int(os.getenv('LIVE_FEED_HISTORY', 1000))
+# 구독자별 미전송 이벤트 한도 (넘으면 연결을 끊고 재연결 시 이어받게 함)
+LIVE_FEED_QUEUE_SIZE = int(os.getenv('LIVE_FEED_QUEUE_SIZE', 256))
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+class LiveFeed:
+    """
+    대시보드 실시간 이벤트 발행기
+    - 등록 API 가 publish() 한 이벤트를 모든 구독자(SSE 연결)에게 전달
+    - 최근 이벤트를 보관해 재연결 시 Last-Event-ID 이후부터 이어서 전달
+    - 이벤트 ID 는 '<서버 실행 ID>-<순번>' 형식 (서버 재시작 후의 재연결을 구분)
+    """
+
+    def __init__(self, history=LIVE_FEED_HISTORY, queue_size=LIVE_FEED_QUEUE_SIZE):
+        self._epoch = uuid.uuid4().hex[:8]
+        self._events = deque(maxlen=history)
+        self._next_seq = 1
+        self._queue_size = queue_size
+        self._subscribers = set()
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    @property
+    def last_seq(self):
+        """마지막으로 발행한 이벤트 순번 (없으면 0)"""
+        return self._next_seq - 1
+
+    def _event_id(self, seq):
+        return f"{self._epoch}-{seq}"
+
+    def publish(self, event_type, data):
+        """이벤트 발행 (이벤트 루프 스레드에서 호출)"""
+        event = (self._next_seq, event_type, json.dumps(data, ensure_ascii=False, default=_json_default))
+        self._next_seq += 1
+        self._events.append(event)
+
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # 너무 느린 구독자는 밀린 이벤트를 버리고 종료 신호(None)를 넣어 끊음
+                # (재연결하면 마지막으로 받은 이벤트 이후부터 보관분을 이어받음)
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def subscribe(self, last_event_id=None):
+        """
+        구독 시작
+        - (큐, 놓친 이벤트 목록) 반환
+        - 놓친 이벤트를 이어줄 수 없으면(서버 재시작, 보관 범위 초과) 목록 대신 None
+        """
+        queue = asyncio.Queue(maxsize=self._queue_size)
+        self._subscribers.add(queue)
+
+        if not last_event_id:
+            return queue, []
+
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self._epoch or not seq.isdigit():
+            return queue, None
+
+        seq = int(seq)
+        oldest = self._events[0][0] if self._events else self._next_seq
+        if seq + 1 < oldest:
+            return queue, None
+        return queue, [event for event in self._events if event[0] > seq]
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def format(self, event):
+        """SSE 형식 문자열로 변환"""
+        seq, event_type, payload = event
+        return f"id: {self._event_id(seq)}\nevent: {event_type}\ndata: {payload}\n\n"
+
+    def format_untracked(self, event_type, data):
+        """재전송 대상이 아닌 이벤트 (snapshot, reset) 를 SSE 형식으로 변환"""
+        payload = json.dumps(data, ensure_ascii=False, default=_json_default)
+        return f"event: {event_type}\ndata: {payload}\n\n"
+
+
+# 모든 연결이 공유하는 이벤트 발행기
+live_feed = LiveFeed()
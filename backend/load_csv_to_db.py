@@ -0,0 +1,281 @@
+"""
+CSV 데이터를 MySQL 에 직접 적재 (대용량 초기 적재용)
+
+사용법:
+    python load_csv_to_db.py                         # data/ 의 환자, 진료, 예약 CSV 적재
+    python load_csv_to_db.py --tables visits         # 특정 테이블만
+    python load_csv_to_db.py --reset                 # 진행 위치를 지우고 처음부터
+    python load_csv_to_db.py --data-dir data/generated --reset   # generate_data.py 로 만든 CSV
+
+- 배치 단위 다중 행 INSERT, 배치마다 진행 위치(csv_load_checkpoints)를 같은 트랜잭션에 기록
+  -> 중단 후 다시 실행하면 마지막으로 커밋된 배치 다음 행부터 이어서 적재
+- patient_no -> patient_id 변환은 시작 시 한 번의 조회로 만든 메모리 맵 사용
+- 거부된 행은 --rejects 파일(CSV)에 사유와 함께 기록
+- 적재 전에 기준 정보(진료과, 진료 시간표)를 seed_data.py 와 같이 반영
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+from bulk_insert import RowError, patient_values, parse_datetime, optional_text, insert_many
+from database import get_db_connection, run_transaction, execute_single_query
+from departments import seed_doctors
+from seed_data import seed as seed_reference_data
+from patient_summary import rebuild as rebuild_summary
+from migrations import migrate
+
+DATA_DIR = "data"
+BATCH_SIZE = 5000
+REJECTS_FILE = "load_rejects.csv"
+# 진행 상황 출력 간격 (배치 수)
+PROGRESS_EVERY = 20
+
+TABLES = ("patients", "visits", "appointments")
+
+
+class RejectLog:
+    """거부된 행을 CSV 로 기록"""
+
+    def __init__(self, path):
+        exists = os.path.exists(path)
+        self._file = open(path, "a", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        if not exists:
+            self._writer.writerow(["source", "line", "reason", "row"])
+        self.count = 0
+
+    def write(self, source, line, reason, row):
+        self._writer.writerow([source, line, reason, json.dumps(row, ensure_ascii=False)])
+        self.count += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def load_patient_map():
+    """patient_no -> patient_id 맵 (스트리밍 커서로 한 번에 조회)"""
+    connection = get_db_connection()
+    if connection is None:
+        raise RuntimeError("데이터베이스 연결 실패")
+    cursor = None
+    try:
+        cursor = connection.cursor(buffered=False)
+        cursor.execute("SELECT patient_no, patient_id FROM patients")
+        mapping = {}
+        while True:
+            rows = cursor.fetchmany(50000)
+            if not rows:
+                break
+            mapping.update(rows)
+        return mapping
+    finally:
+        if cursor is not None:
+            cursor.close()
+        connection.close()
+
+
+def get_checkpoint(source):
+    row = execute_single_query(
+        "SELECT rows_done FROM csv_load_checkpoints WHERE source = %s", (source,)
+    )
+    return row['rows_done'] if row else 0
+
+
+def reset_checkpoints(sources):
+    def _reset(cursor):
+        cursor.executemany("DELETE FROM csv_load_checkpoints WHERE source = %s", [(s,) for s in sources])
+    run_transaction(_reset)
+
+
+def _write_batch(cursor, insert_head, values, source, rows_done):
+    """배치 INSERT 와 진행 위치 기록을 한 트랜잭션에서 수행"""
+    inserted = 0
+    if values:
+        inserted = insert_many(cursor, insert_head, len(values[0]), values)
+    cursor.execute(
+        """
+        INSERT INTO csv_load_checkpoints (source, rows_done) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE rows_done = VALUES(rows_done)
+        """,
+        (source, rows_done)
+    )
+    return inserted
+
+
+def load_file(path, source, insert_head, convert, batch_size, rejects):
+    """
+    CSV 1개 적재
+    - insert_head 는 VALUES 앞까지의 INSERT 문
+    - convert(row) 는 INSERT 값 튜플을 반환하거나 RowError 발생
+    - 체크포인트 이후 행부터 읽어 batch_size 씩 커밋
+    """
+    done = get_checkpoint(source)
+    started = time.perf_counter()
+    read = inserted = rejected = batches = 0
+
+    print(f"\n=== {source} 적재 시작 ({path}) ===")
+    if done:
+        print(f"○ 이전 진행 위치부터 이어서 적재: {done:,}행 건너뜀")
+
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        reader = csv.DictReader(file)
+        rows = itertools.islice(reader, done, None)
+
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+
+            values = []
+            for offset, row in enumerate(batch):
+                try:
+                    values.append(convert(row))
+                except RowError as e:
+                    # 헤더가 1행이므로 데이터 행 번호는 +2
+                    rejects.write(source, done + read + offset + 2, str(e), row)
+                    rejected += 1
+
+            read += len(batch)
+            inserted += run_transaction(_write_batch, insert_head, values, source, done + read)
+            rejects.flush()
+            batches += 1
+
+            if batches % PROGRESS_EVERY == 0:
+                elapsed = time.perf_counter() - started
+                print(f"  {done + read:,}행 처리 ({read / elapsed:,.0f}행/초)")
+
+    elapsed = time.perf_counter() - started
+    rate = read / elapsed if elapsed > 0 else 0.0
+    skipped = read - inserted - rejected
+    print(f"{source} 적재 완료: 읽음 {read:,}행, 추가 {inserted:,}행, 중복 {skipped:,}행, 거부 {rejected:,}행")
+    print(f"처리 속도: {read:,}행 / {elapsed:.2f}초 = {rate:,.0f}행/초")
+    return inserted
+
+
+def load_patients(data_dir, batch_size, rejects):
+    # 이미 있는 환자번호는 건너뜀 (INSERT IGNORE)
+    return load_file(
+        os.path.join(data_dir, "patients.csv"), "patients.csv",
+        "INSERT IGNORE INTO patients (patient_no, name, birth_date, gender, phone)",
+        patient_values, batch_size, rejects
+    )
+
+
+def _patient_resolver(patient_map):
+    """CSV 행의 patient_no (없으면 patient_id) 를 patient_id 로 변환하는 함수"""
+    known_ids = set(patient_map.values())
+
+    def resolve(row):
+        patient_no = (row.get('patient_no') or "").strip()
+        if patient_no:
+            patient_id = patient_map.get(patient_no)
+            if patient_id is None:
+                raise RowError(f"존재하지 않는 환자번호입니다: {patient_no}")
+            return patient_id
+        try:
+            patient_id = int(row.get('patient_id') or "")
+        except ValueError:
+            raise RowError("patient_no 또는 patient_id 값이 필요합니다")
+        if patient_id not in known_ids:
+            raise RowError(f"존재하지 않는 환자입니다: {patient_id}")
+        return patient_id
+
+    return resolve
+
+
+def load_visits(data_dir, batch_size, rejects, patient_map):
+    resolve = _patient_resolver(patient_map)
+
+    def convert(row):
+        return (
+            resolve(row),
+            parse_datetime(row.get('visit_date'), 'visit_date'),
+            optional_text(row, 'department', 30),
+            optional_text(row, 'doctor_name', 30),
+            optional_text(row, 'diagnosis'),
+            optional_text(row, 'status', 10) or '완료'
+        )
+
+    return load_file(
+        os.path.join(data_dir, "visits.csv"), "visits.csv",
+        "INSERT INTO visits (patient_id, visit_date, department, doctor_name, diagnosis, status)",
+        convert, batch_size, rejects
+    )
+
+
+def load_appointments(data_dir, batch_size, rejects, patient_map):
+    resolve = _patient_resolver(patient_map)
+
+    def convert(row):
+        return (
+            resolve(row),
+            parse_datetime(row.get('appointment_date'), 'appointment_date'),
+            optional_text(row, 'department', 30),
+            optional_text(row, 'doctor_name', 30),
+            optional_text(row, 'status', 10) or '예약'
+        )
+
+    return load_file(
+        os.path.join(data_dir, "appointments.csv"), "appointments.csv",
+        "INSERT INTO appointments (patient_id, appointment_date, department, doctor_name, status)",
+        convert, batch_size, rejects
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV 데이터를 MySQL 에 직접 적재")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="CSV 파일 폴더")
+    parser.add_argument("--tables", nargs="+", choices=TABLES, default=list(TABLES), help="적재할 테이블")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="트랜잭션당 행 수")
+    parser.add_argument("--rejects", default=REJECTS_FILE, help="거부된 행을 기록할 CSV 파일")
+    parser.add_argument("--reset", action="store_true", help="진행 위치를 지우고 처음부터 적재")
+    parser.add_argument("--skip-summary", action="store_true", help="진료 요약 재계산 생략")
+    args = parser.parse_args()
+
+    migrate()
+    tables = [table for table in TABLES if table in args.tables]
+    if args.reset:
+        reset_checkpoints([f"{table}.csv" for table in tables])
+        print("○ 진행 위치 초기화")
+
+    departments, work_hours = run_transaction(seed_reference_data)
+    print(f"✓ 기준 정보 반영: 진료과 {departments}건, 진료 시간표 {work_hours}건")
+
+    rejects = RejectLog(args.rejects)
+    started = time.perf_counter()
+    try:
+        if "patients" in tables:
+            load_patients(args.data_dir, args.batch_size, rejects)
+
+        if "visits" in tables or "appointments" in tables:
+            patient_map = load_patient_map()
+            print(f"\n○ 환자번호 맵 적재: {len(patient_map):,}명")
+            if "visits" in tables:
+                load_visits(args.data_dir, args.batch_size, rejects, patient_map)
+                if not args.skip_summary:
+                    count = rebuild_summary()
+                    print(f"✓ 진료 요약 재계산: {count:,}명")
+            if "appointments" in tables:
+                load_appointments(args.data_dir, args.batch_size, rejects, patient_map)
+            # CSV 에만 있던 담당의를 doctors 테이블에 등록 (예약 가능 시간 조회/진료과 캐시용)
+            run_transaction(seed_doctors)
+            print("✓ 담당의 등록")
+    finally:
+        rejects.close()
+
+    print(f"\n전체 소요 시간: {time.perf_counter() - started:.2f}초")
+    if rejects.count:
+        print(f"✗ 거부된 행 {rejects.count:,}건 -> {args.rejects}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,35 +1,197 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from typing import Optional
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
+from fast_json import FastJSONResponse
+from compression import CompressionMiddleware
+from metrics import TimingMiddleware
+from profiling import ProfilingMiddleware
 
 # 라우터 import
-from routes import patients, visits, appointments
+from routes import patients, visits, appointments, departments, admin
 
 # 환경변수 로드
 load_dotenv()
 
+# 실시간 피드 keep-alive 전송 간격 (초)
+LIVE_FEED_KEEPALIVE = float(os.getenv('LIVE_FEED_KEEPALIVE', 15))
+
 # FastAPI 앱 생성
 app = FastAPI(
     title="병원 환자 조회 시스템 API",
     description="환자 정보, 진료 기록, 예약 관리를 위한 RESTful API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse  # orjson 직렬화 (fast_json.py)
 )
 
+# 쓰기 요청 후 이 기한(서버 시각, epoch 초)까지 클라이언트가 다시 보내면 읽기도 주 DB 사용
+PRIMARY_UNTIL_HEADER = "X-DB-Primary-Until"
+
+def _wants_primary(request):
+    """직전 쓰기 결과를 읽어야 하는 요청인지 (X-DB-Primary-Until 기한 내)"""
+    try:
+        return float(request.headers.get(PRIMARY_UNTIL_HEADER, 0)) > time.time()
+    except ValueError:
+        return False
+
+# 읽기/쓰기 분리: GET 요청의 조회 쿼리는 복제 DB, 그 외 요청과 쓰기 직후 읽기는 주 DB
+@app.middleware("http")
+async def route_reads(request: Request, call_next):
+    from database import replicas, use_replica_reads, reset_replica_reads, REPLICA_MAX_LAG
+    
+    if not replicas.replicas:
+        return await call_next(request)
+    
+    if request.method in ("GET", "HEAD"):
+        token = use_replica_reads(not _wants_primary(request))
+        try:
+            return await call_next(request)
+        finally:
+            reset_replica_reads(token)
+    
+    response = await call_next(request)
+    if response.status_code < 400:
+        # 복제 지연 허용치 동안은 이 클라이언트의 읽기를 주 DB 로 보내 방금 쓴 내용을 보장
+        response.headers[PRIMARY_UNTIL_HEADER] = f"{time.time() + REPLICA_MAX_LAG:.3f}"
+    return response
+
+# 조회 응답 캐시: ETag / If-None-Match 304 / 변경되지 않은 응답은 라우트 실행 없이 반환
+@app.middleware("http")
+async def cache_responses(request: Request, call_next):
+    from response_cache import response_cache, etag_matches, make_etag
+    from database import track_replica_reads, reset_replica_read_log
+    
+    policy = response_cache.policy(request.url.path) if request.method == "GET" else None
+    if policy is None:
+        return await call_next(request)
+    
+    keys, cache_control = policy
+    url = request.url.path + ("?" + request.url.query if request.url.query else "")
+    if_none_match = request.headers.get("if-none-match")
+    
+    # 쓰기 직후 읽기는 저장된 응답을 쓰지 않고 새로 조회
+    token = None
+    if _wants_primary(request):
+        entry, versions = None, await response_cache.versions(keys)
+    else:
+        entry, versions = await response_cache.lookup(url, keys)
+        if entry is None:
+            # 같은 응답을 다른 요청/워커가 만드는 중이면 기다렸다가 그 결과 사용
+            entry, token, versions = await response_cache.lock_or_wait(url, keys)
+    
+    if entry is not None:
+        headers = {"ETag": entry.etag, "Cache-Control": cache_control}
+        if etag_matches(if_none_match, entry.etag):
+            response_cache.record_not_modified()
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+    
+    # 버전은 라우트 실행 전에 읽어 두어야 실행 중 변경된 응답을 최신으로 저장하지 않음
+    log_token, replica_reads = track_replica_reads()
+    try:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        media_type = response.headers.get("content-type")
+        if replica_reads[0]:
+            # 복제 DB 결과는 주 DB 의 현재 버전보다 오래되었을 수 있으므로 저장하지 않고 ETag 만 계산
+            etag = make_etag(body)
+        else:
+            etag = await response_cache.store(url, versions, body, media_type)
+    finally:
+        reset_replica_read_log(log_token)
+        if token is not None:
+            await response_cache.unlock(url, token)
+    
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(if_none_match, etag):
+        response_cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+# 응답 압축 (brotli/gzip, COMPRESSION_MIN_SIZE 이상) - 지점 회선에서 응답 크기가 지연 시간을 좌우
+# 캐시 미들웨어보다 바깥이므로 캐시에는 압축 전 본문 저장, ETag 는 약한 ETag 라 압축 후에도 유효
+app.add_middleware(CompressionMiddleware)
+
+# 요청별 시간 측정 (라우트별 응답 시간, Server-Timing 헤더) - 압축/캐시 시간까지 포함하도록 그 바깥
+app.add_middleware(TimingMiddleware)
+
+# 요청 수로 프로파일할 때 대상 요청 처리 중에만 수집 (프로파일 중이 아니면 그대로 전달)
+app.add_middleware(ProfilingMiddleware)
+
 # CORS 설정 (프론트엔드와 통신을 위해)
+# 마지막에 추가해야 가장 바깥에서 실행되어 캐시가 바로 반환한 응답에도 CORS 헤더가 붙음
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # 실제 배포시에는 특정 도메인만 허용
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 목록 API 다음 페이지 커서, 쓰기 후 주 DB 읽기 기한, 요청 처리 시간 구성
+    expose_headers=["X-Next-Cursor", "X-DB-Primary-Until", "Server-Timing"],
 )
 
 # 라우터 등록
 app.include_router(patients.router)
 app.include_router(visits.router)
 app.include_router(appointments.router)
+app.include_router(departments.router)
+app.include_router(admin.router)
+
+# 서버 시작 시 커넥션 풀 미리 채우고 스키마 마이그레이션 적용, 새 DB 면 기준 정보 적재
+@app.on_event("startup")
+async def warm_up_pool():
+    from database import pool, run_in_db_thread
+    from migrations import migrate, MIGRATE_ON_STARTUP
+    from seed_data import seed_if_empty, SEED_ON_STARTUP
+    
+    try:
+        await run_in_db_thread(pool.fill)
+        if MIGRATE_ON_STARTUP:
+            applied = await run_in_db_thread(migrate)
+            if applied:
+                print(f"스키마 마이그레이션 적용: {applied}")
+        if SEED_ON_STARTUP:
+            # 새 DB 면 기준 정보(진료과, 진료 시간표) 적재 - 없으면 진료/예약 등록이 모두 진료과 검증에 실패
+            seeded = await run_in_db_thread(seed_if_empty)
+            if seeded:
+                print(f"기준 정보 적재: 진료과 {seeded[0]}건, 진료 시간표 {seeded[1]}건")
+    except Exception as e:
+        print(f"DB 초기화 실패 (요청 시 재시도): {e}")
+
+# 환자명 검색 색인은 요청 처리를 막지 않도록 백그라운드에서 적재
+@app.on_event("startup")
+async def load_search_index():
+    from database import run_in_db_thread
+    from search_index import patient_index
+    
+    app.state.search_index_task = asyncio.create_task(run_in_db_thread(patient_index.refresh))
+
+# 진료과별 대기열은 시작 시 DB 에서 만들고 백그라운드에서 주기적으로 다시 만듦
+@app.on_event("startup")
+async def load_visit_queue():
+    from visit_queue import keep_queue_fresh
+    
+    app.state.visit_queue_task = asyncio.create_task(keep_queue_fresh())
+
+# 서버 종료 시 유휴 커넥션(DB, 캐시 서버) 정리
+@app.on_event("shutdown")
+async def close_pool():
+    from database import pool, replicas, shutdown_executor
+    from cache_backend import cache
+    
+    app.state.visit_queue_task.cancel()
+    app.state.search_index_task.cancel()
+    shutdown_executor()
+    pool.close_all()
+    replicas.close_all()
+    cache.close()
 
 # 루트 엔드포인트
 @app.get("/")
@@ -44,16 +206,97 @@ async def root():
 # 헬스 체크 엔드포인트
 @app.get("/health")
 async def health_check():
-    from database import get_db_connection
+    from database import get_db_connection, run_in_db_thread
     
     # DB 연결 테스트
-    conn = get_db_connection()
+    conn = await run_in_db_thread(get_db_connection)
     if conn:
-        conn.close()
+        await run_in_db_thread(conn.close)
         return {"status": "healthy", "database": "connected"}
     else:
         raise HTTPException(status_code=503, detail="Database connection failed")
 
+# 커넥션 풀 통계 (풀 크기 조정용)
+@app.get("/health/pool")
+async def pool_stats():
+    from database import get_pool_stats
+    from response_cache import response_cache
+    from visit_queue import visit_queue
+    
+    return {**get_pool_stats(), "response_cache": response_cache.stats(), "visit_queue": visit_queue.stats()}
+
+# Prometheus 수집용 메트릭 (라우트별 응답 시간, 쿼리 시간/행 수, 커넥션 대여 시간, 풀 상태)
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    from database import get_pool_metrics
+    from metrics import render
+    
+    return Response(content=render(get_pool_metrics()), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# 느린 쿼리 집계 (정규화 SQL 별 횟수/총 시간/최대 시간, 총 시간 순)
+@app.get("/metrics/slow-queries")
+async def slow_queries():
+    from metrics import slow_query_log, SLOW_QUERY_MS
+    
+    return {"threshold_ms": SLOW_QUERY_MS, "queries": slow_query_log.summary()}
+
+# 실시간 대시보드 피드 (Server-Sent Events)
+@app.get("/api/live")
+async def live_dashboard_feed(
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    resume: Optional[str] = Query(None, description="마지막으로 받은 이벤트 ID (Last-Event-ID 헤더 대신 사용 가능)")
+):
+    """
+    통계 변화(stats), 새 진료(visit), 새 예약(appointment) 이벤트 스트림
+    - 연결 직후 현재 통계를 snapshot 이벤트로 전달 (snapshot 이전의 stats 이벤트는 생략)
+    - 재연결 시 Last-Event-ID 이후의 이벤트를 이어서 전달, 이어줄 수 없으면 reset 이벤트
+    """
+    from live_feed import live_feed
+    from stats_service import today_stats
+    
+    queue, backlog = live_feed.subscribe(resume or last_event_id)
+    
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            if backlog is None:
+                yield live_feed.format_untracked("reset", {})
+            
+            # snapshot 에 이미 반영된 통계 변화(stats)는 다시 보내지 않음 (클라이언트가 두 번 더하지 않도록)
+            covered = 0
+            stats = await today_stats.get()
+            if stats is not None:
+                covered = live_feed.last_seq
+                yield live_feed.format_untracked("snapshot", stats)
+            
+            def in_snapshot(event):
+                return event[1] == "stats" and event[0] <= covered
+            
+            for event in backlog or []:
+                if not in_snapshot(event):
+                    yield live_feed.format(event)
+            
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=LIVE_FEED_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # 프록시가 유휴 연결을 끊지 않도록 주석 라인 전송
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                if not in_snapshot(event):
+                    yield live_feed.format(event)
+        finally:
+            live_feed.unsubscribe(queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # 전역 예외 처리
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -0,0 +1,377 @@
+"""
+요청/쿼리 계측 (느린 요청이 커넥션 대기, SQL, 직렬화 중 어디에서 시간을 쓰는지 확인)
+
+- 라우트별 응답 시간, 쿼리별 실행 시간/행 수, 커넥션 대여 시간을 히스토그램으로 집계
+- GET /metrics: Prometheus 텍스트 형식 (워커 프로세스마다 따로 집계)
+- 응답마다 Server-Timing 헤더 (브라우저 개발자 도구 Network 탭에서 확인)
+- SLOW_QUERY_MS 이상 걸린 쿼리는 정규화한 SQL 로 로그 (값은 환자 정보일 수 있으므로 남기지 않음)
+"""
+import bisect
+import contextvars
+import functools
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+# 환경변수 로드 (main.py 의 load_dotenv 보다 먼저 import 됨)
+load_dotenv()
+
+# 계측 사용 여부 (false 면 커서/요청 계측을 모두 건너뜀)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# 이 시간(ms) 이상 걸린 쿼리를 느린 쿼리로 기록 (0 이면 기록하지 않음)
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+# 느린 쿼리 로그 파일 (비어 있으면 콘솔 출력)
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', '')
+# 느린 쿼리 집계에 유지하는 정규화 SQL 수 (가장 오래 전에 느렸던 것부터 제거)
+SLOW_QUERY_KEEP = 200
+
+# 히스토그램 구간 (초)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+ACQUIRE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """레이블별 누적 값"""
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """레이블별 구간 개수/합계 (Prometheus histogram)"""
+
+    def __init__(self, name, description, labels=(), buckets=REQUEST_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}   # labels -> [구간별 개수 ..., +Inf 개수, 합계]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "응답 시작까지 걸린 시간 (라우트 경로 패턴별)",
+    ("method", "route", "status"), REQUEST_BUCKETS)
+db_query_seconds = Histogram(
+    "db_query_duration_seconds", "쿼리 실행 + 결과 읽기 시간", ("operation", "table"), QUERY_BUCKETS)
+db_query_rows = Histogram(
+    "db_query_rows", "쿼리가 반환(SELECT)하거나 변경한 행 수", ("operation", "table"), ROW_BUCKETS)
+db_query_errors = Counter("db_query_errors_total", "실패한 쿼리 수", ("operation", "table"))
+db_acquire_seconds = Histogram(
+    "db_connection_acquire_seconds", "풀에서 커넥션을 얻기까지 걸린 시간 (새 연결 생성 포함)",
+    ("pool",), ACQUIRE_BUCKETS)
+slow_queries_total = Counter("db_slow_queries_total", f"SLOW_QUERY_MS({SLOW_QUERY_MS:g}ms) 이상 걸린 쿼리 수")
+
+METRICS = (http_request_seconds, db_query_seconds, db_query_rows, db_query_errors, db_acquire_seconds,
+           slow_queries_total)
+
+
+# ===== SQL 정규화 =====
+
+_SQL_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_SQL_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+_SQL_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_SQL_WHITESPACE = re.compile(r"\s+")
+_SQL_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SQL_ROWS = re.compile(r"\(\?\+\)(?:\s*,\s*\(\?\+\))+")
+_SQL_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE)\s+`?(\w+)", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=2048)
+def normalize_sql(query):
+    """
+    값과 목록 길이를 지운 SQL (같은 모양의 쿼리를 하나로 집계)
+    - 문자열/숫자/자리표시자 -> ?, IN (?, ?, ?) -> (?+), 다중 행 VALUES -> (?+), ...
+    """
+    if isinstance(query, (bytes, bytearray)):
+        query = query.decode("utf-8", "replace")
+    query = _SQL_STRING.sub("?", query)
+    query = _SQL_PLACEHOLDER.sub("?", query)
+    query = _SQL_NUMBER.sub("?", query)
+    query = _SQL_WHITESPACE.sub(" ", query).strip()
+    query = _SQL_LIST.sub("(?+)", query)
+    return _SQL_ROWS.sub("(?+), ...", query)
+
+
+@functools.lru_cache(maxsize=2048)
+def _query_labels(normalized):
+    """(작업 종류, 대상 테이블) - 메트릭 레이블 수가 쿼리 수만큼 늘지 않도록"""
+    operation = normalized.split(" ", 1)[0].upper() or "-"
+    match = _SQL_TABLE.search(normalized)
+    return operation, match.group(1).lower() if match else "-"
+
+
+# ===== 요청별 시간 =====
+
+class RequestTiming:
+    """한 요청이 DB 대기/실행, 직렬화에 쓴 시간 (DB 스레드에서도 같은 객체에 누적)"""
+
+    __slots__ = ('started', 'acquire', 'db', 'queries', 'rows', 'serialize', '_lock')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.acquire = 0.0
+        self.db = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.serialize = 0.0
+        self._lock = threading.Lock()
+
+    def add_query(self, seconds, rows):
+        with self._lock:
+            self.db += seconds
+            self.queries += 1
+            self.rows += rows
+
+    def add_acquire(self, seconds):
+        with self._lock:
+            self.acquire += seconds
+
+    def add_serialize(self, seconds):
+        with self._lock:
+            self.serialize += seconds
+
+    def server_timing(self):
+        """Server-Timing 헤더 값 (ms)"""
+        total = (time.perf_counter() - self.started) * 1000
+        return (
+            f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries, {self.rows} rows", '
+            f'db-acquire;dur={self.acquire * 1000:.2f}, '
+            f'serialize;dur={self.serialize * 1000:.2f}, '
+            f'total;dur={total:.2f}'
+        )
+
+
+_request_timing = contextvars.ContextVar('request_timing', default=None)
+
+
+def current_timing():
+    """현재 요청의 RequestTiming (요청 밖이면 None)"""
+    return _request_timing.get()
+
+
+def record_acquire(pool_name, seconds):
+    db_acquire_seconds.observe((pool_name,), seconds)
+    timing = _request_timing.get()
+    if timing is not None:
+        timing.add_acquire(seconds)
+
+
+def record_serialize(seconds):
+    timing = _request_timing.get()
+    if timing is not None:
+        timing.add_serialize(seconds)
+
+
+def record_query(query, seconds, rows, error=False):
+    """쿼리 하나의 실행 시간/행 수 기록 (SLOW_QUERY_MS 이상이면 느린 쿼리 로그)"""
+    normalized = normalize_sql(query)
+    labels = _query_labels(normalized)
+    if error:
+        db_query_errors.inc(labels)
+    db_query_seconds.observe(labels, seconds)
+    db_query_rows.observe(labels, rows)
+    timing = _request_timing.get()
+    if timing is not None:
+        timing.add_query(seconds, rows)
+    if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+        slow_query_log.record(normalized, seconds, rows)
+
+
+class SlowQueryLog:
+    """느린 쿼리 로그 + 정규화 SQL 별 집계 (최근 SLOW_QUERY_KEEP 개)"""
+
+    def __init__(self, path=SLOW_QUERY_LOG, keep=SLOW_QUERY_KEEP):
+        self.path = path
+        self.keep = keep
+        self._queries = OrderedDict()   # 정규화 SQL -> [횟수, 합계(초), 최대(초), 최대 행 수, 마지막 시각]
+        self._lock = threading.Lock()
+
+    def record(self, normalized, seconds, rows):
+        slow_queries_total.inc()
+        now = time.time()
+        with self._lock:
+            entry = self._queries.pop(normalized, None) or [0, 0.0, 0.0, 0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            entry[3] = max(entry[3], rows)
+            entry[4] = now
+            self._queries[normalized] = entry
+            while len(self._queries) > self.keep:
+                self._queries.popitem(last=False)
+
+            line = (f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))} 느린 쿼리 "
+                    f"{seconds * 1000:.1f}ms {rows}행: {normalized}")
+            if not self.path:
+                print(line)
+                return
+            try:
+                with open(self.path, "a", encoding="utf-8") as file:
+                    file.write(line + "\n")
+            except OSError as e:
+                print(f"느린 쿼리 로그 기록 실패 ({self.path}): {e}")
+
+    def summary(self):
+        """정규화 SQL 별 집계 (총 시간 순)"""
+        with self._lock:
+            items = list(self._queries.items())
+        return [
+            {
+                "query": query,
+                "count": count,
+                "total_ms": round(total * 1000, 1),
+                "avg_ms": round(total * 1000 / count, 1),
+                "max_ms": round(longest * 1000, 1),
+                "max_rows": max_rows,
+                "last_seen": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(last_seen)),
+            }
+            for query, (count, total, longest, max_rows, last_seen) in
+            sorted(items, key=lambda item: item[1][1], reverse=True)
+        ]
+
+
+slow_query_log = SlowQueryLog()
+
+
+def _gauge_lines(name, description, samples):
+    """(레이블 dict, 값) 목록 -> gauge 형식 줄"""
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+    return lines
+
+
+def render(pool_stats=None):
+    """Prometheus 텍스트 형식 (pool_stats: 풀 이름 -> ConnectionPool.stats())"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    if pool_stats:
+        for key, description in (("size", "생성된 커넥션 수"), ("in_use", "대여 중인 커넥션 수"),
+                                 ("waiting", "커넥션을 기다리는 요청 수"),
+                                 ("timeouts_total", "커넥션 대기 시간 초과 수")):
+            lines.extend(_gauge_lines(f"db_pool_{key}", description,
+                                      [({"pool": name}, stats[key]) for name, stats in pool_stats.items()]))
+    return "\n".join(lines) + "\n"
+
+
+class TimingMiddleware:
+    """
+    요청별 시간 측정 (ASGI 미들웨어)
+    - 라우트 경로 패턴(/api/patients/{patient_id})별 응답 시작(헤더 전송)까지 걸린 시간 히스토그램
+      (SSE/내보내기처럼 본문을 오래 보내는 응답도 본문 전송 시간은 포함하지 않음)
+    - 응답 헤더에 Server-Timing (DB 대기/실행, 직렬화, 전체)
+    - 캐시가 라우트 실행 없이 반환한 응답도 경로 패턴을 찾아 같은 라우트로 집계
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _request_timing.set(timing)
+        started = False
+
+        def observe(status):
+            http_request_seconds.observe(
+                (scope["method"], route_template(scope), str(status)), time.perf_counter() - timing.started)
+
+        async def send_with_timing(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                observe(message["status"])
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timing.reset(token)
+            # 응답을 시작하지 못하고 끝난 요청 (처리되지 않은 예외)
+            if not started:
+                observe(500)
+
+
+def route_template(scope):
+    """
+    요청의 라우트 경로 패턴 (/api/patients/{patient_id}), 없는 경로는 "unmatched"
+    - 라우팅 전에 응답한 요청(응답 캐시, 304)이나 라우팅 전 시점에는 경로 패턴을 직접 찾음
+    """
+    route = scope.get("route")
+    if route is None:
+        from starlette.routing import Match
+        for candidate in scope["app"].router.routes:
+            if candidate.matches(scope)[0] == Match.FULL:
+                route = candidate
+                break
+    # 없는 경로는 하나로 모아 레이블 수가 요청 경로 수만큼 늘지 않도록
+    return getattr(route, "path", None) or "unmatched"
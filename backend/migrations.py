@@ -0,0 +1,330 @@
+"""
+데이터베이스 스키마 마이그레이션
+
+사용법:
+    python migrations.py            # 적용되지 않은 마이그레이션 적용
+    python migrations.py status     # 마이그레이션별 적용 여부 출력
+
+- 모든 테이블/인덱스 DDL 은 여기의 MIGRATIONS 에만 추가 (README 의 DDL 은 참고용)
+- 스키마만 관리하고 기준 정보(진료과, 진료 시간표) 적재는 seed_data.py
+- 버전 순서대로 적용하고 schema_migrations 테이블에 기록
+- 각 단계는 이미 적용된 상태에서 다시 실행해도 안전 (기존 DB 에 처음 적용하는 경우 포함)
+- 서버 시작 시 자동 적용 (DB_MIGRATE_ON_STARTUP=false 로 끔)
+- 여러 서버가 동시에 시작해도 GET_LOCK 으로 한 곳에서만 적용
+"""
+import argparse
+import os
+import sys
+import time
+
+from database import get_db_connection, DatabaseConnectionError
+
+# 서버 시작 시 마이그레이션 자동 적용 여부
+MIGRATE_ON_STARTUP = os.getenv('DB_MIGRATE_ON_STARTUP', 'true').lower() in ('1', 'true', 'yes')
+
+# 다른 서버가 적용 중일 때 기다리는 최대 시간 (초)
+LOCK_TIMEOUT = 60
+LOCK_NAME = "hospital_schema_migrations"
+
+
+def add_index(table, name, columns):
+    """인덱스가 없으면 추가하는 단계 (MySQL 은 CREATE INDEX IF NOT EXISTS 미지원)"""
+    def step(cursor):
+        if not _index_exists(cursor, table, name):
+            cursor.execute(f"ALTER TABLE {table} ADD INDEX {name} ({columns})")
+    return step
+
+
+def drop_index(table, name):
+    """인덱스가 있으면 삭제하는 단계"""
+    def step(cursor):
+        if _index_exists(cursor, table, name):
+            cursor.execute(f"ALTER TABLE {table} DROP INDEX {name}")
+    return step
+
+
+def add_column(table, name, definition):
+    """컬럼이 없으면 추가하는 단계"""
+    def step(cursor):
+        cursor.execute(
+            """
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+            """,
+            (table, name)
+        )
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+    return step
+
+
+def _index_exists(cursor, table, name):
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """,
+        (table, name)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+# (버전, 설명, 단계 목록) - 단계는 SQL 문자열 또는 cursor 를 받는 함수
+# 적용된 마이그레이션은 수정하지 말고 새 버전을 추가
+MIGRATIONS = [
+    (1, "기본 테이블 (환자, 진료, 예약)", [
+        """
+        CREATE TABLE IF NOT EXISTS patients (
+            patient_id INT AUTO_INCREMENT PRIMARY KEY,
+            patient_no VARCHAR(20) UNIQUE NOT NULL,
+            name VARCHAR(50) NOT NULL,
+            birth_date DATE,
+            gender CHAR(1) CHECK (gender IN ('M', 'F')),
+            phone VARCHAR(15),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_patient_no (patient_no),
+            INDEX idx_name (name)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS visits (
+            visit_id INT AUTO_INCREMENT PRIMARY KEY,
+            patient_id INT NOT NULL,
+            visit_date DATETIME NOT NULL,
+            department VARCHAR(30),
+            doctor_name VARCHAR(30),
+            diagnosis TEXT,
+            status VARCHAR(10) DEFAULT '완료',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (patient_id) REFERENCES patients(patient_id),
+            INDEX idx_visit_date (visit_date),
+            INDEX idx_patient_id (patient_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS appointments (
+            appointment_id INT AUTO_INCREMENT PRIMARY KEY,
+            patient_id INT NOT NULL,
+            appointment_date DATETIME NOT NULL,
+            department VARCHAR(30),
+            doctor_name VARCHAR(30),
+            status VARCHAR(10) DEFAULT '예약',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (patient_id) REFERENCES patients(patient_id),
+            INDEX idx_appointment_date (appointment_date),
+            INDEX idx_patient_id (patient_id)
+        )
+        """,
+    ]),
+    # 환자별 진료 요약 (진료 추가 시 증분 갱신, patient_summary.py rebuild 로 재계산)
+    (2, "환자별 진료 요약 테이블", [
+        """
+        CREATE TABLE IF NOT EXISTS patient_visit_summary (
+            patient_id INT PRIMARY KEY,
+            visit_count INT NOT NULL DEFAULT 0,
+            last_visit_date DATETIME NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (patient_id) REFERENCES patients(patient_id)
+        )
+        """,
+    ]),
+    # CSV 직접 적재 진행 위치 (load_csv_to_db.py, 배치와 같은 트랜잭션에서 갱신)
+    (3, "CSV 적재 진행 위치 테이블", [
+        """
+        CREATE TABLE IF NOT EXISTS csv_load_checkpoints (
+            source VARCHAR(255) PRIMARY KEY,
+            rows_done BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (4, "목록 조회 인덱스", [
+        # 전체 환자 목록 커서 페이징 (ORDER BY created_at DESC, patient_id DESC)
+        add_index("patients", "idx_created_at", "created_at, patient_id"),
+        # 진료 기록 진료과/상태 필터 + 날짜 범위 (GET /api/visits), 진료과 목록 DISTINCT
+        add_index("visits", "idx_department_status_date", "department, status, visit_date"),
+        # 진료 상태 필터 (대기 환자 수 통계, GET /api/visits?status=)
+        add_index("visits", "idx_status_date", "status, visit_date"),
+        # 예약 상태 + 날짜 범위 (오늘/향후 예약, 오늘 예약 수 통계)
+        add_index("appointments", "idx_status_date", "status, appointment_date"),
+    ]),
+    (5, "환자별 진료/예약 조회 인덱스", [
+        # 환자 상세 진료 기록 (WHERE patient_id = ? ORDER BY visit_date DESC),
+        # 진료 요약 재계산 (GROUP BY patient_id, MAX(visit_date)) 을 인덱스만으로 처리
+        add_index("visits", "idx_patient_visit_date", "patient_id, visit_date"),
+        # 환자 상세 예약 (WHERE patient_id = ? AND status != '취소' ORDER BY appointment_date)
+        add_index("appointments", "idx_patient_appointment_date", "patient_id, appointment_date, status"),
+        # 위 인덱스가 patient_id 로 시작하므로 외래키용 단일 인덱스는 불필요
+        drop_index("visits", "idx_patient_id"),
+        drop_index("appointments", "idx_patient_id"),
+    ]),
+    # 진료과/담당의 기준 정보 (departments.py 캐시, 진료/예약 등록 시 검증)
+    (6, "진료과/담당의 기준 테이블", [
+        """
+        CREATE TABLE IF NOT EXISTS departments (
+            dept_id INT AUTO_INCREMENT PRIMARY KEY,
+            dept_code VARCHAR(10) UNIQUE NOT NULL,
+            dept_name VARCHAR(30) UNIQUE NOT NULL,
+            location VARCHAR(50),
+            phone VARCHAR(20),
+            is_active TINYINT(1) NOT NULL DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS doctors (
+            doctor_id INT AUTO_INCREMENT PRIMARY KEY,
+            dept_id INT NOT NULL,
+            name VARCHAR(30) NOT NULL,
+            is_active TINYINT(1) NOT NULL DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY uq_dept_doctor (dept_id, name),
+            FOREIGN KEY (dept_id) REFERENCES departments(dept_id)
+        )
+        """,
+    ]),
+    # 진료 시간표 (scheduling.py 캐시, 빈 예약 시간 조회와 예약 시각 검증)
+    (7, "진료 시간표 테이블", [
+        """
+        CREATE TABLE IF NOT EXISTS work_hours (
+            work_hours_id INT AUTO_INCREMENT PRIMARY KEY,
+            dept_id INT NOT NULL,
+            doctor_name VARCHAR(30) NOT NULL DEFAULT '',
+            weekday TINYINT NOT NULL,
+            start_time TIME NOT NULL,
+            end_time TIME NOT NULL,
+            slot_minutes SMALLINT NOT NULL DEFAULT 30,
+            UNIQUE KEY uq_work_hours (dept_id, doctor_name, weekday, start_time),
+            FOREIGN KEY (dept_id) REFERENCES departments(dept_id)
+        )
+        """,
+        # 담당의별 예약 중복 확인, 진료과 예약 현황 적재 (WHERE department = ? AND doctor_name = ? AND 날짜 범위)
+        add_index("appointments", "idx_department_doctor_date", "department, doctor_name, appointment_date"),
+    ]),
+    # 진료 대기열 (visit_queue.py) 상태 변경의 낙관적 동시성 제어
+    (8, "진료 상태 변경 버전", [
+        # 상태를 바꿀 때마다 1 증가, 변경 요청의 version 과 다르면 409
+        add_column("visits", "version", "INT NOT NULL DEFAULT 0"),
+        # 대기열 재구성 (WHERE status IN ('대기', '진료중') ORDER BY visit_date) 은 idx_status_date 사용
+    ]),
+]
+
+
+def _ensure_version_table(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def _applied_versions(cursor):
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _apply(cursor, version, name, steps):
+    # DDL 은 MySQL 에서 자동 커밋되므로 단계별로 실행하고, 모두 끝난 뒤 버전 기록
+    for step in steps:
+        if callable(step):
+            step(cursor)
+        else:
+            cursor.execute(step)
+    cursor.execute(
+        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+        (version, name)
+    )
+
+
+def migrate(verbose=False):
+    """
+    적용되지 않은 마이그레이션을 버전 순서대로 적용하고 적용한 버전 목록 반환
+    - 중간에 실패하면 해당 버전은 기록되지 않아 다음 실행 때 처음부터 다시 적용
+    """
+    connection = get_db_connection()
+    if connection is None:
+        raise DatabaseConnectionError("데이터베이스 연결 실패")
+
+    cursor = None
+    applied = []
+    try:
+        cursor = connection.cursor(buffered=True)
+
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("다른 서버가 마이그레이션을 적용 중입니다 (잠금 대기 시간 초과)")
+
+        try:
+            _ensure_version_table(cursor)
+            done = _applied_versions(cursor)
+            for version, name, steps in sorted(MIGRATIONS, key=lambda m: m[0]):
+                if version in done:
+                    continue
+                started = time.perf_counter()
+                _apply(cursor, version, name, steps)
+                connection.commit()
+                applied.append(version)
+                if verbose:
+                    print(f"✓ {version:04d} {name} ({time.perf_counter() - started:.2f}초)")
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cursor.fetchall()
+    finally:
+        if cursor is not None:
+            cursor.close()
+        connection.close()
+
+    return applied
+
+
+def status():
+    """(버전, 설명, 적용 시각 또는 None) 목록"""
+    connection = get_db_connection()
+    if connection is None:
+        raise DatabaseConnectionError("데이터베이스 연결 실패")
+
+    cursor = None
+    try:
+        cursor = connection.cursor(buffered=True)
+        _ensure_version_table(cursor)
+        cursor.execute("SELECT version, applied_at FROM schema_migrations")
+        applied_at = dict(cursor.fetchall())
+    finally:
+        if cursor is not None:
+            cursor.close()
+        connection.close()
+
+    return [(version, name, applied_at.get(version)) for version, name, _ in sorted(MIGRATIONS, key=lambda m: m[0])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="데이터베이스 스키마 마이그레이션")
+    parser.add_argument("command", nargs="?", choices=("upgrade", "status"), default="upgrade")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        pending = 0
+        for version, name, applied_at in status():
+            if applied_at is None:
+                pending += 1
+                print(f"  {version:04d} {name} - 미적용")
+            else:
+                print(f"✓ {version:04d} {name} - {applied_at}")
+        print(f"\n미적용 마이그레이션 {pending}건")
+        return 0
+
+    applied = migrate(verbose=True)
+    if applied:
+        print(f"\n✓ 마이그레이션 {len(applied)}건 적용")
+    else:
+        print("✓ 이미 최신 스키마입니다")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import base64
+import json
+from datetime import datetime, date
+
+# 목록 API 가 다음 페이지 커서를 돌려주는 응답 헤더 (본문은 기존 목록 형식 유지)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _to_json(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(*values):
+    """커서(다음 페이지 시작 위치) 값을 불투명한 토큰 문자열로 변환"""
+    raw = json.dumps([_to_json(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, *types):
+    """
+    커서 토큰을 값 튜플로 복원
+    - types: 각 값의 변환 함수 (예: datetime.fromisoformat, int)
+    - 형식이 잘못된 토큰은 ValueError
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("잘못된 커서입니다")
+
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("잘못된 커서입니다")
+
+    try:
+        return tuple(convert(value) for convert, value in zip(types, values))
+    except (TypeError, ValueError):
+        raise ValueError("잘못된 커서입니다")
+
+
+def split_page(rows, limit, *key_fields):
+    """
+    limit + 1 개로 조회한 결과를 한 페이지와 다음 커서로 분리
+    - 다음 페이지가 없으면 커서는 None
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(*(last[field] for field in key_fields))
+
+
+def keyset_condition(sort_column, id_column, sort_value, id_value, descending=True):
+    """
+    (정렬 열, ID) 순서에서 커서 다음 행만 고르는 조건 SQL 과 파라미터
+    - 정렬 열 인덱스로 범위 검색하므로 OFFSET 과 달리 앞 페이지 행을 읽지 않음
+    """
+    op = "<" if descending else ">"
+    sql = f"({sort_column} {op} %s OR ({sort_column} = %s AND {id_column} {op} %s))"
+    return sql, [sort_value, sort_value, id_value]
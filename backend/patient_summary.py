@@ -0,0 +1,140 @@
+"""
+환자별 진료 요약 (patient_visit_summary) 관리
+
+사용법:
+    python patient_summary.py rebuild   # visits 테이블에서 전체 재계산
+    python patient_summary.py check     # 요약과 실제 진료 기록 비교
+"""
+import argparse
+import sys
+
+from database import execute_query, execute_single_query, run_transaction
+from migrations import migrate
+
+# 재계산 시 한 트랜잭션에서 처리할 patient_id 범위
+REBUILD_CHUNK = 10000
+
+UPSERT_SQL = """
+    INSERT INTO patient_visit_summary (patient_id, visit_count, last_visit_date)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        visit_count = visit_count + VALUES(visit_count),
+        last_visit_date = GREATEST(
+            COALESCE(last_visit_date, VALUES(last_visit_date)),
+            VALUES(last_visit_date)
+        )
+"""
+
+
+def record_visit(cursor, patient_id, visit_date):
+    """진료 1건 추가를 요약에 반영 (진료 INSERT 와 같은 트랜잭션에서 호출)"""
+    cursor.execute(UPSERT_SQL, (patient_id, 1, visit_date))
+
+
+def record_visits(cursor, visits):
+    """
+    여러 진료 추가를 요약에 반영
+    - visits: (patient_id, visit_date) 목록
+    - 동시에 실행되는 일괄 추가끼리 교착되지 않도록 patient_id 순서로 잠금
+    """
+    summary = {}
+    for patient_id, visit_date in visits:
+        count, last = summary.get(patient_id, (0, None))
+        summary[patient_id] = (count + 1, visit_date if last is None else max(last, visit_date))
+    if summary:
+        cursor.executemany(UPSERT_SQL, [(pid, count, last) for pid, (count, last) in sorted(summary.items())])
+
+
+def _rebuild_range(cursor, start_id, end_id):
+    cursor.execute(
+        "DELETE FROM patient_visit_summary WHERE patient_id BETWEEN %s AND %s",
+        (start_id, end_id)
+    )
+    cursor.execute(
+        """
+        INSERT INTO patient_visit_summary (patient_id, visit_count, last_visit_date)
+        SELECT patient_id, COUNT(*), MAX(visit_date)
+        FROM visits
+        WHERE patient_id BETWEEN %s AND %s
+        GROUP BY patient_id
+        """,
+        (start_id, end_id)
+    )
+    return cursor.rowcount
+
+
+def rebuild():
+    """visits 테이블에서 요약 전체 재계산 (patient_id 구간별 트랜잭션)"""
+    migrate()
+    bounds = execute_single_query("SELECT MIN(patient_id) AS min_id, MAX(patient_id) AS max_id FROM patients")
+    if bounds is None:
+        raise RuntimeError("환자 범위 조회 실패")
+    if bounds['min_id'] is None:
+        return 0
+
+    total = 0
+    start_id = bounds['min_id']
+    while start_id <= bounds['max_id']:
+        end_id = start_id + REBUILD_CHUNK - 1
+        total += run_transaction(_rebuild_range, start_id, end_id)
+        start_id = end_id + 1
+    return total
+
+
+def check(limit=100):
+    """
+    요약과 실제 진료 기록이 다른 환자 목록 반환
+    - 요약이 없거나, 건수/최근 진료일이 다르거나, 진료 기록 없이 요약만 있는 경우
+    """
+    rows = execute_query(
+        """
+        SELECT a.patient_id, a.visit_count AS actual_count, a.last_visit_date AS actual_last,
+               s.visit_count AS summary_count, s.last_visit_date AS summary_last
+        FROM (
+            SELECT patient_id, COUNT(*) AS visit_count, MAX(visit_date) AS last_visit_date
+            FROM visits GROUP BY patient_id
+        ) a
+        LEFT JOIN patient_visit_summary s ON s.patient_id = a.patient_id
+        WHERE s.patient_id IS NULL
+           OR s.visit_count <> a.visit_count
+           OR NOT (s.last_visit_date <=> a.last_visit_date)
+        UNION ALL
+        SELECT s.patient_id, 0, NULL, s.visit_count, s.last_visit_date
+        FROM patient_visit_summary s
+        WHERE s.visit_count > 0
+          AND NOT EXISTS (SELECT 1 FROM visits v WHERE v.patient_id = s.patient_id)
+        LIMIT %s
+        """,
+        (limit,)
+    )
+    if rows is None:
+        raise RuntimeError("요약 검사 쿼리 실패")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="환자별 진료 요약 관리")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        count = rebuild()
+        print(f"✓ 진료 요약 재계산 완료: {count}명")
+        return 0
+
+    mismatches = check()
+    if not mismatches:
+        print("✓ 진료 요약이 진료 기록과 일치합니다")
+        return 0
+
+    print(f"✗ 불일치 {len(mismatches)}건 (최대 100건 표시)")
+    for row in mismatches:
+        print(f"  patient_id={row['patient_id']}: "
+              f"실제 {row['actual_count']}건/{row['actual_last']}, "
+              f"요약 {row['summary_count']}건/{row['summary_last']}")
+    print("python patient_summary.py rebuild 로 재계산하세요")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
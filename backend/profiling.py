@@ -0,0 +1,297 @@
+"""
+실행 중인 워커의 CPU 프로파일 (재시작 없이, 관리자 전용 /api/admin/profile)
+
+- sampling: 일정 간격으로 모든 스레드의 호출 스택을 모음 -> collapsed stacks (flamegraph.pl, speedscope)
+  측정 대상 코드는 느려지지 않으므로 부하 중에도 사용 가능 (벽시계 기준, DB 응답 대기도 포함)
+- deterministic: cProfile 로 이벤트 루프 스레드의 모든 함수 호출 측정 -> pstats (snakeviz, python -m pstats)
+  호출마다 비용이 붙으므로 짧게 사용 (DB 스레드에서 실행되는 쿼리/행 변환은 포함되지 않음)
+- N초 동안, 또는 경로 패턴이 맞는 다음 N개 요청을 처리하는 동안만 수집
+- 프로파일 중이 아니면 미들웨어는 속성 하나만 확인하고 그대로 전달
+"""
+import asyncio
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from dotenv import load_dotenv
+
+from metrics import route_template
+
+# 환경변수 로드 (main.py 의 load_dotenv 보다 먼저 import 됨)
+load_dotenv()
+
+# 한 번에 프로파일할 수 있는 최대 시간 (초), 요청 수로 측정할 때도 이 시간이 지나면 종료
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', 300))
+# sampling 기본 수집 간격 (ms)
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', 5))
+
+SAMPLING = "sampling"
+DETERMINISTIC = "deterministic"
+MODES = (SAMPLING, DETERMINISTIC)
+
+# 일이 없어 기다리는 스레드의 맨 위 프레임 (파일 이름, 함수) - 샘플에서 제외
+IDLE_FRAMES = {
+    ("thread.py", "_worker"),           # DB 스레드 풀 작업 대기
+    ("selectors.py", "select"),         # 이벤트 루프 I/O 대기
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+}
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+_THREAD_NUMBER = re.compile(r"_\d+$")
+
+
+class ProfileBusyError(Exception):
+    """이미 프로파일 중"""
+
+
+class ProfilerUnavailableError(Exception):
+    """다른 프로파일러(coverage 등)가 사용 중이라 cProfile 을 켤 수 없음"""
+
+
+def _short_path(path):
+    """프레임 표시용 파일 경로 (backend 기준 상대 경로, 설치된 패키지는 패키지부터)"""
+    if path.startswith(BACKEND_DIR):
+        return os.path.relpath(path, BACKEND_DIR)
+    marker = "site-packages" + os.sep
+    if marker in path:
+        return path.split(marker, 1)[1]
+    return os.path.basename(path)
+
+
+class ProfileSession:
+    """프로파일 한 번의 설정과 결과"""
+
+    def __init__(self, mode, seconds, requests=None, route=None, method=None, interval_ms=PROFILE_SAMPLE_INTERVAL_MS):
+        self.mode = mode
+        self.seconds = seconds
+        self.requests = requests          # None 이면 seconds 동안 전체 측정
+        self.route = route
+        self.method = method
+        self.interval = interval_ms / 1000
+        self.pid = os.getpid()
+        self.started_at = time.time()
+        self.finished_at = None
+        self.stop_reason = None
+        self.matched = 0                  # 측정을 시작한 요청 수
+        self.completed = 0                # 측정이 끝난 요청 수
+        self.in_flight = 0
+        self.collecting = False
+        self.collected_seconds = 0.0
+        self._collect_started = None
+        self.samples = 0
+        self.stacks = Counter()           # "스레드;바깥 함수;...;안쪽 함수" -> 샘플 수
+        self.profile = cProfile.Profile() if mode == DETERMINISTIC else None
+        self.lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self.finished_at is None
+
+    def matches(self, scope):
+        if self.method and scope["method"] != self.method:
+            return False
+        return self.route is None or route_template(scope) == self.route
+
+    def to_dict(self):
+        end = self.finished_at or time.time()
+        return {
+            "pid": self.pid,
+            "mode": self.mode,
+            "running": self.running,
+            "route": self.route,
+            "method": self.method,
+            "requests": self.requests,
+            "seconds": self.seconds,
+            "interval_ms": self.interval * 1000 if self.mode == SAMPLING else None,
+            "started_at": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+            "elapsed_seconds": round(end - self.started_at, 2),
+            "collected_seconds": round(self.collected_seconds + (
+                time.monotonic() - self._collect_started if self._collect_started is not None else 0), 2),
+            "matched_requests": self.matched,
+            "completed_requests": self.completed,
+            "samples": self.samples if self.mode == SAMPLING else None,
+            "stop_reason": self.stop_reason,
+        }
+
+
+class Profiler:
+    """
+    워커 하나의 프로파일 (한 번에 하나, 마지막 결과 보관)
+    - start/stop/미들웨어는 모두 이벤트 루프 스레드에서 호출 (cProfile 은 켠 스레드만 측정)
+    """
+
+    def __init__(self):
+        self.active = False        # 미들웨어가 확인하는 값 (프로파일 중이 아니면 다른 작업 없음)
+        self.session = None        # 진행 중이거나 마지막으로 끝난 프로파일
+        self._timer = None
+
+    def start(self, mode, seconds, requests=None, route=None, method=None, interval_ms=PROFILE_SAMPLE_INTERVAL_MS):
+        if self.active:
+            raise ProfileBusyError("이미 프로파일 중입니다 (중지 후 다시 시작하세요)")
+        session = ProfileSession(mode, seconds, requests, route, method, interval_ms)
+        # 요청 수로 측정할 때도 cProfile 을 켤 수 있는지 미리 확인 (요청 처리 중에 실패하지 않도록)
+        self._begin_collect(session)
+        if requests is not None:
+            self._end_collect(session)
+        self.session = session
+        self.active = True
+        self._timer = asyncio.get_running_loop().call_later(seconds, self.stop, "시간 종료")
+        if mode == SAMPLING:
+            threading.Thread(target=self._sample, args=(session,), name="profiler", daemon=True).start()
+        return session
+
+    def stop(self, reason="중지 요청"):
+        """진행 중인 프로파일 종료 (없으면 None)"""
+        session = self.session
+        if not self.active or session is None:
+            return None
+        self.active = False
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._end_collect(session)
+        session.stop_reason = reason
+        session.finished_at = time.time()
+        return session
+
+    def _begin_collect(self, session):
+        if session.profile is not None:
+            try:
+                session.profile.enable()
+            except ValueError as e:
+                raise ProfilerUnavailableError(f"cProfile 을 켤 수 없습니다: {e}")
+        session._collect_started = time.monotonic()
+        session.collecting = True
+
+    def _end_collect(self, session):
+        if not session.collecting:
+            return
+        session.collecting = False
+        if session.profile is not None:
+            session.profile.disable()
+        session.collected_seconds += time.monotonic() - session._collect_started
+        session._collect_started = None
+
+    def request_started(self, session):
+        """측정 대상 요청 시작 - 처리 중인 대상 요청이 있는 동안만 수집"""
+        session.in_flight += 1
+        if session.in_flight == 1 and session.running:
+            self._begin_collect(session)
+
+    def request_finished(self, session):
+        session.in_flight -= 1
+        session.completed += 1
+        if session.in_flight == 0:
+            self._end_collect(session)
+        if session is self.session and session.completed >= session.requests:
+            self.stop("요청 수 도달")
+
+    def _sample(self, session):
+        """sampling 모드 수집 스레드 (프로파일이 끝나면 종료)"""
+        own = threading.get_ident()
+        labels = {}
+        while session.running:
+            if session.collecting:
+                names = {thread.ident: _THREAD_NUMBER.sub("", thread.name) for thread in threading.enumerate()}
+                frames = sys._current_frames()
+                stacks = []
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    code = frame.f_code
+                    if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        label = labels.get(code)
+                        if label is None:
+                            label = labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+                        stack.append(label)
+                        frame = frame.f_back
+                    stack.append(names.get(ident, "thread"))
+                    stacks.append(";".join(reversed(stack)))
+                del frames
+                with session.lock:
+                    session.stacks.update(stacks)
+                    session.samples += 1
+            time.sleep(session.interval)
+
+    # ===== 결과 =====
+
+    def collapsed(self, session):
+        """collapsed stacks ("스레드;함수;...;함수 샘플 수" 줄 목록)"""
+        with session.lock:
+            items = sorted(session.stacks.items())
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def pstats_bytes(self, session):
+        """pstats 파일 내용 (pstats.Stats(파일) 로 읽음)"""
+        session.profile.create_stats()
+        return marshal.dumps(session.profile.stats)
+
+    def text(self, session, limit=40):
+        """사람이 읽는 요약 (deterministic: 누적 시간 순 pstats, sampling: 함수별 샘플 비율)"""
+        out = io.StringIO()
+        info = session.to_dict()
+        out.write(" ".join(f"{key}={value}" for key, value in info.items() if value is not None) + "\n\n")
+        if session.profile is not None:
+            stats = pstats.Stats(session.profile, stream=out)
+            stats.sort_stats("cumulative").print_stats(limit)
+            return out.getvalue()
+
+        with session.lock:
+            items = list(session.stacks.items())
+        total = sum(count for _, count in items) or 1
+        own, inclusive = Counter(), Counter()
+        for stack, count in items:
+            frames = stack.split(";")[1:]
+            if frames:
+                own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        for title, counter in (("자체 (맨 위 프레임)", own), ("포함 (호출한 함수 포함)", inclusive)):
+            out.write(f"== {title}: 전체 {total:,} 샘플 ==\n")
+            for frame, count in counter.most_common(limit):
+                out.write(f"{count / total * 100:6.1f}% {count:8,}  {frame}\n")
+            out.write("\n")
+        return out.getvalue()
+
+
+# 워커마다 하나
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """
+    요청 수로 프로파일할 때 대상 요청을 처리하는 동안만 수집 (ASGI 미들웨어)
+    - 프로파일 중이 아니거나 기간으로 측정 중이면 그대로 전달
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not profiler.active or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        session = profiler.session
+        if session.requests is None or session.matched >= session.requests or not session.matches(scope):
+            await self.app(scope, receive, send)
+            return
+
+        session.matched += 1
+        profiler.request_started(session)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.request_finished(session)
@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from cache_backend import cache, VERSION_KEY_PREFIX
+
+# 저장한 응답의 유지 시간 (초) - 메모리 저장소에서는 다른 워커의 변경이 이 시간 안에 반영
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 10))
+# 이보다 큰 응답은 저장하지 않음 (ETag 는 계산)
+RESPONSE_CACHE_MAX_BODY = int(os.getenv('RESPONSE_CACHE_MAX_BODY', 256 * 1024))
+# 같은 응답을 다른 요청/워커가 만드는 중일 때 기다리는 최대 시간 (초), 만드는 쪽의 잠금 유지 시간
+RESPONSE_CACHE_LOCK_TIMEOUT = float(os.getenv('RESPONSE_CACHE_LOCK_TIMEOUT', 5))
+# 기다리는 동안 저장 여부 확인 간격 (초)
+LOCK_POLL_INTERVAL = 0.05
+
+# 브라우저가 매번 If-None-Match 로 재검증 (환자 정보는 공유 캐시에 저장하지 않음)
+REVALIDATE = "private, no-cache"
+
+# (경로 패턴, 버전 키 목록을 만드는 함수, Cache-Control)
+CACHE_POLICIES = [
+    (re.compile(r"^/api/patients/(\d+)$"), lambda m: [f"patient:{m.group(1)}"], REVALIDATE),
+    (re.compile(r"^/api/patients/stats/today$"), lambda m: ["stats"], REVALIDATE),
+    (re.compile(r"^/api/visits/today$"), lambda m: ["visits"], REVALIDATE),
+    (re.compile(r"^/api/appointments/today$"), lambda m: ["appointments"], REVALIDATE),
+    (re.compile(r"^/api/visits/departments$"), lambda m: ["departments"], "private, max-age=60"),
+    (re.compile(r"^/api/departments/?$"), lambda m: ["departments"], "private, max-age=60"),
+]
+
+
+def make_etag(body):
+    """응답 본문으로 ETag 계산 (압축 등 변환 후에도 쓸 수 있도록 약한 ETag)"""
+    return 'W/"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match 헤더에 etag 가 포함되어 있는지"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
+
+
+class _Entry:
+    __slots__ = ('etag', 'body', 'media_type', 'versions')
+
+    def __init__(self, etag, body, media_type, versions):
+        self.etag = etag
+        self.body = body
+        self.media_type = media_type
+        self.versions = versions
+
+    def pack(self):
+        """저장소에 넣을 bytes (메타데이터 JSON 한 줄 + 본문)"""
+        meta = {"etag": self.etag, "media_type": self.media_type, "versions": list(self.versions)}
+        return json.dumps(meta).encode("utf-8") + b"\n" + self.body
+
+    @classmethod
+    def unpack(cls, data):
+        meta, _, body = data.partition(b"\n")
+        meta = json.loads(meta)
+        return cls(meta['etag'], body, meta['media_type'], tuple(meta['versions']))
+
+
+def _version_key(key):
+    return VERSION_KEY_PREFIX + key
+
+
+def _entry_key(url):
+    return "resp:" + url
+
+
+class ResponseCache:
+    """
+    GET 응답 캐시 (ETag / 조건부 요청), 저장소는 cache_backend (메모리 LRU 또는 Redis)
+    - 엔티티별 버전 카운터는 등록 API 가 bump() 로 증가 (Redis 저장소면 모든 워커에 바로 반영)
+    - 저장 시점의 버전이 그대로이고 TTL 이내인 응답은 라우트를 실행하지 않고 바로 반환
+    - ETag 는 본문 해시이므로 다시 계산한 응답이 같으면 304
+    - 저장된 응답이 없으면 한 요청만 라우트를 실행하고 나머지는 저장될 때까지 대기
+    """
+
+    def __init__(self, ttl=RESPONSE_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+        self._waits = 0
+
+    def policy(self, path):
+        """경로에 해당하는 (버전 키 목록, Cache-Control), 캐시 대상이 아니면 None"""
+        for pattern, keys, cache_control in CACHE_POLICIES:
+            match = pattern.match(path)
+            if match:
+                return keys(match), cache_control
+        return None
+
+    async def bump(self, *keys):
+        """엔티티 변경 반영 (해당 키를 쓰는 저장 응답은 다음 요청에서 다시 생성)"""
+        await cache.incr_many([_version_key(key) for key in keys])
+
+    async def _read(self, url, keys, extra=()):
+        """(현재 버전, 저장된 응답 또는 None, extra 키 값 목록)"""
+        values = await cache.get_many([_version_key(key) for key in keys] + [_entry_key(url), *extra])
+        versions = tuple(int(value or 0) for value in values[:len(keys)])
+        data = values[len(keys)]
+        entry = _Entry.unpack(data) if data else None
+        return versions, entry, values[len(keys) + 1:]
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    async def lookup(self, url, keys):
+        """(유효한 저장 응답 또는 None, 현재 버전) - 버전은 라우트 실행 전에 읽어 store() 에 전달"""
+        versions, entry, _ = await self._read(url, keys)
+        if entry is None or entry.versions != versions:
+            self._count('_misses')
+            return None, versions
+        self._count('_hits')
+        return entry, versions
+
+    async def versions(self, keys):
+        values = await cache.get_many([_version_key(key) for key in keys])
+        return tuple(int(value or 0) for value in values)
+
+    async def lock_or_wait(self, url, keys):
+        """
+        저장된 응답이 없을 때 호출
+        - 잠금을 잡으면 (None, 토큰, 버전): 라우트를 실행해 store() 후 unlock()
+        - 다른 요청/워커가 만드는 중이면 저장될 때까지 기다려 (응답, None, 버전)
+        - 만드는 쪽이 실패했거나 시간 초과면 (None, None, 버전): 잠금 없이 실행
+        """
+        token = await cache.acquire_lock(_entry_key(url), RESPONSE_CACHE_LOCK_TIMEOUT)
+        if token is not None:
+            return None, token, await self.versions(keys)
+
+        self._count('_waits')
+        deadline = time.monotonic() + RESPONSE_CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            versions, entry, (lock,) = await self._read(url, keys, ["lock:" + _entry_key(url)])
+            if entry is not None and entry.versions == versions:
+                return entry, None, versions
+            if lock is None:
+                break
+        return None, None, await self.versions(keys)
+
+    async def unlock(self, url, token):
+        await cache.release_lock(_entry_key(url), token)
+
+    async def store(self, url, versions, body, media_type):
+        """응답 저장 후 ETag 반환 (versions 는 라우트 실행 전에 읽은 값)"""
+        entry = _Entry(make_etag(body), body, media_type, versions)
+        if len(body) <= RESPONSE_CACHE_MAX_BODY:
+            await cache.set(_entry_key(url), entry.pack(), self.ttl)
+        return entry.etag
+
+    def record_not_modified(self):
+        self._count('_not_modified')
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ttl": self.ttl,
+                "hits_total": self._hits,
+                "misses_total": self._misses,
+                "not_modified_total": self._not_modified,
+                "lock_waits_total": self._waits,
+                "store": cache.stats(),
+            }
+
+
+# 모든 요청이 공유하는 응답 캐시
+response_cache = ResponseCache()
@@ -0,0 +1,123 @@
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request
+from fastapi.responses import Response, PlainTextResponse
+from typing import Optional
+import hmac
+import os
+import time
+from profiling import (profiler, MODES, SAMPLING, DETERMINISTIC, PROFILE_MAX_SECONDS, PROFILE_SAMPLE_INTERVAL_MS,
+                       ProfileBusyError, ProfilerUnavailableError)
+
+# 관리 기능 토큰 (X-Admin-Token 헤더), 설정하지 않으면 관리 기능 사용 불가
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+# 요청 수로 측정할 때 최대 요청 수
+PROFILE_MAX_REQUESTS = 10000
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """X-Admin-Token 헤더 확인"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="ADMIN_TOKEN 이 설정되지 않아 관리 기능을 사용할 수 없습니다")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="관리자 토큰이 올바르지 않습니다")
+
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+def _resolve_route(app, route):
+    """경로 패턴 또는 실제 경로(/api/patients/1) -> 라우트 경로 패턴, 없으면 HTTPException"""
+    from starlette.routing import Match
+
+    templates = {getattr(candidate, "path", None) for candidate in app.router.routes}
+    if route in templates:
+        return route
+    scope = {"type": "http", "path": route, "root_path": "", "method": "GET"}
+    for candidate in app.router.routes:
+        if candidate.matches(scope)[0] != Match.NONE and getattr(candidate, "path", None):
+            return candidate.path
+    raise HTTPException(status_code=400, detail=f"알 수 없는 경로입니다: {route}")
+
+@router.post("/profile/start")
+async def start_profile(
+    request: Request,
+    mode: str = Query(SAMPLING, description="sampling (collapsed stacks) 또는 deterministic (cProfile, pstats)"),
+    seconds: Optional[float] = Query(None, gt=0, le=PROFILE_MAX_SECONDS,
+                                     description="측정 시간(초), requests 와 함께 쓰면 최대 대기 시간"),
+    requests: Optional[int] = Query(None, ge=1, le=PROFILE_MAX_REQUESTS, description="경로가 맞는 다음 N개 요청만 측정"),
+    route: Optional[str] = Query(None, description="대상 경로 패턴 (/api/patients/search) 또는 실제 경로, 없으면 모든 요청"),
+    method: Optional[str] = Query(None, description="대상 HTTP 메서드"),
+    interval_ms: float = Query(PROFILE_SAMPLE_INTERVAL_MS, ge=1, le=1000, description="sampling 수집 간격(ms)")
+):
+    """
+    이 워커의 CPU 프로파일 시작 (한 번에 하나)
+    - requests 가 없으면 seconds(기본 30초) 동안 전체 측정
+    - requests 가 있으면 route/method 가 맞는 다음 N개 요청을 처리하는 동안만 측정 (seconds 가 지나면 종료)
+    """
+    if mode not in MODES:
+        raise HTTPException(status_code=400, detail=f"mode 는 {', '.join(MODES)} 중 하나여야 합니다")
+    if requests is None and (route or method):
+        raise HTTPException(status_code=400, detail="route/method 는 requests 와 함께 지정해야 합니다")
+    if seconds is None:
+        seconds = PROFILE_MAX_SECONDS if requests else min(30.0, PROFILE_MAX_SECONDS)
+    if route:
+        route = _resolve_route(request.app, route)
+
+    try:
+        session = profiler.start(mode, seconds, requests, route, method.upper() if method else None, interval_ms)
+    except ProfileBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ProfilerUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return session.to_dict()
+
+@router.post("/profile/stop")
+async def stop_profile():
+    """진행 중인 프로파일 중지 (결과는 /profile/result 에서 받음)"""
+    session = profiler.stop()
+    if session is None:
+        raise HTTPException(status_code=409, detail="진행 중인 프로파일이 없습니다")
+    return session.to_dict()
+
+@router.get("/profile")
+async def get_profile():
+    """진행 중이거나 마지막으로 끝난 프로파일 상태"""
+    if profiler.session is None:
+        raise HTTPException(status_code=404, detail="프로파일 기록이 없습니다")
+    return profiler.session.to_dict()
+
+@router.get("/profile/result")
+async def get_profile_result(
+    format: str = Query("text", description="collapsed (sampling), pstats (deterministic), text (요약)")
+):
+    """
+    마지막으로 끝난 프로파일 결과 다운로드
+    - collapsed: flamegraph.pl / speedscope 로 불꽃 그래프 (sampling)
+    - pstats: python -m pstats, snakeviz 로 분석 (deterministic)
+    - text: 함수별 요약
+    """
+    session = profiler.session
+    if session is None:
+        raise HTTPException(status_code=404, detail="프로파일 기록이 없습니다")
+    if session.running:
+        raise HTTPException(status_code=409, detail="프로파일이 진행 중입니다 (끝난 뒤 받거나 먼저 중지하세요)")
+
+    name = f"profile-{session.pid}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(session.started_at))}"
+    if format == "text":
+        return PlainTextResponse(profiler.text(session))
+    if format == "collapsed":
+        if session.mode != SAMPLING:
+            raise HTTPException(status_code=400, detail="collapsed 는 sampling 모드 결과만 가능합니다")
+        return Response(
+            content=profiler.collapsed(session), media_type="text/plain; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{name}.collapsed"'}
+        )
+    if format == "pstats":
+        if session.mode != DETERMINISTIC:
+            raise HTTPException(status_code=400, detail="pstats 는 deterministic 모드 결과만 가능합니다")
+        return Response(
+            content=profiler.pstats_bytes(session), media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{name}.pstats"'}
+        )
+    raise HTTPException(status_code=400, detail="format 은 collapsed, pstats, text 중 하나여야 합니다")
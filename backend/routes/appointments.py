@@ -1,143 +1,432 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
-from datetime import datetime, date
-from database import execute_query, get_db_connection
+from datetime import datetime, date, timedelta
+from date_range import day_range, today_range, range_condition
+from pagination import NEXT_CURSOR_HEADER, decode_cursor, split_page, keyset_condition
+from database import execute_query_async, run_transaction_async, run_in_db_thread, DatabaseConnectionError
 from schemas import Appointment
+from stats_service import today_stats, sum_deltas
+from live_feed import live_feed
+from response_cache import response_cache
+from fast_json import rows_response, parse_fields
+from export_stream import export_response
+from departments import department_cache, ensure_departments_loaded, check_department, register_doctors
+from scheduling import (
+    MAX_SLOT_DAYS, CANCELLED_STATUS, SlotConflictError, work_hours, booked_index,
+    ensure_schedules_loaded, free_slots, load_booked, lock_doctor, find_conflict
+)
+from bulk_insert import (
+    MAX_BULK_ROWS, RowError, parse_datetime, optional_text,
+    insert_rows, lookup_patients, patient_for_row, summarize
+)
 
 router = APIRouter(prefix="/api/appointments", tags=["appointments"])
 
-@router.get("/", response_model=List[Appointment])
-async def get_appointments(
-    date_from: Optional[date] = Query(None, description="시작 날짜"),
-    date_to: Optional[date] = Query(None, description="종료 날짜"),
-    department: Optional[str] = Query(None, description="진료과"),
-    status: Optional[str] = Query(None, description="예약 상태"),
-    limit: int = Query(50, description="조회할 예약 수")
-):
+def _appointments_filter(date_from=None, date_to=None, department=None, status=None):
+    """목록/내보내기 공통 필터 조건 SQL 조각 목록과 파라미터"""
+    start, end = day_range(date_from, date_to)
+    conditions, params = range_condition("a.appointment_date", start, end)
+    
+    if department:
+        conditions.append("a.department = %s")
+        params.append(department)
+    
+    if status:
+        conditions.append("a.status = %s")
+        params.append(status)
+    
+    return conditions, params
+
+def _appointments_columns(fields=None):
+    """목록 조회 SELECT 열 (fields 미지정 시 전체 + 환자 정보)"""
+    if fields is None:
+        return "a.*, p.name as patient_name, p.patient_no, p.phone"
+    names = dict.fromkeys(fields + ("appointment_date", "appointment_id"))
+    return ", ".join(f"a.{name}" for name in names)
+
+def _appointments_list_query(date_from=None, date_to=None, department=None, status=None, limit=50, cursor=None,
+                             fields=None):
     """
-    예약 목록 조회 (필터링 가능)
+    예약 목록 조회 SQL (날짜순, limit + 1 건)
+    - 날짜 필터는 반열림 구간으로 비교해 idx_appointment_date, idx_status_date 사용
+    - 잘못된 커서는 ValueError
+    - fields 를 지정하면 그 열과 커서용 정렬 열만 조회
     """
-    sql = """
-        SELECT a.*, p.name as patient_name, p.patient_no, p.phone
+    sql = f"""
+        SELECT {_appointments_columns(fields)}
         FROM appointments a
         JOIN patients p ON a.patient_id = p.patient_id
         WHERE 1=1
     """
-    params = []
-    
-    if date_from:
-        sql += " AND DATE(a.appointment_date) >= %s"
-        params.append(date_from)
+    conditions, params = _appointments_filter(date_from, date_to, department, status)
+    for condition in conditions:
+        sql += " AND " + condition
     
-    if date_to:
-        sql += " AND DATE(a.appointment_date) <= %s"
-        params.append(date_to)
+    if cursor:
+        appointment_date, appointment_id = decode_cursor(cursor, datetime.fromisoformat, int)
+        condition, condition_params = keyset_condition(
+            "a.appointment_date", "a.appointment_id", appointment_date, appointment_id, descending=False
+        )
+        sql += " AND " + condition
+        params.extend(condition_params)
     
-    if department:
-        sql += " AND a.department = %s"
-        params.append(department)
+    # 다음 페이지 존재 여부 확인을 위해 1건 더 조회
+    sql += " ORDER BY a.appointment_date ASC, a.appointment_id ASC LIMIT %s"
+    params.append(limit + 1)
     
-    if status:
-        sql += " AND a.status = %s"
-        params.append(status)
+    return sql, tuple(params)
+
+APPOINTMENT_EXPORT_COLUMNS = ("appointment_id", "patient_id", "patient_no", "patient_name", "phone",
+                              "appointment_date", "department", "doctor_name", "status", "created_at")
+
+def _appointments_export_query(date_from=None, date_to=None, department=None, status=None):
+    """예약 내보내기 SQL (날짜순 전체, LIMIT 없음 - 서버 측 커서로 스트리밍)"""
+    sql = """
+        SELECT a.appointment_id, a.patient_id, p.patient_no, p.name as patient_name, p.phone,
+               a.appointment_date, a.department, a.doctor_name, a.status, a.created_at
+        FROM appointments a
+        JOIN patients p ON a.patient_id = p.patient_id
+        WHERE 1=1
+    """
+    conditions, params = _appointments_filter(date_from, date_to, department, status)
+    for condition in conditions:
+        sql += " AND " + condition
+    sql += " ORDER BY a.appointment_date ASC, a.appointment_id ASC"
     
-    sql += " ORDER BY a.appointment_date ASC LIMIT %s"
-    params.append(limit)
+    return sql, tuple(params)
+
+def _today_appointments_query():
+    """오늘의 예약 목록 조회 SQL"""
+    start, end = today_range()
+    sql = """
+        SELECT a.*, p.name as patient_name, p.patient_no, p.phone
+        FROM appointments a
+        JOIN patients p ON a.patient_id = p.patient_id
+        WHERE a.status = '예약' AND a.appointment_date >= %s AND a.appointment_date < %s
+        ORDER BY a.appointment_date ASC
+    """
+    return sql, (start, end)
+
+def _upcoming_appointments_query(days):
+    """향후 예약 목록 조회 SQL"""
+    now = datetime.now()
+    sql = """
+        SELECT a.*, p.name as patient_name, p.patient_no, p.phone
+        FROM appointments a
+        JOIN patients p ON a.patient_id = p.patient_id
+        WHERE a.status = '예약'
+        AND a.appointment_date >= %s 
+        AND a.appointment_date <= %s
+        ORDER BY a.appointment_date ASC
+    """
+    return sql, (now, now + timedelta(days=days))
+
+@router.get("/", response_model=List[Appointment])
+async def get_appointments(
+    date_from: Optional[date] = Query(None, description="시작 날짜"),
+    date_to: Optional[date] = Query(None, description="종료 날짜"),
+    department: Optional[str] = Query(None, description="진료과"),
+    status: Optional[str] = Query(None, description="예약 상태"),
+    limit: int = Query(50, ge=1, le=500, description="조회할 예약 수"),
+    cursor: Optional[str] = Query(None, description="다음 페이지 커서 (X-Next-Cursor 응답 헤더 값)"),
+    fields: Optional[str] = Query(None, description="응답에 포함할 필드 (쉼표 구분, 예: appointment_id,appointment_date,status)")
+):
+    """
+    예약 목록 조회 (필터링 가능, 날짜순 커서 페이징)
+    - 다음 페이지가 있으면 X-Next-Cursor 헤더로 커서 반환 (같은 필터로 다시 요청)
+    - fields 로 필요한 필드만 조회/응답 (예: fields=appointment_id,appointment_date,status)
+    """
+    try:
+        selected = parse_fields(fields, Appointment)
+        sql, params = _appointments_list_query(date_from, date_to, department, status, limit, cursor, selected)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    results = execute_query(sql, tuple(params))
+    results = await execute_query_async(sql, params)
     
     if results is None:
         raise HTTPException(status_code=500, detail="예약 조회 중 오류가 발생했습니다")
     
-    return results
+    results, next_cursor = split_page(results, limit, "appointment_date", "appointment_id")
+    return rows_response(results, Appointment, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None, selected)
+
+@router.get("/export")
+async def export_appointments(
+    date_from: Optional[date] = Query(None, description="시작 날짜"),
+    date_to: Optional[date] = Query(None, description="종료 날짜"),
+    department: Optional[str] = Query(None, description="진료과"),
+    status: Optional[str] = Query(None, description="예약 상태"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv 또는 ndjson")
+):
+    """
+    예약 내보내기 (날짜순 전체, CSV/NDJSON 스트리밍)
+    - 건수 제한 없이 DB 에서 읽는 대로 전송하므로 한 달치도 메모리 사용량이 일정
+    - 정산/통계 배치용 (일별: date_from=date_to=해당 날짜, 월별: 1일 ~ 말일)
+    """
+    sql, params = _appointments_export_query(date_from, date_to, department, status)
+    filename = "_".join(["appointments", *[str(day) for day in (date_from, date_to) if day]])
+    return await export_response(sql, params, APPOINTMENT_EXPORT_COLUMNS, format, filename)
+
+@router.get("/slots")
+async def get_free_slots(
+    department: str = Query(..., description="진료과"),
+    doctor_name: Optional[str] = Query(None, description="담당의 (미지정 시 진료과 전체 담당의)"),
+    date_from: Optional[date] = Query(None, description="시작 날짜 (기본: 오늘)"),
+    date_to: Optional[date] = Query(None, description="종료 날짜 (기본: 시작 날짜)")
+):
+    """
+    빈 예약 시간 조회 (기간 내 담당의별, 한 번의 호출)
+    - 진료 시간표(work_hours)의 슬롯 중 예약되지 않은 지난 시각이 아닌 슬롯
+    - 예약 현황은 진료과/날짜 단위 메모리 인덱스 사용 (BOOKED_CACHE_TTL 초마다 DB 에서 갱신)
+    """
+    date_from = date_from or date.today()
+    date_to = date_to or date_from
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="종료 날짜가 시작 날짜보다 빠릅니다")
+    if (date_to - date_from).days >= MAX_SLOT_DAYS:
+        raise HTTPException(status_code=400, detail=f"최대 {MAX_SLOT_DAYS}일까지 조회할 수 있습니다")
+    
+    if not await ensure_departments_loaded() or not await ensure_schedules_loaded():
+        raise HTTPException(status_code=500, detail="진료 시간표 조회 중 오류가 발생했습니다")
+    dept = department_cache.get(department)
+    if dept is None:
+        raise HTTPException(status_code=400, detail=f"존재하지 않는 진료과입니다: {department}")
+    doctors = [doctor_name] if doctor_name else dept['doctors']
+    
+    if not await run_in_db_thread(load_booked, department, date_from, date_to):
+        raise HTTPException(status_code=500, detail="예약 현황 조회 중 오류가 발생했습니다")
+    
+    return {
+        "department": department,
+        "date_from": date_from,
+        "date_to": date_to,
+        "doctors": free_slots(department, doctors, date_from, date_to)
+    }
 
 @router.get("/today", response_model=List[Appointment])
 async def get_today_appointments():
     """
     오늘의 예약 목록
     """
-    sql = """
-        SELECT a.*, p.name as patient_name, p.patient_no, p.phone
-        FROM appointments a
-        JOIN patients p ON a.patient_id = p.patient_id
-        WHERE DATE(a.appointment_date) = CURDATE() AND a.status = '예약'
-        ORDER BY a.appointment_date ASC
-    """
+    sql, params = _today_appointments_query()
     
-    results = execute_query(sql)
+    results = await execute_query_async(sql, params)
     
     if results is None:
         raise HTTPException(status_code=500, detail="오늘 예약 조회 중 오류가 발생했습니다")
     
-    return results
+    return rows_response(results, Appointment)
 
 @router.get("/upcoming", response_model=List[Appointment])
-async def get_upcoming_appointments(days: int = Query(7, description="조회할 일수")):
+async def get_upcoming_appointments(days: int = Query(7, ge=1, le=365, description="조회할 일수")):
     """
     향후 예약 목록 (기본 7일)
     """
-    sql = """
-        SELECT a.*, p.name as patient_name, p.patient_no, p.phone
-        FROM appointments a
-        JOIN patients p ON a.patient_id = p.patient_id
-        WHERE a.appointment_date >= NOW() 
-        AND a.appointment_date <= DATE_ADD(NOW(), INTERVAL %s DAY)
-        AND a.status = '예약'
-        ORDER BY a.appointment_date ASC
-    """
+    sql, params = _upcoming_appointments_query(days)
     
-    results = execute_query(sql, (days,))
+    results = await execute_query_async(sql, params)
     
     if results is None:
         raise HTTPException(status_code=500, detail="예약 조회 중 오류가 발생했습니다")
     
-    return results
+    return rows_response(results, Appointment)
+
+def _insert_appointment(cursor, appointment_data, new_doctor=None, slot_minutes=None):
+    """
+    환자 존재 확인 후 예약 추가 (트랜잭션 내부에서 실행)
+    - 실시간 피드로 보낼 예약 정보(환자명 포함) 반환
+    - new_doctor: 처음 보는 담당의 (dept_id, 이름), 같은 트랜잭션에서 doctors 에 추가
+    - 담당의가 있으면 담당의 행을 잠근 뒤 겹치는 예약 확인 (있으면 409)
+    """
+    # 환자 존재 확인 (피드 표시용 환자명도 함께 조회)
+    check_query = "SELECT name, patient_no FROM patients WHERE patient_id = %s"
+    cursor.execute(check_query, (appointment_data['patient_id'],))
+    patient = cursor.fetchone()
+    if patient is None:
+        raise HTTPException(status_code=400, detail="존재하지 않는 환자입니다")
+    
+    # 같은 담당의 예약은 한 번에 하나씩 등록 (처음 보는 담당의는 먼저 추가해야 잠글 수 있음)
+    if new_doctor:
+        register_doctors(cursor, [new_doctor])
+    dept = department_cache.get(appointment_data['department'])
+    if dept and appointment_data['doctor_name'] and appointment_data.get('status', '예약') != CANCELLED_STATUS:
+        lock_doctor(cursor, dept['dept_id'], appointment_data['doctor_name'])
+        try:
+            find_conflict(
+                cursor, appointment_data['department'], appointment_data['doctor_name'],
+                appointment_data['appointment_date'], slot_minutes
+            )
+        except SlotConflictError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    
+    # 예약 추가
+    insert_query = """
+        INSERT INTO appointments 
+        (patient_id, appointment_date, department, doctor_name, status)
+        VALUES (%s, %s, %s, %s, %s)
+    """
+    appointment = {
+        "patient_id": appointment_data['patient_id'],
+        "appointment_date": appointment_data['appointment_date'],
+        "department": appointment_data['department'],
+        "doctor_name": appointment_data['doctor_name'],
+        "status": appointment_data.get('status', '예약')
+    }
+    cursor.execute(insert_query, (
+        appointment['patient_id'],
+        appointment['appointment_date'],
+        appointment['department'],
+        appointment['doctor_name'],
+        appointment['status']
+    ))
+    appointment['appointment_id'] = cursor.lastrowid
+    appointment['patient_name'], appointment['patient_no'] = patient
+    return appointment
 
 @router.post("/")
 async def create_appointment(appointment_data: dict):
     """
-    새 예약 추가
+    새 예약 추가 (진료과는 기준 정보 캐시로 검증)
+    - 진료 시간표가 있는 진료과는 진료 시간 내 슬롯 시작 시각만 허용 (400)
+    - 같은 담당의의 겹치는 예약이 있으면 409
     """
-    connection = get_db_connection()
-    if connection is None:
-        raise HTTPException(status_code=500, detail="데이터베이스 연결 실패")
+    if not await ensure_departments_loaded() or not await ensure_schedules_loaded():
+        raise HTTPException(status_code=500, detail="진료과 목록 조회 중 오류가 발생했습니다")
+    appointment_data = dict(appointment_data)
+    appointment_data.setdefault('department', None)
+    appointment_data.setdefault('doctor_name', None)
+    try:
+        appointment_data['appointment_date'] = parse_datetime(appointment_data.get('appointment_date'), 'appointment_date')
+        new_doctor = check_department(appointment_data['department'], appointment_data['doctor_name'])
+        slot_minutes = None
+        if appointment_data['doctor_name']:
+            slot_minutes = work_hours.slot_minutes(
+                appointment_data['department'], appointment_data['doctor_name'], appointment_data['appointment_date']
+            )
+    except (RowError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
-        cursor = connection.cursor()
-        
-        # 환자 존재 확인
-        check_query = "SELECT COUNT(*) FROM patients WHERE patient_id = %s"
-        cursor.execute(check_query, (appointment_data['patient_id'],))
-        if cursor.fetchone()[0] == 0:
-            raise HTTPException(status_code=400, detail="존재하지 않는 환자입니다")
-        
-        # 예약 추가
-        insert_query = """
-            INSERT INTO appointments 
-            (patient_id, appointment_date, department, doctor_name, status)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        cursor.execute(insert_query, (
-            appointment_data['patient_id'],
-            appointment_data['appointment_date'],
-            appointment_data['department'],
-            appointment_data['doctor_name'],
-            appointment_data.get('status', '예약')
-        ))
-        
-        connection.commit()
-        
-        # 생성된 예약 ID 반환
-        appointment_id = cursor.lastrowid
-        return {
-            "appointment_id": appointment_id,
-            "patient_id": appointment_data['patient_id'],
-            "message": "예약 추가 성공"
-        }
-        
+        appointment = await run_transaction_async(_insert_appointment, appointment_data, new_doctor, slot_minutes)
+    except HTTPException:
+        raise
+    except DatabaseConnectionError:
+        raise HTTPException(status_code=500, detail="데이터베이스 연결 실패")
     except Exception as e:
-        connection.rollback()
         raise HTTPException(status_code=500, detail=f"예약 추가 실패: {str(e)}")
-    finally:
-        cursor.close()
-        connection.close()
\ No newline at end of file
+    
+    if new_doctor:
+        department_cache.add_doctor(appointment['department'], appointment['doctor_name'])
+    if appointment['department'] and appointment['status'] != CANCELLED_STATUS:
+        booked_index.add(appointment['department'], appointment['doctor_name'], appointment['appointment_date'])
+    
+    # 저장된 조회 응답 (환자 상세, 오늘 목록, 통계, 진료과) 무효화
+    await response_cache.bump(f"patient:{appointment['patient_id']}", "appointments", "stats", *(["departments"] if new_doctor else []))
+    
+    # 통계 갱신 및 대시보드에 실시간 전달
+    delta = today_stats.record_appointment_created(appointment['appointment_date'], appointment['status'])
+    live_feed.publish("appointment", appointment)
+    if delta:
+        live_feed.publish("stats", {"delta": delta})
+    
+    # 생성된 예약 ID 반환
+    return {
+        "appointment_id": appointment['appointment_id'],
+        "patient_id": appointment['patient_id'],
+        "message": "예약 추가 성공"
+    }
+
+APPOINTMENT_COLUMNS = ("patient_id", "appointment_date", "department", "doctor_name", "status")
+
+def _bulk_insert_appointments(cursor, rows):
+    """
+    예약 일괄 추가 (트랜잭션 내부에서 실행)
+    - 환자는 patient_id 또는 patient_no 로 지정, 한 번의 조회로 확인
+    - 검증 실패 행은 error 로 건너뛰고 나머지를 다중 행 INSERT
+    """
+    results = [None] * len(rows)
+    patients = lookup_patients(cursor, rows)
+    pending = []  # (index, appointment)
+    new_doctors = []  # 처음 보는 담당의 (dept_id, 이름)
+    
+    for index, row in enumerate(rows):
+        try:
+            patient_id, patient_name, patient_no = patient_for_row(row, patients)
+            appointment = {
+                "patient_id": patient_id,
+                "appointment_date": parse_datetime(row.get('appointment_date'), 'appointment_date'),
+                "department": optional_text(row, 'department', 30),
+                "doctor_name": optional_text(row, 'doctor_name', 30),
+                "status": optional_text(row, 'status', 10) or '예약',
+                "patient_name": patient_name,
+                "patient_no": patient_no
+            }
+            new_doctor = check_department(appointment['department'], appointment['doctor_name'])
+        except (RowError, ValueError) as e:
+            results[index] = {"index": index, "status": "error", "error": str(e)}
+            continue
+        pending.append((index, appointment))
+        if new_doctor:
+            new_doctors.append(new_doctor)
+    
+    created = []
+    if pending:
+        ids = insert_rows(
+            cursor, "appointments", "appointment_id", APPOINTMENT_COLUMNS,
+            [tuple(appointment[column] for column in APPOINTMENT_COLUMNS) for _, appointment in pending]
+        )
+        for (index, appointment), appointment_id in zip(pending, ids):
+            appointment['appointment_id'] = appointment_id
+            results[index] = {
+                "index": index, "status": "created",
+                "appointment_id": appointment_id, "patient_id": appointment['patient_id']
+            }
+            created.append(appointment)
+        
+        register_doctors(cursor, new_doctors)
+    
+    return results, created
+
+@router.post("/bulk")
+async def create_appointments_bulk(rows: List[dict]):
+    """
+    예약 일괄 추가 (최대 1000건, 한 트랜잭션)
+    - 행별 결과(created/error)와 부여된 appointment_id 반환
+    - 기존 기록 적재용으로 진료 시간/중복 예약은 확인하지 않음 (새 예약은 POST /api/appointments/)
+    """
+    if len(rows) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=413, detail=f"한 번에 최대 {MAX_BULK_ROWS}건까지 추가할 수 있습니다")
+    
+    if not await ensure_departments_loaded():
+        raise HTTPException(status_code=500, detail="진료과 목록 조회 중 오류가 발생했습니다")
+    
+    try:
+        results, created = await run_transaction_async(_bulk_insert_appointments, rows)
+    except DatabaseConnectionError:
+        raise HTTPException(status_code=500, detail="데이터베이스 연결 실패")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"예약 일괄 추가 실패: {str(e)}")
+    
+    for appointment in created:
+        if appointment['department'] and appointment['doctor_name']:
+            department_cache.add_doctor(appointment['department'], appointment['doctor_name'])
+    if created:
+        booked_index.invalidate()
+        await response_cache.bump(
+            "appointments", "stats", "departments",
+            *{f"patient:{appointment['patient_id']}" for appointment in created}
+        )
+    
+    # 통계 갱신 및 대시보드에 실시간 전달 (오늘 예약만)
+    today = date.today()
+    delta = sum_deltas(
+        today_stats.record_appointment_created(appointment['appointment_date'], appointment['status'])
+        for appointment in created
+    )
+    for appointment in created:
+        if appointment['appointment_date'].date() == today:
+            live_feed.publish("appointment", appointment)
+    if delta:
+        live_feed.publish("stats", {"delta": delta})
+    
+    return summarize(results)
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException
+from departments import department_cache, ensure_departments_loaded
+from scheduling import work_hours, booked_index
+from database import run_in_db_thread
+from response_cache import response_cache
+
+router = APIRouter(prefix="/api/departments", tags=["departments"])
+
+@router.get("/")
+async def get_departments():
+    """
+    진료과 목록 (위치, 전화번호, 담당의 포함, 메모리 캐시)
+    """
+    if not await ensure_departments_loaded():
+        raise HTTPException(status_code=500, detail="진료과 목록 조회 중 오류가 발생했습니다")
+    
+    return department_cache.all()
+
+@router.post("/reload")
+async def reload_departments():
+    """
+    진료과/담당의/진료 시간표 캐시 다시 적재 (departments, doctors, work_hours 테이블 변경 후 호출)
+    """
+    department_cache.invalidate()
+    work_hours.invalidate()
+    booked_index.invalidate()
+    await run_in_db_thread(department_cache.refresh)
+    await run_in_db_thread(work_hours.refresh)
+    await response_cache.bump("departments")
+    
+    if not department_cache.loaded:
+        raise HTTPException(status_code=500, detail="진료과 목록 조회 중 오류가 발생했습니다")
+    
+    return {"departments": len(department_cache.all()), "message": "진료과 캐시 갱신 완료"}
@@ -1,16 +1,63 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
-from database import execute_query, execute_single_query, get_db_connection
+from datetime import datetime
+import asyncio
+import re
+from database import execute_query_async, execute_single_query_async, run_transaction_async, run_in_db_thread, DatabaseConnectionError
 from schemas import Patient, PatientSearch, PatientDetail, Visit, Appointment
+from pagination import NEXT_CURSOR_HEADER, decode_cursor, split_page, keyset_condition
+from search_index import patient_index, is_chosung_query
+from stats_service import today_stats
+from live_feed import live_feed
+from response_cache import response_cache
+from fast_json import FastJSONResponse, project, project_rows, rows_response
+from bulk_insert import MAX_BULK_ROWS, RowError, patient_no_key, patient_values, insert_rows, select_in, summarize
 
 router = APIRouter(prefix="/api/patients", tags=["patients"])
 
+# 검색 결과 최대 건수 (페이지당)
+MAX_SEARCH_RESULTS = 50
+
+# 환자번호 검색어 (P + 숫자, bench_api.py 데이터는 PB + 숫자) - 그 외 문자 검색어는 환자명 검색
+PATIENT_NO_PATTERN = re.compile(r"[Pp][Bb]?[0-9]+")
+
+def _escape_like(term):
+    """LIKE 패턴 특수문자 이스케이프"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _search_rows_sql(page_sql):
+    """
+    검색 결과 한 페이지의 환자 정보 + 진료 통계 조회 SQL
+    - page_sql: 해당 페이지의 patient_id 만 고르는 서브쿼리
+    - 진료 통계는 patient_visit_summary 에서 기본키로 조회
+    """
+    return f"""
+        SELECT 
+            p.patient_id,
+            p.patient_no,
+            p.name,
+            p.birth_date,
+            p.gender,
+            p.phone,
+            p.created_at,
+            COALESCE(s.visit_count, 0) as visit_count,
+            s.last_visit_date
+        FROM ({page_sql}) page
+        JOIN patients p ON p.patient_id = page.patient_id
+        LEFT JOIN patient_visit_summary s ON s.patient_id = p.patient_id
+    """
+
 @router.get("/search", response_model=List[PatientSearch])
-async def search_patients(query: str = Query(..., description="환자명 또는 환자번호")):
+async def search_patients(
+    query: str = Query(..., description="환자명, 초성 또는 환자번호"),
+    limit: int = Query(MAX_SEARCH_RESULTS, ge=1, le=MAX_SEARCH_RESULTS, description="조회할 환자 수"),
+    offset: int = Query(0, ge=0, le=1000, description="시작 위치")
+):
     """
     환자 검색 (이름 또는 환자번호로 검색)
-    - 숫자만 입력: 환자번호로 검색
-    - 문자 포함: 환자명으로 검색
+    - 숫자만 입력 또는 P+숫자: 환자번호 앞부분 일치 (예: 2024 -> P2024...)
+    - 문자 포함: 환자명 부분 일치 (초성 검색 지원, 예: ㄱㅁㅈ)
+    - 서버 시작 직후 환자명 색인 적재 중에는 DB 에서 검색 (초성 검색은 503)
     """
     
     # 검색어가 비어있으면 에러
@@ -19,50 +66,48 @@ async def search_patients(query: str = Query(..., description="환자명 또는
     
     # 검색어 앞뒤 공백 제거
     search_term = query.strip()
+    order_ids = None
     
-    # 숫자로만 구성되어 있으면 환자번호로 검색
-    if search_term.isdigit() or search_term.startswith('P'):
-        sql = """
-            SELECT 
-                p.patient_id,
-                p.patient_no,
-                p.name,
-                p.birth_date,
-                p.gender,
-                p.phone,
-                p.created_at,
-                COUNT(DISTINCT v.visit_id) as visit_count,
-                MAX(v.visit_date) as last_visit_date
-            FROM patients p
-            LEFT JOIN visits v ON p.patient_id = v.patient_id
-            WHERE p.patient_no LIKE %s
-            GROUP BY p.patient_id
-            ORDER BY p.name
-        """
-        params = (f"%{search_term}%",)
+    # 숫자로만 구성되어 있거나 P+숫자면 환자번호 앞부분으로 검색 (idx_patient_no 사용)
+    if search_term.isdigit() or PATIENT_NO_PATTERN.fullmatch(search_term):
+        patient_no = search_term.upper()
+        if patient_no.isdigit():
+            patient_no = "P" + patient_no
+        sql = _search_rows_sql("""
+            SELECT patient_id FROM patients
+            WHERE patient_no LIKE %s
+            ORDER BY patient_no
+            LIMIT %s OFFSET %s
+        """) + " ORDER BY p.patient_no"
+        params = (_escape_like(patient_no) + "%", limit, offset)
     else:
-        # 문자가 포함되어 있으면 환자명으로 검색
-        sql = """
-            SELECT 
-                p.patient_id,
-                p.patient_no,
-                p.name,
-                p.birth_date,
-                p.gender,
-                p.phone,
-                p.created_at,
-                COUNT(DISTINCT v.visit_id) as visit_count,
-                MAX(v.visit_date) as last_visit_date
-            FROM patients p
-            LEFT JOIN visits v ON p.patient_id = v.patient_id
-            WHERE p.name LIKE %s
-            GROUP BY p.patient_id
-            ORDER BY p.name
-            LIMIT 50
-        """
-        params = (f"%{search_term}%",)
-    
-    results = execute_query(sql, params)
+        # 문자가 포함되어 있으면 환자명 색인으로 검색
+        if patient_index.is_stale():
+            await run_in_db_thread(patient_index.refresh)
+        
+        if patient_index.loaded:
+            order_ids = patient_index.search(search_term, limit, offset)
+            if not order_ids:
+                return []
+            placeholders = ", ".join(["%s"] * len(order_ids))
+            sql = _search_rows_sql(
+                f"SELECT patient_id FROM patients WHERE patient_id IN ({placeholders})"
+            )
+            params = tuple(order_ids)
+        elif is_chosung_query(search_term):
+            raise HTTPException(status_code=503, detail="환자명 색인 적재 중입니다. 잠시 후 다시 시도해주세요")
+        else:
+            # 색인 준비 전에는 DB 에서 같은 기준(부분 일치, 앞부분 일치 먼저, 이름순)으로 검색
+            sql = _search_rows_sql("""
+                SELECT patient_id FROM patients
+                WHERE name LIKE %s
+                ORDER BY name NOT LIKE %s, name, patient_id
+                LIMIT %s OFFSET %s
+            """) + " ORDER BY p.name NOT LIKE %s, p.name, p.patient_id"
+            term = _escape_like(search_term)
+            params = ("%" + term + "%", term + "%", limit, offset, term + "%")
+    
+    results = await execute_query_async(sql, params)
     
     if results is None:
         raise HTTPException(status_code=500, detail="데이터베이스 조회 중 오류가 발생했습니다")
@@ -70,131 +115,280 @@ async def search_patients(query: str = Query(..., description="환자명 또는
     if not results:
         return []
     
-    return results
+    # 색인 검색은 색인의 정렬 순서를 유지
+    if order_ids is not None:
+        position = {patient_id: i for i, patient_id in enumerate(order_ids)}
+        results.sort(key=lambda row: position[row['patient_id']])
+    
+    return rows_response(results, PatientSearch)
+
+def _visits_page_query(patient_id, limit, cursor):
+    """환자 진료 기록 한 페이지 조회 SQL (최신순)"""
+    sql = """
+        SELECT * FROM visits 
+        WHERE patient_id = %s
+    """
+    params = [patient_id]
+    
+    if cursor:
+        visit_date, visit_id = decode_cursor(cursor, datetime.fromisoformat, int)
+        condition, condition_params = keyset_condition("visit_date", "visit_id", visit_date, visit_id)
+        sql += " AND " + condition
+        params.extend(condition_params)
+    
+    sql += " ORDER BY visit_date DESC, visit_id DESC"
+    if limit is not None:
+        # 다음 페이지 존재 여부 확인을 위해 1건 더 조회
+        sql += " LIMIT %s"
+        params.append(limit + 1)
+    
+    return sql, tuple(params)
+
+def _appointments_page_query(patient_id, limit, cursor):
+    """환자 예약(취소 제외) 한 페이지 조회 SQL (날짜순)"""
+    sql = """
+        SELECT * FROM appointments 
+        WHERE patient_id = %s AND status != '취소'
+    """
+    params = [patient_id]
+    
+    if cursor:
+        appointment_date, appointment_id = decode_cursor(cursor, datetime.fromisoformat, int)
+        condition, condition_params = keyset_condition(
+            "appointment_date", "appointment_id", appointment_date, appointment_id, descending=False
+        )
+        sql += " AND " + condition
+        params.extend(condition_params)
+    
+    sql += " ORDER BY appointment_date ASC, appointment_id ASC"
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit + 1)
+    
+    return sql, tuple(params)
 
 @router.get("/{patient_id}", response_model=PatientDetail)
-async def get_patient_detail(patient_id: int):
+async def get_patient_detail(
+    patient_id: int,
+    visits_limit: Optional[int] = Query(None, ge=1, le=500, description="조회할 진료 기록 수 (미지정 시 전체)"),
+    visits_cursor: Optional[str] = Query(None, description="진료 기록 다음 페이지 커서"),
+    appointments_limit: Optional[int] = Query(None, ge=1, le=500, description="조회할 예약 수 (미지정 시 전체)"),
+    appointments_cursor: Optional[str] = Query(None, description="예약 다음 페이지 커서")
+):
     """
     환자 상세 정보 조회 (진료 기록, 예약 포함)
+    - 환자/진료 기록/예약 쿼리를 동시에 실행해 한 번의 왕복 시간으로 응답
+    - *_limit 지정 시 *_next_cursor 로 다음 페이지 조회
     """
+    try:
+        visits_sql, visits_params = _visits_page_query(patient_id, visits_limit, visits_cursor)
+        appointments_sql, appointments_params = _appointments_page_query(
+            patient_id, appointments_limit, appointments_cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # 환자 기본 정보 조회
     patient_sql = """
         SELECT * FROM patients WHERE patient_id = %s
     """
-    patient = execute_single_query(patient_sql, (patient_id,))
+    
+    # 환자 기본 정보, 진료 기록, 예약 정보를 각각 풀 커넥션에서 동시에 조회
+    patient, visits, appointments = await asyncio.gather(
+        execute_single_query_async(patient_sql, (patient_id,)),
+        execute_query_async(visits_sql, visits_params),
+        execute_query_async(appointments_sql, appointments_params)
+    )
     
     if not patient:
         raise HTTPException(status_code=404, detail="환자를 찾을 수 없습니다")
     
-    # 진료 기록 조회
-    visits_sql = """
-        SELECT * FROM visits 
-        WHERE patient_id = %s 
-        ORDER BY visit_date DESC
-    """
-    visits = execute_query(visits_sql, (patient_id,))
+    visits, visits_next_cursor = split_page(visits or [], visits_limit, "visit_date", "visit_id")
+    appointments, appointments_next_cursor = split_page(
+        appointments or [], appointments_limit, "appointment_date", "appointment_id"
+    )
     
-    # 예약 정보 조회
-    appointments_sql = """
-        SELECT * FROM appointments 
-        WHERE patient_id = %s AND status != '취소'
-        ORDER BY appointment_date ASC
+    # 조회 결과는 검증 없이 모델 필드만 골라 바로 직렬화 (fast_json)
+    return FastJSONResponse({
+        "patient": project(patient, Patient),
+        "visits": project_rows(visits, Visit),
+        "appointments": project_rows(appointments, Appointment),
+        "visits_next_cursor": visits_next_cursor,
+        "appointments_next_cursor": appointments_next_cursor
+    })
+
+def _patients_list_query(limit, cursor=None, offset=0):
+    """전체 환자 목록 조회 SQL (최근 등록순, limit + 1 건, 잘못된 커서는 ValueError)"""
+    sql = """
+        SELECT * FROM patients 
     """
-    appointments = execute_query(appointments_sql, (patient_id,))
+    params = []
     
-    return {
-        "patient": patient,
-        "visits": visits or [],
-        "appointments": appointments or []
-    }
+    if cursor:
+        created_at, patient_id = decode_cursor(cursor, datetime.fromisoformat, int)
+        condition, params = keyset_condition("created_at", "patient_id", created_at, patient_id)
+        sql += " WHERE " + condition
+    
+    # 다음 페이지 존재 여부 확인을 위해 1건 더 조회
+    sql += " ORDER BY created_at DESC, patient_id DESC LIMIT %s"
+    params.append(limit + 1)
+    if offset and not cursor:
+        sql += " OFFSET %s"
+        params.append(offset)
+    
+    return sql, tuple(params)
 
 @router.get("/", response_model=List[Patient])
 async def get_all_patients(
-    limit: int = Query(20, description="조회할 환자 수"),
-    offset: int = Query(0, description="시작 위치")
+    limit: int = Query(20, ge=1, le=500, description="조회할 환자 수"),
+    cursor: Optional[str] = Query(None, description="다음 페이지 커서 (X-Next-Cursor 응답 헤더 값)"),
+    offset: int = Query(0, ge=0, description="시작 위치 (cursor 사용 권장)", deprecated=True)
 ):
     """
-    전체 환자 목록 조회 (페이징)
-    """
-    sql = """
-        SELECT * FROM patients 
-        ORDER BY created_at DESC
-        LIMIT %s OFFSET %s
+    전체 환자 목록 조회 (최근 등록순, 커서 페이징)
+    - 다음 페이지가 있으면 X-Next-Cursor 헤더로 커서 반환
+    - idx_created_at 인덱스로 커서 위치부터 바로 읽으므로 뒤 페이지도 빠름
     """
+    try:
+        sql, params = _patients_list_query(limit, cursor, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    results = execute_query(sql, (limit, offset))
+    results = await execute_query_async(sql, params)
     
     if results is None:
         raise HTTPException(status_code=500, detail="데이터베이스 조회 중 오류가 발생했습니다")
     
-    return results
+    results, next_cursor = split_page(results, limit, "created_at", "patient_id")
+    return rows_response(results, Patient, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
 
 @router.get("/stats/today")
 async def get_today_stats():
     """
-    오늘의 통계 (대시보드용)
-    """
-    stats_sql = """
-        SELECT 
-            (SELECT COUNT(*) FROM visits WHERE DATE(visit_date) = CURDATE()) as today_visits,
-            (SELECT COUNT(*) FROM appointments WHERE DATE(appointment_date) = CURDATE() AND status = '예약') as today_appointments,
-            (SELECT COUNT(*) FROM patients) as total_patients,
-            (SELECT COUNT(*) FROM visits WHERE status = '대기') as waiting_patients
+    오늘의 통계 (대시보드용, 짧은 시간 캐시)
     """
-    
-    result = execute_single_query(stats_sql)
+    result = await today_stats.get()
     
     if result is None:
         raise HTTPException(status_code=500, detail="통계 조회 중 오류가 발생했습니다")
     
     return result
 
+def _insert_patient(cursor, patient_data):
+    """환자 중복 체크 후 추가 (트랜잭션 내부에서 실행)"""
+    # 중복 체크
+    check_query = "SELECT COUNT(*) FROM patients WHERE patient_no = %s"
+    cursor.execute(check_query, (patient_data['patient_no'],))
+    if cursor.fetchone()[0] > 0:
+        raise HTTPException(status_code=400, detail="이미 존재하는 환자번호입니다")
+    
+    # 환자 추가
+    insert_query = """
+        INSERT INTO patients (patient_no, name, birth_date, gender, phone)
+        VALUES (%s, %s, %s, %s, %s)
+    """
+    cursor.execute(insert_query, (
+        patient_data['patient_no'],
+        patient_data['name'],
+        patient_data['birth_date'],
+        patient_data['gender'],
+        patient_data['phone']
+    ))
+    return cursor.lastrowid
+
 @router.post("/")
 async def create_patient(patient_data: dict):
     """
     새 환자 등록
     """
-    connection = get_db_connection()
-    if connection is None:
+    try:
+        patient_id = await run_transaction_async(_insert_patient, patient_data)
+    except HTTPException:
+        raise
+    except DatabaseConnectionError:
         raise HTTPException(status_code=500, detail="데이터베이스 연결 실패")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"환자 등록 실패: {str(e)}")
+    
+    # 검색 색인, 통계에 바로 반영하고 대시보드에 실시간 전달
+    patient_index.add(patient_id, patient_data['name'])
+    await response_cache.bump("stats")
+    live_feed.publish("stats", {"delta": today_stats.record_patient_created()})
+    
+    # 생성된 환자 정보 반환
+    return {
+        "patient_id": patient_id,
+        "patient_no": patient_data['patient_no'],
+        "name": patient_data['name'],
+        "message": "환자 등록 성공"
+    }
+
+def _bulk_insert_patients(cursor, rows):
+    """
+    환자 일괄 등록 (트랜잭션 내부에서 실행)
+    - 검증 실패 행은 error, 이미 있는 환자번호는 exists 로 건너뛰고 나머지를 다중 행 INSERT
+    """
+    results = [None] * len(rows)
+    pending = {}  # patient_no_key(patient_no) -> (index, values)
+    
+    for index, row in enumerate(rows):
+        try:
+            values = patient_values(row)
+        except RowError as e:
+            results[index] = {"index": index, "status": "error", "error": str(e)}
+            continue
+        key = patient_no_key(values[0])
+        if key in pending:
+            results[index] = {"index": index, "status": "error", "error": "요청 내 중복된 환자번호입니다"}
+            continue
+        pending[key] = (index, values)
+    
+    # 이미 등록된 환자번호는 한 번에 조회 (DB 가 돌려준 값은 대소문자/공백이 요청과 다를 수 있어 같은 키로 비교)
+    if pending:
+        existing = select_in(
+            cursor, "SELECT patient_id, patient_no FROM patients WHERE patient_no IN ",
+            [values[0] for _, values in pending.values()]
+        )
+        for patient_id, patient_no in existing:
+            entry = pending.pop(patient_no_key(patient_no), None)
+            if entry is None:
+                continue
+            index, values = entry
+            results[index] = {"index": index, "status": "exists", "patient_id": patient_id, "patient_no": patient_no}
+    
+    created = []
+    if pending:
+        entries = list(pending.values())
+        ids = insert_rows(
+            cursor, "patients", "patient_id", ("patient_no", "name", "birth_date", "gender", "phone"),
+            [values for _, values in entries]
+        )
+        for (index, values), patient_id in zip(entries, ids):
+            results[index] = {"index": index, "status": "created", "patient_id": patient_id, "patient_no": values[0]}
+            created.append((patient_id, values[1]))
+    
+    return results, created
+
+@router.post("/bulk")
+async def create_patients_bulk(rows: List[dict]):
+    """
+    환자 일괄 등록 (최대 1000명, 한 트랜잭션)
+    - 행별 결과(created/exists/error)와 부여된 patient_id 반환
+    """
+    if len(rows) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=413, detail=f"한 번에 최대 {MAX_BULK_ROWS}건까지 등록할 수 있습니다")
     
     try:
-        cursor = connection.cursor()
-        
-        # 중복 체크
-        check_query = "SELECT COUNT(*) FROM patients WHERE patient_no = %s"
-        cursor.execute(check_query, (patient_data['patient_no'],))
-        if cursor.fetchone()[0] > 0:
-            raise HTTPException(status_code=400, detail="이미 존재하는 환자번호입니다")
-        
-        # 환자 추가
-        insert_query = """
-            INSERT INTO patients (patient_no, name, birth_date, gender, phone)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        cursor.execute(insert_query, (
-            patient_data['patient_no'],
-            patient_data['name'],
-            patient_data['birth_date'],
-            patient_data['gender'],
-            patient_data['phone']
-        ))
-        
-        connection.commit()
-        
-        # 생성된 환자 정보 반환
-        patient_id = cursor.lastrowid
-        return {
-            "patient_id": patient_id,
-            "patient_no": patient_data['patient_no'],
-            "name": patient_data['name'],
-            "message": "환자 등록 성공"
-        }
-        
+        results, created = await run_transaction_async(_bulk_insert_patients, rows)
+    except DatabaseConnectionError:
+        raise HTTPException(status_code=500, detail="데이터베이스 연결 실패")
     except Exception as e:
-        connection.rollback()
-        raise HTTPException(status_code=500, detail=f"환자 등록 실패: {str(e)}")
-    finally:
-        cursor.close()
-        connection.close()
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"환자 일괄 등록 실패: {str(e)}")
+    
+    # 검색 색인, 통계에 바로 반영하고 대시보드에 실시간 전달
+    for patient_id, name in created:
+        patient_index.add(patient_id, name)
+    if created:
+        await response_cache.bump("stats")
+        live_feed.publish("stats", {"delta": today_stats.record_patient_created(len(created))})
+    
+    return summarize(results)
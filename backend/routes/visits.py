@@ -1,141 +1,499 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
 from datetime import datetime, date
-from database import execute_query, get_db_connection
+from date_range import day_range, today_range, range_condition
+from pagination import NEXT_CURSOR_HEADER, decode_cursor, split_page, keyset_condition
+from database import execute_query_async, run_transaction_async, DatabaseConnectionError
 from schemas import Visit
+from patient_summary import record_visit, record_visits
+from stats_service import today_stats, sum_deltas
+from live_feed import live_feed
+from response_cache import response_cache
+from fast_json import rows_response, parse_fields
+from export_stream import export_response
+from departments import department_cache, ensure_departments_loaded, check_department, register_doctors
+from visit_queue import visit_queue, TRANSITIONS, IN_PROGRESS, StaleVisitError, previous_status
+from bulk_insert import (
+    MAX_BULK_ROWS, RowError, parse_datetime, optional_text,
+    insert_rows, lookup_patients, patient_for_row, summarize
+)
 
 router = APIRouter(prefix="/api/visits", tags=["visits"])
 
-@router.get("/", response_model=List[Visit])
-async def get_visits(
-    date_from: Optional[date] = Query(None, description="시작 날짜"),
-    date_to: Optional[date] = Query(None, description="종료 날짜"),
-    department: Optional[str] = Query(None, description="진료과"),
-    status: Optional[str] = Query(None, description="진료 상태"),
-    limit: int = Query(50, description="조회할 진료 수")
-):
+# 다음 환자 호출 시 다른 워커와 충돌하면 다시 시도하는 횟수
+QUEUE_NEXT_ATTEMPTS = 5
+
+def _visits_filter(date_from=None, date_to=None, department=None, status=None):
+    """목록/내보내기 공통 필터 조건 SQL 조각 목록과 파라미터"""
+    start, end = day_range(date_from, date_to)
+    conditions, params = range_condition("v.visit_date", start, end)
+    
+    if department:
+        conditions.append("v.department = %s")
+        params.append(department)
+    
+    if status:
+        conditions.append("v.status = %s")
+        params.append(status)
+    
+    return conditions, params
+
+def _visits_columns(fields=None):
+    """목록 조회 SELECT 열 (fields 미지정 시 전체 + 환자 정보)"""
+    if fields is None:
+        return "v.*, p.name as patient_name, p.patient_no"
+    names = dict.fromkeys(fields + ("visit_date", "visit_id"))
+    return ", ".join(f"v.{name}" for name in names)
+
+def _visits_list_query(date_from=None, date_to=None, department=None, status=None, limit=50, cursor=None,
+                       fields=None):
     """
-    진료 기록 조회 (필터링 가능)
+    진료 기록 목록 조회 SQL (최신순, limit + 1 건)
+    - 날짜 필터는 반열림 구간으로 비교해 idx_visit_date, idx_department_status_date 사용
+    - 잘못된 커서는 ValueError
+    - fields 를 지정하면 그 열과 커서용 정렬 열만 조회
     """
-    sql = """
-        SELECT v.*, p.name as patient_name, p.patient_no
+    sql = f"""
+        SELECT {_visits_columns(fields)}
         FROM visits v
         JOIN patients p ON v.patient_id = p.patient_id
         WHERE 1=1
     """
-    params = []
+    conditions, params = _visits_filter(date_from, date_to, department, status)
+    for condition in conditions:
+        sql += " AND " + condition
     
-    if date_from:
-        sql += " AND DATE(v.visit_date) >= %s"
-        params.append(date_from)
+    if cursor:
+        visit_date, visit_id = decode_cursor(cursor, datetime.fromisoformat, int)
+        condition, condition_params = keyset_condition("v.visit_date", "v.visit_id", visit_date, visit_id)
+        sql += " AND " + condition
+        params.extend(condition_params)
     
-    if date_to:
-        sql += " AND DATE(v.visit_date) <= %s"
-        params.append(date_to)
+    # 다음 페이지 존재 여부 확인을 위해 1건 더 조회
+    sql += " ORDER BY v.visit_date DESC, v.visit_id DESC LIMIT %s"
+    params.append(limit + 1)
     
-    if department:
-        sql += " AND v.department = %s"
-        params.append(department)
-    
-    if status:
-        sql += " AND v.status = %s"
-        params.append(status)
+    return sql, tuple(params)
+
+VISIT_EXPORT_COLUMNS = ("visit_id", "patient_id", "patient_no", "patient_name", "visit_date",
+                        "department", "doctor_name", "diagnosis", "status", "created_at")
+
+def _visits_export_query(date_from=None, date_to=None, department=None, status=None):
+    """진료 기록 내보내기 SQL (날짜순 전체, LIMIT 없음 - 서버 측 커서로 스트리밍)"""
+    sql = """
+        SELECT v.visit_id, v.patient_id, p.patient_no, p.name as patient_name, v.visit_date,
+               v.department, v.doctor_name, v.diagnosis, v.status, v.created_at
+        FROM visits v
+        JOIN patients p ON v.patient_id = p.patient_id
+        WHERE 1=1
+    """
+    conditions, params = _visits_filter(date_from, date_to, department, status)
+    for condition in conditions:
+        sql += " AND " + condition
+    sql += " ORDER BY v.visit_date ASC, v.visit_id ASC"
     
-    sql += " ORDER BY v.visit_date DESC LIMIT %s"
-    params.append(limit)
+    return sql, tuple(params)
+
+def _today_visits_query():
+    """오늘의 진료 목록 조회 SQL"""
+    start, end = today_range()
+    sql = """
+        SELECT v.*, p.name as patient_name, p.patient_no
+        FROM visits v
+        JOIN patients p ON v.patient_id = p.patient_id
+        WHERE v.visit_date >= %s AND v.visit_date < %s
+        ORDER BY v.visit_date ASC
+    """
+    return sql, (start, end)
+
+@router.get("/", response_model=List[Visit])
+async def get_visits(
+    date_from: Optional[date] = Query(None, description="시작 날짜"),
+    date_to: Optional[date] = Query(None, description="종료 날짜"),
+    department: Optional[str] = Query(None, description="진료과"),
+    status: Optional[str] = Query(None, description="진료 상태"),
+    limit: int = Query(50, ge=1, le=500, description="조회할 진료 수"),
+    cursor: Optional[str] = Query(None, description="다음 페이지 커서 (X-Next-Cursor 응답 헤더 값)"),
+    fields: Optional[str] = Query(None, description="응답에 포함할 필드 (쉼표 구분, 예: visit_id,visit_date,status)")
+):
+    """
+    진료 기록 조회 (필터링 가능, 최신순 커서 페이징)
+    - 다음 페이지가 있으면 X-Next-Cursor 헤더로 커서 반환 (같은 필터로 다시 요청)
+    - fields 로 필요한 필드만 조회/응답 (예: fields=visit_id,visit_date,status)
+    """
+    try:
+        selected = parse_fields(fields, Visit)
+        sql, params = _visits_list_query(date_from, date_to, department, status, limit, cursor, selected)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    results = execute_query(sql, tuple(params))
+    results = await execute_query_async(sql, params)
     
     if results is None:
         raise HTTPException(status_code=500, detail="진료 기록 조회 중 오류가 발생했습니다")
     
-    return results
+    results, next_cursor = split_page(results, limit, "visit_date", "visit_id")
+    return rows_response(results, Visit, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None, selected)
+
+@router.get("/export")
+async def export_visits(
+    date_from: Optional[date] = Query(None, description="시작 날짜"),
+    date_to: Optional[date] = Query(None, description="종료 날짜"),
+    department: Optional[str] = Query(None, description="진료과"),
+    status: Optional[str] = Query(None, description="진료 상태"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv 또는 ndjson")
+):
+    """
+    진료 기록 내보내기 (날짜순 전체, CSV/NDJSON 스트리밍)
+    - 건수 제한 없이 DB 에서 읽는 대로 전송하므로 한 달치도 메모리 사용량이 일정
+    - 정산/통계 배치용 (일별: date_from=date_to=해당 날짜, 월별: 1일 ~ 말일)
+    """
+    sql, params = _visits_export_query(date_from, date_to, department, status)
+    filename = "_".join(["visits", *[str(day) for day in (date_from, date_to) if day]])
+    return await export_response(sql, params, VISIT_EXPORT_COLUMNS, format, filename)
 
 @router.get("/today", response_model=List[Visit])
 async def get_today_visits():
     """
     오늘의 진료 목록
     """
-    sql = """
-        SELECT v.*, p.name as patient_name, p.patient_no
-        FROM visits v
-        JOIN patients p ON v.patient_id = p.patient_id
-        WHERE DATE(v.visit_date) = CURDATE()
-        ORDER BY v.visit_date ASC
-    """
+    sql, params = _today_visits_query()
     
-    results = execute_query(sql)
+    results = await execute_query_async(sql, params)
     
     if results is None:
         raise HTTPException(status_code=500, detail="오늘 진료 조회 중 오류가 발생했습니다")
     
-    return results
+    return rows_response(results, Visit)
 
 @router.get("/departments")
 async def get_departments():
     """
-    진료과 목록 조회
+    진료과 목록 조회 (진료과 기준 정보 캐시)
     """
-    sql = """
-        SELECT DISTINCT department 
-        FROM visits 
-        WHERE department IS NOT NULL
-        ORDER BY department
+    if not await ensure_departments_loaded():
+        raise HTTPException(status_code=500, detail="진료과 목록 조회 중 오류가 발생했습니다")
+    
+    return department_cache.names()
+
+@router.get("/queue")
+async def get_queue_counts():
     """
+    진료과별 대기/진료중 환자 수 (메모리 대기열, visits 테이블 조회 없음)
+    """
+    if not visit_queue.loaded:
+        raise HTTPException(status_code=503, detail="대기열을 준비 중입니다")
     
-    results = execute_query(sql)
+    counts = visit_queue.counts()
+    return {
+        "departments": counts,
+        "total_waiting": sum(count["waiting"] for count in counts.values()),
+        "total_in_progress": sum(count["in_progress"] for count in counts.values())
+    }
+
+@router.get("/queue/{department}")
+async def get_department_queue(department: str):
+    """
+    진료과 대기열 (접수 순서, 순번 포함) 과 진료중 목록
+    """
+    if not visit_queue.loaded:
+        raise HTTPException(status_code=503, detail="대기열을 준비 중입니다")
     
-    if results is None:
-        raise HTTPException(status_code=500, detail="진료과 목록 조회 중 오류가 발생했습니다")
+    return {"department": department, **visit_queue.department(department)}
+
+@router.post("/queue/{department}/next")
+async def call_next_patient(department: str):
+    """
+    다음 환자 호출 (대기열 맨 앞 진료를 '진료중' 으로 변경)
+    - 다른 워커가 먼저 호출한 진료는 대기열을 고치고 다음 환자로 다시 시도
+    """
+    if not visit_queue.loaded:
+        raise HTTPException(status_code=503, detail="대기열을 준비 중입니다")
+    
+    for _ in range(QUEUE_NEXT_ATTEMPTS):
+        candidate = visit_queue.next_waiting(department)
+        if candidate is None:
+            raise HTTPException(status_code=404, detail="대기 중인 환자가 없습니다")
+        try:
+            visit = await _change_status(candidate['visit_id'], IN_PROGRESS, candidate['version'] or 0)
+        except HTTPException as e:
+            if e.status_code not in (400, 404, 409):
+                raise
+            # 이미 대기 상태가 아닌 진료 (404/409 는 _change_status 에서 대기열 반영)
+            if e.status_code == 400:
+                visit_queue.remove(candidate['visit_id'])
+            continue
+        return {**visit, "message": "다음 환자 호출"}
+    
+    raise HTTPException(status_code=409, detail="다른 요청과 충돌했습니다. 다시 시도하세요")
+
+@router.get("/{visit_id}/queue")
+async def get_queue_position(visit_id: int):
+    """
+    진료의 대기 순번 (1 = 다음 차례, 진료중이면 0)
+    """
+    if not visit_queue.loaded:
+        raise HTTPException(status_code=503, detail="대기열을 준비 중입니다")
+    
+    result = visit_queue.position(visit_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="대기열에 없는 진료입니다")
+    
+    visit, position = result
+    return {**visit, "position": position}
+
+def _update_visit_status(cursor, visit_id, status, version):
+    """
+    진료 상태 변경 (트랜잭션 내부에서 실행, dictionary 커서)
+    - version 이 일치하고 허용된 이전 상태일 때만 변경 (UPDATE 한 번, 잠금 없이 조건부 변경)
+    - 변경하지 못하면 현재 상태를 다시 읽어 원인별로 404/409(StaleVisitError)/400
+    """
+    cursor.execute(
+        """
+        UPDATE visits SET status = %s, version = version + 1
+        WHERE visit_id = %s AND version = %s AND status = %s
+        """,
+        (status, visit_id, version, previous_status(status))
+    )
+    updated = cursor.rowcount == 1
+    
+    cursor.execute(
+        """
+        SELECT v.visit_id, v.patient_id, p.name as patient_name, p.patient_no, v.visit_date,
+               v.department, v.doctor_name, v.status, v.version
+        FROM visits v
+        JOIN patients p ON v.patient_id = p.patient_id
+        WHERE v.visit_id = %s
+        """,
+        (visit_id,)
+    )
+    visit = cursor.fetchone()
+    if visit is None:
+        raise HTTPException(status_code=404, detail="존재하지 않는 진료 기록입니다")
+    if not updated:
+        if visit['version'] != version:
+            raise StaleVisitError(visit)
+        raise HTTPException(status_code=400, detail=f"'{visit['status']}' 상태에서 '{status}'(으)로 변경할 수 없습니다")
+    
+    visit['previous_status'] = previous_status(status)
+    return visit
+
+async def _change_status(visit_id, status, version):
+    """상태 변경 후 대기열, 응답 캐시, 통계, 실시간 피드 반영"""
+    try:
+        visit = await run_transaction_async(_update_visit_status, visit_id, status, version, dictionary=True)
+    except HTTPException as e:
+        if e.status_code == 404:
+            visit_queue.remove(visit_id)
+        raise
+    except StaleVisitError as e:
+        visit_queue.apply(e.visit)
+        raise HTTPException(status_code=409, detail=str(e))
+    except DatabaseConnectionError:
+        raise HTTPException(status_code=500, detail="데이터베이스 연결 실패")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"진료 상태 변경 실패: {str(e)}")
+    
+    visit_queue.apply(visit)
+    await response_cache.bump(f"patient:{visit['patient_id']}", "visits", "stats")
+    
+    delta = today_stats.record_visit_status_changed(visit['previous_status'], visit['status'])
+    live_feed.publish("visit_status", visit)
+    if delta:
+        live_feed.publish("stats", {"delta": delta})
+    return visit
+
+@router.patch("/{visit_id}/status")
+async def update_visit_status(visit_id: int, status_data: dict):
+    """
+    진료 상태 변경 ({"status": "진료중", "version": 0})
+    - 대기 -> 진료중/취소, 진료중 -> 완료/대기 만 허용 (400)
+    - version 은 조회한 진료의 version, 그 사이 다른 요청이 변경했으면 409 (다시 조회 후 재시도)
+    """
+    status = status_data.get('status')
+    version = status_data.get('version')
+    if status not in {target for targets in TRANSITIONS.values() for target in targets}:
+        raise HTTPException(status_code=400, detail=f"변경할 수 없는 상태입니다: {status}")
+    if not isinstance(version, int) or isinstance(version, bool):
+        raise HTTPException(status_code=400, detail="version 값이 필요합니다")
+    
+    visit = await _change_status(visit_id, status, version)
+    return {**visit, "message": "진료 상태 변경 성공"}
+
+def _insert_visit(cursor, visit_data, new_doctor=None):
+    """
+    환자 존재 확인 후 진료 기록 추가 (트랜잭션 내부에서 실행)
+    - 실시간 피드로 보낼 진료 정보(환자명 포함) 반환
+    - new_doctor: 처음 보는 담당의 (dept_id, 이름), 같은 트랜잭션에서 doctors 에 추가
+    """
+    # 환자 존재 확인 (피드 표시용 환자명도 함께 조회)
+    check_query = "SELECT name, patient_no FROM patients WHERE patient_id = %s"
+    cursor.execute(check_query, (visit_data['patient_id'],))
+    patient = cursor.fetchone()
+    if patient is None:
+        raise HTTPException(status_code=400, detail="존재하지 않는 환자입니다")
+    
+    # 진료 기록 추가
+    insert_query = """
+        INSERT INTO visits 
+        (patient_id, visit_date, department, doctor_name, diagnosis, status)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """
+    visit = {
+        "patient_id": visit_data['patient_id'],
+        "visit_date": visit_data['visit_date'],
+        "department": visit_data['department'],
+        "doctor_name": visit_data['doctor_name'],
+        "diagnosis": visit_data['diagnosis'],
+        "status": visit_data.get('status', '완료')
+    }
+    cursor.execute(insert_query, (
+        visit['patient_id'],
+        visit['visit_date'],
+        visit['department'],
+        visit['doctor_name'],
+        visit['diagnosis'],
+        visit['status']
+    ))
+    visit['visit_id'] = cursor.lastrowid
+    visit['patient_name'], visit['patient_no'] = patient
     
-    return [row['department'] for row in results]
+    # 환자별 진료 요약 갱신 (같은 트랜잭션)
+    record_visit(cursor, visit['patient_id'], visit['visit_date'])
+    if new_doctor:
+        register_doctors(cursor, [new_doctor])
+    return visit
 
 @router.post("/")
 async def create_visit(visit_data: dict):
     """
-    새 진료 기록 추가
+    새 진료 기록 추가 (진료과는 기준 정보 캐시로 검증)
     """
-    connection = get_db_connection()
-    if connection is None:
-        raise HTTPException(status_code=500, detail="데이터베이스 연결 실패")
+    if not await ensure_departments_loaded():
+        raise HTTPException(status_code=500, detail="진료과 목록 조회 중 오류가 발생했습니다")
+    try:
+        new_doctor = check_department(visit_data.get('department'), visit_data.get('doctor_name'))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
-        cursor = connection.cursor()
-        
-        # 환자 존재 확인
-        check_query = "SELECT COUNT(*) FROM patients WHERE patient_id = %s"
-        cursor.execute(check_query, (visit_data['patient_id'],))
-        if cursor.fetchone()[0] == 0:
-            raise HTTPException(status_code=400, detail="존재하지 않는 환자입니다")
-        
-        # 진료 기록 추가
-        insert_query = """
-            INSERT INTO visits 
-            (patient_id, visit_date, department, doctor_name, diagnosis, status)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        cursor.execute(insert_query, (
-            visit_data['patient_id'],
-            visit_data['visit_date'],
-            visit_data['department'],
-            visit_data['doctor_name'],
-            visit_data['diagnosis'],
-            visit_data.get('status', '완료')
-        ))
-        
-        connection.commit()
-        
-        # 생성된 진료 ID 반환
-        visit_id = cursor.lastrowid
-        return {
-            "visit_id": visit_id,
-            "patient_id": visit_data['patient_id'],
-            "message": "진료 기록 추가 성공"
-        }
-        
+        visit = await run_transaction_async(_insert_visit, visit_data, new_doctor)
+    except HTTPException:
+        raise
+    except DatabaseConnectionError:
+        raise HTTPException(status_code=500, detail="데이터베이스 연결 실패")
     except Exception as e:
-        connection.rollback()
         raise HTTPException(status_code=500, detail=f"진료 기록 추가 실패: {str(e)}")
-    finally:
-        cursor.close()
-        connection.close()
\ No newline at end of file
+    
+    if new_doctor:
+        department_cache.add_doctor(visit['department'], visit['doctor_name'])
+    visit_queue.apply(visit)
+    
+    # 저장된 조회 응답 (환자 상세, 오늘 목록, 통계, 진료과) 무효화
+    await response_cache.bump(f"patient:{visit['patient_id']}", "visits", "stats", *(["departments"] if new_doctor else []))
+    
+    # 통계 갱신 및 대시보드에 실시간 전달
+    delta = today_stats.record_visit_created(visit['visit_date'], visit['status'])
+    live_feed.publish("visit", visit)
+    if delta:
+        live_feed.publish("stats", {"delta": delta})
+    
+    # 생성된 진료 ID 반환
+    return {
+        "visit_id": visit['visit_id'],
+        "patient_id": visit['patient_id'],
+        "message": "진료 기록 추가 성공"
+    }
+
+VISIT_COLUMNS = ("patient_id", "visit_date", "department", "doctor_name", "diagnosis", "status")
+
+def _bulk_insert_visits(cursor, rows):
+    """
+    진료 기록 일괄 추가 (트랜잭션 내부에서 실행)
+    - 환자는 patient_id 또는 patient_no 로 지정, 한 번의 조회로 확인
+    - 검증 실패 행은 error 로 건너뛰고 나머지를 다중 행 INSERT
+    """
+    results = [None] * len(rows)
+    patients = lookup_patients(cursor, rows)
+    pending = []  # (index, visit)
+    new_doctors = []  # 처음 보는 담당의 (dept_id, 이름)
+    
+    for index, row in enumerate(rows):
+        try:
+            patient_id, patient_name, patient_no = patient_for_row(row, patients)
+            visit = {
+                "patient_id": patient_id,
+                "visit_date": parse_datetime(row.get('visit_date'), 'visit_date'),
+                "department": optional_text(row, 'department', 30),
+                "doctor_name": optional_text(row, 'doctor_name', 30),
+                "diagnosis": optional_text(row, 'diagnosis'),
+                "status": optional_text(row, 'status', 10) or '완료',
+                "patient_name": patient_name,
+                "patient_no": patient_no
+            }
+            new_doctor = check_department(visit['department'], visit['doctor_name'])
+        except (RowError, ValueError) as e:
+            results[index] = {"index": index, "status": "error", "error": str(e)}
+            continue
+        pending.append((index, visit))
+        if new_doctor:
+            new_doctors.append(new_doctor)
+    
+    created = []
+    if pending:
+        ids = insert_rows(
+            cursor, "visits", "visit_id", VISIT_COLUMNS,
+            [tuple(visit[column] for column in VISIT_COLUMNS) for _, visit in pending]
+        )
+        for (index, visit), visit_id in zip(pending, ids):
+            visit['visit_id'] = visit_id
+            results[index] = {"index": index, "status": "created", "visit_id": visit_id, "patient_id": visit['patient_id']}
+            created.append(visit)
+        
+        # 환자별 진료 요약 갱신 (같은 트랜잭션)
+        record_visits(cursor, [(visit['patient_id'], visit['visit_date']) for visit in created])
+        register_doctors(cursor, new_doctors)
+    
+    return results, created
+
+@router.post("/bulk")
+async def create_visits_bulk(rows: List[dict]):
+    """
+    진료 기록 일괄 추가 (최대 1000건, 한 트랜잭션)
+    - 행별 결과(created/error)와 부여된 visit_id 반환
+    """
+    if len(rows) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=413, detail=f"한 번에 최대 {MAX_BULK_ROWS}건까지 추가할 수 있습니다")
+    
+    if not await ensure_departments_loaded():
+        raise HTTPException(status_code=500, detail="진료과 목록 조회 중 오류가 발생했습니다")
+    
+    try:
+        results, created = await run_transaction_async(_bulk_insert_visits, rows)
+    except DatabaseConnectionError:
+        raise HTTPException(status_code=500, detail="데이터베이스 연결 실패")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"진료 기록 일괄 추가 실패: {str(e)}")
+    
+    for visit in created:
+        if visit['department'] and visit['doctor_name']:
+            department_cache.add_doctor(visit['department'], visit['doctor_name'])
+        visit_queue.apply(visit)
+    if created:
+        await response_cache.bump(
+            "visits", "stats", "departments",
+            *{f"patient:{visit['patient_id']}" for visit in created}
+        )
+    
+    # 통계 갱신 및 대시보드에 실시간 전달 (대시보드는 오늘 진료만 표시)
+    today = date.today()
+    delta = sum_deltas(
+        today_stats.record_visit_created(visit['visit_date'], visit['status']) for visit in created
+    )
+    for visit in created:
+        if visit['visit_date'].date() == today:
+            live_feed.publish("visit", visit)
+    if delta:
+        live_feed.publish("stats", {"delta": delta})
+    
+    return summarize(results)
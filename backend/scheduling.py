@@ -0,0 +1,362 @@
+"""
+담당의 진료 시간표 (work_hours 테이블) 와 예약 가능 시간 계산
+
+- 진료 시간은 진료과 기본값 (doctor_name = '') 과 담당의별 값으로 관리
+  (담당의별 시간이 하나라도 있으면 그 담당의는 진료과 기본값 대신 자신의 시간표만 사용)
+- 예약된 시간은 (진료과, 담당의, 날짜) 별로 정렬된 목록으로 메모리에 유지해
+  빈 시간 조회 시 슬롯마다 DB 를 조회하지 않음
+- 예약 등록 시 중복 확인은 DB 에서 담당의 행 잠금 후 처리 (lock_doctor, find_conflict)
+
+사용법:
+    python scheduling.py load                   # data/work_hours.csv 를 work_hours 테이블에 반영
+    python scheduling.py load path/to.csv
+"""
+import argparse
+import bisect
+import csv
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import execute_query, run_transaction, run_in_db_thread
+
+# 진료 시간표 캐시 유지 시간 (초)
+SCHEDULE_CACHE_TTL = float(os.getenv('SCHEDULE_CACHE_TTL', 300))
+# 예약 현황 캐시 유지 시간 (초) - 다른 워커에서 등록된 예약은 이 시간 안에 빈 시간 조회에 반영
+BOOKED_CACHE_TTL = float(os.getenv('BOOKED_CACHE_TTL', 30))
+# 빈 시간 조회 최대 기간 (일)
+MAX_SLOT_DAYS = int(os.getenv('SCHEDULE_MAX_SLOT_DAYS', 31))
+
+WORK_HOURS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "work_hours.csv")
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# 예약 중복 확인에서 제외하는 상태
+CANCELLED_STATUS = '취소'
+
+
+class SlotConflictError(Exception):
+    """같은 담당의의 같은 시간대에 이미 예약이 있음"""
+    pass
+
+
+def _parse_weekdays(value):
+    """'mon', 'mon-fri', 'mon,wed,fri' -> 요일 번호 목록 (0=월 ... 6=일)"""
+    days = []
+    for part in value.lower().replace(" ", "").split(","):
+        first, _, last = part.partition("-")
+        if first not in WEEKDAYS or (last and last not in WEEKDAYS):
+            raise ValueError(f"알 수 없는 요일입니다: {part}")
+        start = WEEKDAYS.index(first)
+        end = WEEKDAYS.index(last) if last else start
+        days.extend(range(start, end + 1))
+    return days
+
+
+def _parse_time(value):
+    return datetime.strptime(value.strip(), "%H:%M").time()
+
+
+def _minutes(value):
+    """TIME 컬럼 값 (mysql-connector 는 timedelta 로 반환) -> 자정 이후 분"""
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) // 60
+    return value.hour * 60 + value.minute
+
+
+def load_csv(cursor, path=WORK_HOURS_CSV):
+    """
+    진료 시간 CSV 를 work_hours 테이블에 반영 (전체 교체), 반영한 행 수 반환
+    - 컬럼: dept_code, doctor_name(비우면 진료과 기본값), weekday, start_time, end_time, slot_minutes
+    """
+    cursor.execute("SELECT dept_code, dept_id FROM departments")
+    dept_ids = dict(cursor.fetchall())
+
+    rows = []
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        for line, row in enumerate(csv.DictReader(file), start=2):
+            dept_code = row['dept_code'].strip()
+            if dept_code not in dept_ids:
+                raise ValueError(f"{path}:{line} 존재하지 않는 진료과 코드입니다: {dept_code}")
+            start_time, end_time = _parse_time(row['start_time']), _parse_time(row['end_time'])
+            slot_minutes = int((row.get('slot_minutes') or "30").strip())
+            if start_time >= end_time or slot_minutes <= 0:
+                raise ValueError(f"{path}:{line} 진료 시간이 올바르지 않습니다")
+            for weekday in _parse_weekdays(row['weekday']):
+                rows.append((
+                    dept_ids[dept_code], (row.get('doctor_name') or "").strip(),
+                    weekday, start_time, end_time, slot_minutes
+                ))
+
+    cursor.execute("DELETE FROM work_hours")
+    if rows:
+        cursor.executemany(
+            """
+            INSERT INTO work_hours (dept_id, doctor_name, weekday, start_time, end_time, slot_minutes)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            """,
+            rows
+        )
+    return len(rows)
+
+
+class WorkHours:
+    """
+    진료 시간표 메모리 캐시
+    - (진료과, 담당의) -> 요일 -> [(시작 분, 종료 분, 슬롯 길이 분)], 담당의 '' 는 진료과 기본값
+    - 시간표를 바꾼 뒤에는 invalidate() (POST /api/departments/reload)
+    """
+
+    def __init__(self):
+        self._hours = None
+        self._loaded_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._hours is not None
+
+    def is_stale(self):
+        return self._hours is None or time.monotonic() - self._loaded_at > SCHEDULE_CACHE_TTL
+
+    def refresh(self):
+        """DB 에서 전체 다시 적재 (다른 스레드가 적재 중이면 건너뜀), 실패 시 기존 캐시 유지"""
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            rows = execute_query(
+                """
+                SELECT d.dept_name, w.doctor_name, w.weekday, w.start_time, w.end_time, w.slot_minutes
+                FROM work_hours w
+                JOIN departments d ON d.dept_id = w.dept_id
+                ORDER BY w.start_time
+                """
+            )
+            if rows is None:
+                return
+
+            hours = {}
+            for row in rows:
+                periods = hours.setdefault((row['dept_name'], row['doctor_name']), {}).setdefault(row['weekday'], [])
+                periods.append((_minutes(row['start_time']), _minutes(row['end_time']), row['slot_minutes']))
+
+            self._hours = hours
+            self._loaded_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def invalidate(self):
+        self._loaded_at = 0.0
+
+    def periods(self, dept_name, doctor_name, day):
+        """해당 날짜의 진료 시간 목록 (담당의별 시간표가 없으면 진료과 기본값)"""
+        hours = self._hours or {}
+        schedule = hours.get((dept_name, doctor_name or ""))
+        if schedule is None:
+            schedule = hours.get((dept_name, ""), {})
+        return schedule.get(day.weekday(), [])
+
+    def slots(self, dept_name, doctor_name, day):
+        """해당 날짜의 예약 슬롯 [(시작 시각, 슬롯 길이 분)]"""
+        midnight = datetime.combine(day, datetime.min.time())
+        return [
+            (midnight + timedelta(minutes=minute), slot_minutes)
+            for start, end, slot_minutes in self.periods(dept_name, doctor_name, day)
+            for minute in range(start, end - slot_minutes + 1, slot_minutes)
+        ]
+
+    def slot_minutes(self, dept_name, doctor_name, when):
+        """
+        예약 시각이 속한 슬롯 길이 (분)
+        - 진료과에 시간표가 없으면 None (시간 제한 없음)
+        - 진료 시간 밖이거나 슬롯 시작 시각이 아니면 ValueError
+        """
+        hours = self._hours or {}
+        if (dept_name, doctor_name or "") not in hours and (dept_name, "") not in hours:
+            return None
+        if when.second or when.microsecond:
+            raise ValueError("예약 시각은 분 단위로 지정해야 합니다")
+        for start, slot_minutes in self.slots(dept_name, doctor_name, when.date()):
+            if start == when:
+                return slot_minutes
+        raise ValueError(f"진료 시간이 아니거나 예약 단위({self._slot_hint(dept_name, doctor_name, when.date())})에 맞지 않는 시각입니다")
+
+    def _slot_hint(self, dept_name, doctor_name, day):
+        periods = self.periods(dept_name, doctor_name, day)
+        if not periods:
+            return "휴진일"
+        return ", ".join(
+            f"{start // 60:02d}:{start % 60:02d}~{end // 60:02d}:{end % 60:02d} {slot_minutes}분"
+            for start, end, slot_minutes in periods
+        )
+
+
+class BookedIndex:
+    """
+    예약된 시각 메모리 인덱스
+    - (진료과, 담당의, 날짜) -> 정렬된 예약 시작 시각 목록 (bisect 로 겹침 확인)
+    - (진료과, 날짜) 단위로 한 번에 적재하고 BOOKED_CACHE_TTL 이 지나면 다시 적재
+    - 이 워커에서 등록한 예약은 add() 로 바로 반영
+    """
+
+    def __init__(self):
+        self._booked = {}
+        self._loaded_at = {}   # (진료과, 날짜) -> 적재 시각
+        self._lock = threading.Lock()
+
+    def _stale_days(self, dept_name, days):
+        now = time.monotonic()
+        with self._lock:
+            return [
+                day for day in days
+                if now - self._loaded_at.get((dept_name, day), float("-inf")) > BOOKED_CACHE_TTL
+            ]
+
+    def load(self, dept_name, days):
+        """오래된 날짜의 예약을 DB 에서 다시 적재 (한 번의 범위 조회), 실패하면 False"""
+        stale = self._stale_days(dept_name, days)
+        if not stale:
+            return True
+        start = datetime.combine(min(stale), datetime.min.time())
+        end = datetime.combine(max(stale) + timedelta(days=1), datetime.min.time())
+        started = time.monotonic()
+        rows = execute_query(
+            """
+            SELECT doctor_name, appointment_date
+            FROM appointments
+            WHERE department = %s AND appointment_date >= %s AND appointment_date < %s AND status != %s
+            """,
+            (dept_name, start, end, CANCELLED_STATUS)
+        )
+        if rows is None:
+            return False
+
+        booked = {}
+        for row in rows:
+            key = (dept_name, row['doctor_name'] or "", row['appointment_date'].date())
+            booked.setdefault(key, []).append(row['appointment_date'])
+        stale = set(stale)
+        with self._lock:
+            for key in [key for key in self._booked if key[0] == dept_name and key[2] in stale]:
+                del self._booked[key]
+            for key, times in booked.items():
+                if key[2] in stale:
+                    self._booked[key] = sorted(times)
+            for day in stale:
+                self._loaded_at[(dept_name, day)] = started
+        return True
+
+    def add(self, dept_name, doctor_name, when):
+        with self._lock:
+            bisect.insort(self._booked.setdefault((dept_name, doctor_name or "", when.date()), []), when)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at.clear()
+
+    def is_free(self, dept_name, doctor_name, when, slot_minutes):
+        """when 부터 slot_minutes 동안 겹치는 예약이 없는지 (예약도 같은 길이라고 가정)"""
+        window = timedelta(minutes=slot_minutes)
+        with self._lock:
+            times = self._booked.get((dept_name, doctor_name or "", when.date()), [])
+            index = bisect.bisect_right(times, when - window)
+            return index >= len(times) or times[index] >= when + window
+
+
+# 모든 요청이 공유하는 시간표/예약 현황 캐시
+work_hours = WorkHours()
+booked_index = BookedIndex()
+
+
+async def ensure_schedules_loaded():
+    """시간표 캐시가 오래됐으면 DB 스레드에서 다시 적재, 사용할 수 있는 캐시가 있으면 True"""
+    if work_hours.is_stale():
+        await run_in_db_thread(work_hours.refresh)
+    return work_hours.loaded
+
+
+def free_slots(dept_name, doctors, date_from, date_to, now=None):
+    """
+    기간 내 담당의별 빈 예약 시간 (예약 현황은 load_booked 로 먼저 적재)
+    - [{doctor_name, date, slot_minutes, slots: [시작 시각, ...]}], 지난 시각은 제외
+    """
+    now = now or datetime.now()
+    result = []
+    day = date_from
+    while day <= date_to:
+        for doctor_name in doctors:
+            slots = [
+                (start, slot_minutes) for start, slot_minutes in work_hours.slots(dept_name, doctor_name, day)
+                if start > now and booked_index.is_free(dept_name, doctor_name, start, slot_minutes)
+            ]
+            if slots:
+                result.append({
+                    "doctor_name": doctor_name,
+                    "date": day,
+                    "slot_minutes": slots[0][1],
+                    "slots": [start for start, _ in slots],
+                })
+        day += timedelta(days=1)
+    return result
+
+
+def load_booked(dept_name, date_from, date_to):
+    """기간 내 진료과 예약 현황 적재 (DB 스레드에서 실행)"""
+    days = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+    return booked_index.load(dept_name, days)
+
+
+def lock_doctor(cursor, dept_id, doctor_name):
+    """
+    담당의 행 잠금 (SELECT ... FOR UPDATE, 트랜잭션 종료 시 해제)
+    - 같은 담당의 예약 등록을 한 번에 하나씩 처리해 동시 요청의 이중 예약 방지
+    """
+    cursor.execute(
+        "SELECT doctor_id FROM doctors WHERE dept_id = %s AND name = %s FOR UPDATE",
+        (dept_id, doctor_name)
+    )
+    cursor.fetchall()
+
+
+def find_conflict(cursor, dept_name, doctor_name, when, slot_minutes=None):
+    """
+    잠금 후 같은 담당의의 겹치는 예약 확인, 있으면 SlotConflictError
+    - slot_minutes 가 없으면(시간표 없는 진료과) 같은 시각만 중복으로 판단
+    - 잠금 읽기(FOR UPDATE)로 다른 트랜잭션이 커밋한 최신 예약까지 확인
+    """
+    if slot_minutes:
+        window = timedelta(minutes=slot_minutes)
+        condition, params = "appointment_date > %s AND appointment_date < %s", [when - window, when + window]
+    else:
+        condition, params = "appointment_date = %s", [when]
+    cursor.execute(
+        f"""
+        SELECT appointment_id FROM appointments
+        WHERE department = %s AND doctor_name = %s AND {condition} AND status != %s
+        LIMIT 1
+        FOR UPDATE
+        """,
+        (dept_name, doctor_name, *params, CANCELLED_STATUS)
+    )
+    if cursor.fetchall():
+        raise SlotConflictError("이미 예약된 시간입니다")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="진료 시간표 관리")
+    parser.add_argument("command", choices=("load",))
+    parser.add_argument("path", nargs="?", default=WORK_HOURS_CSV, help="진료 시간 CSV 파일")
+    args = parser.parse_args()
+
+    from migrations import migrate
+    migrate()
+    count = run_transaction(load_csv, args.path)
+    print(f"✓ 진료 시간 {count}건 반영 ({args.path})")
+    print("실행 중인 서버는 POST /api/departments/reload 로 캐시를 갱신하세요")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -33,6 +33,7 @@ class Visit(BaseModel):
     diagnosis: Optional[str]
     status: Optional[str]
     created_at: Optional[datetime]
+    version: Optional[int] = 0  # 상태 변경 시 증가 (PATCH /api/visits/{visit_id}/status)
 
 # 예약 스키마
 class Appointment(BaseModel):
@@ -49,6 +50,8 @@ class PatientDetail(BaseModel):
     patient: Patient
     visits: List[Visit]
     appointments: List[Appointment]
+    visits_next_cursor: Optional[str] = None        # 다음 진료 기록 페이지 커서
+    appointments_next_cursor: Optional[str] = None  # 다음 예약 페이지 커서
     
 # 검색 요청
 class SearchRequest(BaseModel):
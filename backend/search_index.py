@@ -0,0 +1,271 @@
+import bisect
+import os
+import threading
+import time
+from collections import defaultdict
+
+from database import execute_query
+
+# 색인 갱신 주기 (초) - 다른 워커에서 등록된 환자를 반영하기 위한 증분 갱신 간격
+INDEX_REFRESH_INTERVAL = float(os.getenv('SEARCH_INDEX_REFRESH_INTERVAL', 5))
+# 초기 적재/증분 갱신 시 한 번에 읽을 환자 수
+INDEX_LOAD_BATCH = int(os.getenv('SEARCH_INDEX_LOAD_BATCH', 50000))
+
+# 이름순 목록에 바로 합치지 않고 모아 둘 최근 추가 환자 수 (넘으면 합침)
+INDEX_MERGE_THRESHOLD = 1024
+# 중간 일치 검색에서 후보가 이보다 적으면 후보만 이름순으로 정렬해 비교,
+# 많으면 이름순 목록을 앞에서부터 비교하다 필요한 만큼 찾으면 중단
+INDEX_SORT_CANDIDATES = 5000
+
+# 한글 초성 (유니코드 음절 순서)
+CHOSUNG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_CHOSUNG_SET = frozenset(CHOSUNG)
+_HANGUL_START = 0xAC00
+_HANGUL_END = 0xD7A3
+
+
+def to_chosung(text):
+    """한글 음절을 초성으로 변환 (예: 김민준 -> ㄱㅁㅈ), 나머지 문자는 그대로"""
+    result = []
+    for ch in text:
+        code = ord(ch)
+        if _HANGUL_START <= code <= _HANGUL_END:
+            result.append(CHOSUNG[(code - _HANGUL_START) // 588])
+        else:
+            result.append(ch)
+    return "".join(result)
+
+
+def is_chosung_query(text):
+    """초성으로만 이루어진 검색어인지 확인 (예: ㄱㅁㅈ)"""
+    return bool(text) and all(ch in _CHOSUNG_SET for ch in text)
+
+
+def _chosung_ranges(ch):
+    """첫 글자의 초성이 ch 인 이름의 범위 (이름순, 초성 문자 자체로 시작하는 이름 먼저)"""
+    start = _HANGUL_START + CHOSUNG.index(ch) * 588
+    return [(ch, chr(ord(ch) + 1)), (chr(start), chr(start + 588))]
+
+
+def _grams(text):
+    """색인용 1-gram, 2-gram 집합"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def _query_grams(text):
+    """검색어의 후보 조회용 gram (1글자면 1-gram, 그 이상이면 2-gram)"""
+    if len(text) == 1:
+        return {text}
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class PatientNameIndex:
+    """
+    환자명 메모리 색인
+    - 이름과 초성의 1/2-gram 역색인으로 부분 일치 검색 (예: '민준', 'ㄱㅁㅈ')
+    - 이름순 목록으로 앞부분 일치를 필요한 만큼만 찾음 (목록은 통째로 교체하므로 잠금 없이 읽음)
+    - patient_id 증가 순으로 DB 에서 증분 적재
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._names = {}                     # patient_id -> (이름, 초성)
+        self._postings = defaultdict(set)    # gram -> patient_id 집합
+        self._by_name = []                   # (이름, patient_id, 초성) 이름순
+        self._recent = []                    # 이름순 목록에 아직 합치지 않은 항목
+        self._max_patient_id = 0
+        self._loaded = False
+        self._refreshed_at = 0.0
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def __len__(self):
+        return len(self._names)
+
+    def _add(self, patient_id, name, added):
+        """환자 1명 색인 추가, 이름순 목록 항목은 added 에 모음 (self._lock 안에서 호출)"""
+        if not name:
+            return
+        name = name.strip().lower()
+        if patient_id in self._names:
+            return
+        chosung = to_chosung(name)
+        self._names[patient_id] = (name, chosung)
+        for gram in _grams(name) | _grams(chosung):
+            self._postings[gram].add(patient_id)
+        added.append((name, patient_id, chosung))
+
+    def add(self, patient_id, name):
+        """환자 1명 색인 추가"""
+        self.add_many([(patient_id, name)])
+
+    def add_many(self, rows):
+        """
+        여러 환자 색인 추가 (patient_id, name 목록)
+        - 최근 추가 항목이 INDEX_MERGE_THRESHOLD 개를 넘으면 이름순 목록에 합침 (새 목록으로 교체)
+        """
+        added = []
+        with self._lock:
+            for patient_id, name in rows:
+                self._add(patient_id, name, added)
+            if not added:
+                return
+            recent = self._recent + added
+            if len(recent) >= INDEX_MERGE_THRESHOLD:
+                self._by_name = sorted(self._by_name + recent)
+                recent = []
+            self._recent = recent
+
+    def is_stale(self):
+        return time.monotonic() - self._refreshed_at > INDEX_REFRESH_INTERVAL
+
+    def refresh(self):
+        """
+        마지막으로 읽은 patient_id 이후의 환자를 DB 에서 읽어 색인에 추가
+        - 첫 호출은 전체 적재
+        - 다른 스레드가 갱신 중이면 기다리지 않고 건너뜀
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            while True:
+                rows = execute_query(
+                    """
+                    SELECT patient_id, name FROM patients
+                    WHERE patient_id > %s
+                    ORDER BY patient_id
+                    LIMIT %s
+                    """,
+                    (self._max_patient_id, INDEX_LOAD_BATCH)
+                )
+                if rows is None:
+                    return
+                self.add_many((row['patient_id'], row['name']) for row in rows)
+                if rows:
+                    self._max_patient_id = max(self._max_patient_id, rows[-1]['patient_id'])
+                if len(rows) < INDEX_LOAD_BATCH:
+                    break
+            self._loaded = True
+            self._refreshed_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def _prefix_matches(self, by_name, term, count):
+        """앞부분이 일치하는 (이름, patient_id) 를 이름순으로 최대 count 개 (bisect 로 시작 위치를 찾음)"""
+        matches = []
+        for i in range(bisect.bisect_left(by_name, (term,)), len(by_name)):
+            name, patient_id, _ = by_name[i]
+            if not name.startswith(term) or len(matches) >= count:
+                break
+            matches.append((name, patient_id))
+        return matches
+
+    def _chosung_prefix_matches(self, by_name, term, count):
+        """
+        초성 앞부분이 일치하는 (이름, patient_id) 를 이름순으로 최대 count 개
+        - 맞지 않는 이름을 만나면 같은 앞부분을 가진 이름 묶음을 bisect 로 건너뜀
+          (예: 'ㄱㅁ' 검색 중 '가나' 다음은 '가마', '가ㅁ' 으로 바로 이동)
+        """
+        ranges = [_chosung_ranges(ch) for ch in term]
+        matches = []
+        i = bisect.bisect_left(by_name, (term[0],))
+        while i < len(by_name) and len(matches) < count:
+            name, patient_id, chosung = by_name[i]
+            # 초성이 처음으로 다른 위치
+            j = 0
+            while j < len(term) and j < len(chosung) and chosung[j] == term[j]:
+                j += 1
+            if j == len(term):
+                matches.append((name, patient_id))
+                i += 1
+                continue
+            # name[:j] 뒤에 올 수 있는 가장 작은 글자로 이동, 없으면 name[:j] 로 시작하는 이름을 모두 건너뜀
+            ch = name[j] if j < len(name) else ""
+            start = next((start for start, _ in ranges[j] if start > ch), None)
+            if start is not None:
+                target = name[:j] + start
+            elif j == 0:
+                break
+            else:
+                target = name[:j - 1] + chr(ord(name[j - 1]) + 1)
+            i = bisect.bisect_left(by_name, (target,), i + 1)
+        return matches
+
+    def _contains_matches(self, by_name, term, chosung_mode, count, skip):
+        """
+        중간(두 번째 글자 이후)이 일치하는 (이름, patient_id) 를 이름순으로 최대 count 개
+        - 역색인 후보가 적으면 후보만 정렬해 비교, 많으면 이름순 목록을 앞에서부터 비교
+        - 어느 쪽이든 count 개를 찾으면 중단
+        - skip: 이름순 목록에 아직 없어 따로 비교한 patient_id (후보에서 제외)
+        """
+        with self._lock:
+            postings = [self._postings.get(gram) for gram in _query_grams(term)]
+            if not postings or any(p is None for p in postings):
+                return []
+            postings.sort(key=len)
+            candidates = None
+            if len(postings[0]) <= INDEX_SORT_CANDIDATES:
+                candidates = postings[0].intersection(*postings[1:])
+
+        names = self._names
+        if candidates is not None:
+            entries = sorted((names[patient_id][0], patient_id) for patient_id in candidates - skip)
+            entries = ((name, patient_id, names[patient_id][1]) for name, patient_id in entries)
+        else:
+            entries = by_name
+
+        matches = []
+        for name, patient_id, chosung in entries:
+            if (chosung if chosung_mode else name).find(term) > 0:
+                matches.append((name, patient_id))
+                if len(matches) >= count:
+                    break
+        return matches
+
+    def search(self, term, limit, offset=0):
+        """
+        이름(또는 초성) 부분 일치 검색
+        - 앞부분 일치를 먼저, 그 다음 이름순으로 정렬한 patient_id 목록 반환
+        - 앞부분 일치, 중간 일치 모두 offset + limit 개를 찾으면 더 보지 않음
+        - 잠금은 목록/후보 집합을 가져오는 동안만 잡고 비교는 잠금 밖에서 실행
+        """
+        term = term.strip().lower()
+        if not term:
+            return []
+        chosung_mode = is_chosung_query(term)
+        count = offset + limit
+
+        with self._lock:
+            by_name, recent = self._by_name, self._recent
+        # 이름순 목록에 아직 합치지 않은 최근 항목(최대 INDEX_MERGE_THRESHOLD 개)은 따로 비교
+        recent_prefix, recent_contains = [], []
+        for name, patient_id, chosung in recent:
+            position = (chosung if chosung_mode else name).find(term)
+            if position == 0:
+                recent_prefix.append((name, patient_id))
+            elif position > 0:
+                recent_contains.append((name, patient_id))
+
+        if chosung_mode:
+            prefix = self._chosung_prefix_matches(by_name, term, count)
+        else:
+            prefix = self._prefix_matches(by_name, term, count)
+        prefix = sorted(prefix + recent_prefix)[:count]
+        if len(prefix) >= count:
+            return [patient_id for _, patient_id in prefix[offset:count]]
+
+        # 앞부분 일치가 모자라면 중간 일치에서 나머지를 찾음
+        need = count - len(prefix)
+        skip = {patient_id for _, patient_id, _ in recent}
+        contains = self._contains_matches(by_name, term, chosung_mode, need, skip)
+        contains = sorted(contains + recent_contains)[:need]
+        return [patient_id for _, patient_id in (prefix + contains)[offset:]]
+
+
+# 모든 요청이 공유하는 환자명 색인
+patient_index = PatientNameIndex()
@@ -0,0 +1,81 @@
+"""
+기준 정보 적재 (진료과, 진료 시간표, 담당의) - 마이그레이션은 스키마만 관리
+
+사용법:
+    python seed_data.py     # data/departments.csv, data/work_hours.csv 반영 후 기존 기록의 담당의 등록
+
+- 서버 시작 시 departments 테이블이 비어 있으면 자동 적재 (DB_SEED_ON_STARTUP=false 로 끔)
+- load_csv_to_db.py 는 적재 전에 자동 실행
+- 다시 실행해도 안전 (진료과는 dept_code 기준 추가/수정, 시간표는 전체 교체, 담당의는 INSERT IGNORE)
+- CSV 하나만 바꿨으면 python departments.py load / python scheduling.py load 로 따로 반영
+"""
+import os
+import sys
+
+from database import get_db_connection, run_transaction, DatabaseConnectionError
+from departments import load_csv as load_departments_csv, seed_doctors
+from migrations import migrate, LOCK_TIMEOUT
+from scheduling import load_csv as load_work_hours_csv
+
+# 서버 시작 시 기준 정보가 비어 있으면 자동 적재 여부
+SEED_ON_STARTUP = os.getenv('DB_SEED_ON_STARTUP', 'true').lower() in ('1', 'true', 'yes')
+
+# 여러 서버가 동시에 시작해도 한 곳에서만 적재
+LOCK_NAME = "hospital_seed_data"
+
+
+def seed(cursor):
+    """진료과 -> 진료 시간표 -> 담당의 순서로 반영 (한 트랜잭션), (진료과 수, 시간표 행 수) 반환"""
+    departments = load_departments_csv(cursor)
+    work_hours = load_work_hours_csv(cursor)
+    seed_doctors(cursor)
+    return departments, work_hours
+
+
+def seed_if_empty():
+    """
+    departments 테이블이 비어 있을 때만 seed() 실행 (서버 시작 시), 적재했으면 seed() 결과, 아니면 None
+    - 이미 적재된 DB 의 기준 정보(직접 바꾼 시간표 등)는 건드리지 않음
+    - 커밋한 뒤에 잠금을 풀어 다음 서버는 적재된 상태를 봄
+    """
+    connection = get_db_connection()
+    if connection is None:
+        raise DatabaseConnectionError("데이터베이스 연결 실패")
+
+    cursor = None
+    try:
+        cursor = connection.cursor(buffered=True)
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("다른 서버가 기준 정보를 적재 중입니다 (잠금 대기 시간 초과)")
+        try:
+            cursor.execute("SELECT 1 FROM departments LIMIT 1")
+            if cursor.fetchone() is not None:
+                connection.commit()
+                return None
+            try:
+                result = seed(cursor)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            return result
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cursor.fetchall()
+    finally:
+        if cursor is not None:
+            cursor.close()
+        connection.close()
+
+
+def main():
+    migrate()
+    departments, work_hours = run_transaction(seed)
+    print(f"✓ 진료과 {departments}건, 진료 시간표 {work_hours}건 반영, 담당의 등록")
+    print("실행 중인 서버는 POST /api/departments/reload 로 캐시를 갱신하세요")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
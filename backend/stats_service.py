@@ -0,0 +1,148 @@
+import asyncio
+import os
+import time
+from datetime import datetime, date
+
+from database import execute_single_query_async
+from date_range import today_range
+
+# 통계 캐시 유지 시간 (초) - 다른 워커의 등록 내역은 이 시간 안에 반영됨
+STATS_CACHE_TTL = float(os.getenv('STATS_CACHE_TTL', 15))
+
+STATS_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM visits WHERE visit_date >= %s AND visit_date < %s) as today_visits,
+        (SELECT COUNT(*) FROM appointments WHERE appointment_date >= %s AND appointment_date < %s AND status = '예약') as today_appointments,
+        (SELECT COUNT(*) FROM patients) as total_patients,
+        (SELECT COUNT(*) FROM visits WHERE status = '대기') as waiting_patients
+"""
+
+
+def _to_date(value):
+    """datetime/date/문자열(YYYY-MM-DD HH:MM:SS)을 날짜로 변환, 실패 시 None"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.fromisoformat(str(value)).date()
+    except ValueError:
+        return None
+
+
+class TodayStats:
+    """
+    대시보드 오늘 통계 캐시
+    - STATS_CACHE_TTL 동안 DB 를 다시 조회하지 않음 (동시 요청은 한 번만 조회)
+    - 등록 API 에서 카운터를 바로 증가시켜 같은 워커에서는 즉시 반영
+    - 날짜가 바뀌면 다시 조회
+    - 다시 조회하는 동안 들어온 증가분은 모아 두었다가 조회 결과에 더함 (결과로 덮어써 잃지 않도록)
+    """
+
+    def __init__(self):
+        self._values = None
+        self._day = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self._pending = None          # 조회 중 들어온 증가분 (조회 중이 아니면 None)
+        self._invalidated = False     # 조회 중 invalidate() 가 호출되었는지
+
+    def _is_fresh(self, today):
+        return (
+            self._values is not None
+            and self._day == today
+            and time.monotonic() - self._loaded_at < STATS_CACHE_TTL
+        )
+
+    async def get(self):
+        """오늘 통계 반환 (조회 실패 시 None)"""
+        today = date.today()
+        if self._is_fresh(today):
+            return dict(self._values)
+
+        async with self._lock:
+            if self._is_fresh(today):
+                return dict(self._values)
+
+            start, end = today_range()
+            self._pending = []
+            self._invalidated = False
+            try:
+                result = await execute_single_query_async(STATS_SQL, (start, end, start, end))
+            finally:
+                pending, self._pending = self._pending, None
+            if result is None:
+                return None
+
+            values = {key: int(value or 0) for key, value in result.items()}
+            for delta in pending:
+                for key, amount in delta.items():
+                    values[key] += amount
+            self._values = values
+            self._day = today
+            # 조회 중 무효화되었으면 결과는 돌려주되 다음 요청에서 다시 조회
+            self._loaded_at = 0.0 if self._invalidated else time.monotonic()
+            return dict(self._values)
+
+    def invalidate(self):
+        """다음 조회 시 DB 에서 다시 계산"""
+        self._loaded_at = 0.0
+        self._invalidated = True
+
+    def _increment(self, delta):
+        if self._pending is not None:
+            self._pending.append(delta)
+        if self._values is not None and self._day == date.today():
+            for key, amount in delta.items():
+                self._values[key] += amount
+        return delta
+
+    def record_patient_created(self, count=1):
+        """환자 등록 반영, 적용한 증가분 반환"""
+        return self._increment({'total_patients': count})
+
+    def record_visit_created(self, visit_date, status):
+        """진료 추가 반영, 적용한 증가분 반환"""
+        day = _to_date(visit_date)
+        if day is None:
+            self.invalidate()
+            return {}
+        delta = {}
+        if day == date.today():
+            delta['today_visits'] = 1
+        if status == '대기':
+            delta['waiting_patients'] = 1
+        return self._increment(delta)
+
+    def record_visit_status_changed(self, previous_status, status):
+        """진료 상태 변경 반영, 적용한 증가분 반환"""
+        delta = {}
+        if previous_status == '대기':
+            delta['waiting_patients'] = -1
+        if status == '대기':
+            delta['waiting_patients'] = delta.get('waiting_patients', 0) + 1
+        return self._increment({key: amount for key, amount in delta.items() if amount})
+
+    def record_appointment_created(self, appointment_date, status):
+        """예약 추가 반영, 적용한 증가분 반환"""
+        day = _to_date(appointment_date)
+        if day is None:
+            self.invalidate()
+            return {}
+        delta = {}
+        if day == date.today() and status == '예약':
+            delta['today_appointments'] = 1
+        return self._increment(delta)
+
+
+def sum_deltas(deltas):
+    """여러 증가분을 하나로 합침"""
+    total = {}
+    for delta in deltas:
+        for key, amount in delta.items():
+            total[key] = total.get(key, 0) + amount
+    return total
+
+
+# 모든 요청이 공유하는 오늘 통계
+today_stats = TodayStats()
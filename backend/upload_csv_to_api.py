@@ -1,212 +1,192 @@
+import argparse
 import csv
-import requests
-import json
-from datetime import datetime
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from requests.adapters import HTTPAdapter
 
 # API 기본 URL
 BASE_URL = "http://localhost:8000"
 
-# 환자 번호와 ID 매핑 저장
-patient_mapping = {}
+# CSV 데이터 폴더
+DATA_DIR = "data"
+
+# 일괄 등록 요청 1건에 담을 행 수 (서버 최대 1000)
+BATCH_SIZE = 500
+
+# 동시에 보낼 일괄 등록 요청 수
+CONCURRENCY = 4
+
+# 일시적 오류(교착, 잠금 대기 초과, 서버 과부하) 시 일괄 등록 요청 재시도 횟수
+MAX_RETRIES = 3
+
+# 재시도 대기 시간 기준 (초, 시도할 때마다 두 배)
+RETRY_BACKOFF = 0.5
+
+# 재시도할 응답 상태 (500 은 트랜잭션이 롤백된 교착/잠금 대기 오류일 때만)
+RETRY_STATUS = {502, 503, 504}
+RETRY_MESSAGES = ("Deadlock", "Lock wait timeout")
+
+# 실패 행 중 화면에 출력할 최대 건수
+MAX_ERRORS_SHOWN = 20
 
-def read_csv(filename):
-    """CSV 파일 읽기"""
-    data = []
-    with open(f'data/{filename}', 'r', encoding='utf-8') as file:
+# 모든 요청이 재사용하는 HTTP 세션 (연결 유지)
+session = requests.Session()
+
+
+def configure_session(concurrency):
+    """동시 요청 수만큼 연결을 유지하도록 세션 설정"""
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(concurrency, 1))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+
+def read_csv_batches(filename, batch_size):
+    """CSV 파일을 batch_size 행씩 나눠 읽기 (전체를 메모리에 올리지 않음)"""
+    with open(f'{DATA_DIR}/{filename}', 'r', encoding='utf-8') as file:
         csv_reader = csv.DictReader(file)
+        batch = []
         for row in csv_reader:
-            data.append(row)
-    return data
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
 
-def upload_patients():
-    """환자 데이터 업로드"""
-    print("\n=== 환자 데이터 업로드 시작 ===")
-    patients = read_csv('patients.csv')
-    
-    success_count = 0
-    fail_count = 0
-    skip_count = 0
-    
-    for patient in patients:
-        # 먼저 환자가 이미 존재하는지 확인
+
+def is_retryable(response):
+    """롤백된 요청이라 다시 보내도 중복 등록되지 않는 일시적 오류인지"""
+    if response.status_code in RETRY_STATUS:
+        return True
+    return response.status_code == 500 and any(message in response.text for message in RETRY_MESSAGES)
+
+
+def post_batch(endpoint, batch):
+    """일괄 등록 요청 1건 전송 (일시적 오류면 최대 MAX_RETRIES 번 재시도)"""
+    for attempt in range(MAX_RETRIES + 1):
+        response = session.post(f"{BASE_URL}{endpoint}", json=batch, timeout=120)
+        if response.status_code == 200:
+            return response.json()
+        if attempt == MAX_RETRIES or not is_retryable(response):
+            break
+        time.sleep(RETRY_BACKOFF * 2 ** attempt * (1 + random.random()))
+    raise RuntimeError(f"{response.status_code} {response.text[:200]}")
+
+
+def upload_file(title, filename, endpoint, to_payload, label, batch_size, concurrency):
+    """
+    CSV 파일을 일괄 등록 API 로 업로드
+    - batch_size 행씩 묶어 최대 concurrency 개 요청을 동시에 전송
+    - 처리 속도와 결과 요약 출력
+    """
+    print(f"\n=== {title} 업로드 시작 ===")
+
+    totals = {"created": 0, "exists": 0, "failed": 0}
+    errors = []
+    started = time.perf_counter()
+
+    def record(batch, future):
         try:
-            response = requests.get(
-                f"{BASE_URL}/api/patients/search",
-                params={"query": patient['patient_no']}
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                if result:
-                    # 환자가 이미 있으면 ID 저장만 하고 건너뜀
-                    patient_mapping[patient['patient_no']] = result[0]['patient_id']
-                    print(f"○ {patient['name']} ({patient['patient_no']}) - 이미 존재")
-                    skip_count += 1
-                    continue
-        except:
-            pass
-        
-        # 새로운 환자 추가
-        patient_data = {
+            result = future.result()
+        except Exception as e:
+            totals["failed"] += len(batch)
+            errors.append(f"✗ 요청 실패 ({len(batch)}건): {e}")
+            return
+        totals["created"] += result["created"]
+        totals["exists"] += result["exists"]
+        totals["failed"] += result["failed"]
+        for row_result in result["results"]:
+            if row_result["status"] == "error":
+                errors.append(f"✗ {label(batch[row_result['index']])} - {row_result['error']}")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        in_flight = {}
+        for batch in read_csv_batches(filename, batch_size):
+            # 동시에 처리 중인 요청 수를 제한해 메모리 사용량을 일정하게 유지
+            if len(in_flight) >= concurrency:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(in_flight.pop(future), future)
+
+            future = executor.submit(post_batch, endpoint, [to_payload(row) for row in batch])
+            in_flight[future] = batch
+
+        for future in list(in_flight):
+            record(in_flight.pop(future), future)
+
+    elapsed = time.perf_counter() - started
+    processed = totals["created"] + totals["exists"] + totals["failed"]
+    rate = processed / elapsed if elapsed > 0 else 0.0
+
+    for message in errors[:MAX_ERRORS_SHOWN]:
+        print(message)
+    if len(errors) > MAX_ERRORS_SHOWN:
+        print(f"... 외 {len(errors) - MAX_ERRORS_SHOWN}건")
+
+    print(f"\n{title} 업로드 완료: 추가 {totals['created']}건, 기존 {totals['exists']}건, 실패 {totals['failed']}건")
+    print(f"처리 속도: {processed}건 / {elapsed:.2f}초 = {rate:,.0f}건/초")
+    return totals
+
+
+def upload_patients(batch_size=BATCH_SIZE, concurrency=CONCURRENCY):
+    """환자 데이터 업로드"""
+    return upload_file(
+        "환자 데이터", "patients.csv", "/api/patients/bulk",
+        lambda patient: {
             "patient_no": patient['patient_no'],
             "name": patient['name'],
             "birth_date": patient['birth_date'],
             "gender": patient['gender'],
             "phone": patient['phone']
-        }
-        
-        try:
-            # POST 요청으로 환자 추가
-            response = requests.post(
-                f"{BASE_URL}/api/patients/",
-                json=patient_data
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                patient_mapping[patient['patient_no']] = result['patient_id']
-                print(f"✓ {patient['name']} ({patient['patient_no']}) - 추가 성공")
-                success_count += 1
-            else:
-                print(f"✗ {patient['name']} - 오류: {response.text}")
-                fail_count += 1
-                
-        except Exception as e:
-            print(f"✗ {patient['name']} - 오류: {e}")
-            fail_count += 1
-    
-    print(f"\n환자 업로드 완료: 추가 {success_count}명, 기존 {skip_count}명, 실패 {fail_count}명")
-    return patient_mapping
-
-def upload_visits():
-    """진료 기록 업로드"""
-    print("\n=== 진료 기록 업로드 시작 ===")
-    visits = read_csv('visits.csv')
-    
-    success_count = 0
-    fail_count = 0
-    
-    for visit in visits:
-        # patient_no를 patient_id로 변환
-        patient_id = patient_mapping.get(visit['patient_no'])
-        
-        if not patient_id:
-            # 환자를 찾을 수 없으면 검색해서 ID 찾기
-            try:
-                response = requests.get(
-                    f"{BASE_URL}/api/patients/search",
-                    params={"query": visit['patient_no']}
-                )
-                if response.status_code == 200:
-                    result = response.json()
-                    if result:
-                        patient_id = result[0]['patient_id']
-                        patient_mapping[visit['patient_no']] = patient_id
-                    else:
-                        print(f"✗ 환자번호 {visit['patient_no']} 찾을 수 없음")
-                        fail_count += 1
-                        continue
-            except:
-                print(f"✗ 환자번호 {visit['patient_no']} 검색 실패")
-                fail_count += 1
-                continue
-        
-        visit_data = {
-            "patient_id": patient_id,
+        },
+        lambda patient: f"{patient['name']} ({patient['patient_no']})",
+        batch_size, concurrency
+    )
+
+
+def upload_visits(batch_size=BATCH_SIZE, concurrency=CONCURRENCY):
+    """진료 기록 업로드 (환자는 patient_no 로 지정, 서버에서 ID 변환)"""
+    return upload_file(
+        "진료 기록", "visits.csv", "/api/visits/bulk",
+        lambda visit: {
+            "patient_no": visit['patient_no'],
             "visit_date": visit['visit_date'],
             "department": visit['department'],
             "doctor_name": visit['doctor_name'],
             "diagnosis": visit['diagnosis'],
             "status": visit['status']
-        }
-        
-        try:
-            # POST 요청으로 진료 기록 추가
-            response = requests.post(
-                f"{BASE_URL}/api/visits/",
-                json=visit_data
-            )
-            
-            if response.status_code == 200:
-                print(f"✓ {visit['patient_no']} - {visit['diagnosis']}")
-                success_count += 1
-            else:
-                print(f"✗ 진료 기록 오류: {response.text}")
-                fail_count += 1
-            
-        except Exception as e:
-            print(f"✗ 진료 기록 오류: {e}")
-            fail_count += 1
-    
-    print(f"\n진료 기록 업로드 완료: 성공 {success_count}건, 실패 {fail_count}건")
-
-def upload_appointments():
-    """예약 데이터 업로드"""
-    print("\n=== 예약 데이터 업로드 시작 ===")
-    appointments = read_csv('appointments.csv')
-    
-    success_count = 0
-    fail_count = 0
-    
-    for appointment in appointments:
-        # patient_no를 patient_id로 변환
-        patient_id = patient_mapping.get(appointment['patient_no'])
-        
-        if not patient_id:
-            # 환자를 찾을 수 없으면 검색해서 ID 찾기
-            try:
-                response = requests.get(
-                    f"{BASE_URL}/api/patients/search",
-                    params={"query": appointment['patient_no']}
-                )
-                if response.status_code == 200:
-                    result = response.json()
-                    if result:
-                        patient_id = result[0]['patient_id']
-                        patient_mapping[appointment['patient_no']] = patient_id
-                    else:
-                        print(f"✗ 환자번호 {appointment['patient_no']} 찾을 수 없음")
-                        fail_count += 1
-                        continue
-            except:
-                print(f"✗ 환자번호 {appointment['patient_no']} 검색 실패")
-                fail_count += 1
-                continue
-        
-        appointment_data = {
-            "patient_id": patient_id,
+        },
+        lambda visit: f"{visit['patient_no']} {visit['visit_date']}",
+        batch_size, concurrency
+    )
+
+
+def upload_appointments(batch_size=BATCH_SIZE, concurrency=CONCURRENCY):
+    """예약 데이터 업로드 (환자는 patient_no 로 지정, 서버에서 ID 변환)"""
+    return upload_file(
+        "예약 데이터", "appointments.csv", "/api/appointments/bulk",
+        lambda appointment: {
+            # patient_no 열이 없으면 (샘플 appointments.csv) patient_id 로 지정
+            "patient_no": appointment.get('patient_no'),
+            "patient_id": None if appointment.get('patient_no') else appointment.get('patient_id'),
             "appointment_date": appointment['appointment_date'],
             "department": appointment['department'],
             "doctor_name": appointment['doctor_name'],
             "status": appointment['status']
-        }
-        
-        try:
-            # POST 요청으로 예약 추가
-            response = requests.post(
-                f"{BASE_URL}/api/appointments/",
-                json=appointment_data
-            )
-            
-            if response.status_code == 200:
-                print(f"✓ {appointment['patient_no']} - {appointment['status']}")
-                success_count += 1
-            else:
-                print(f"✗ 예약 오류: {response.text}")
-                fail_count += 1
-            
-        except Exception as e:
-            print(f"✗ 예약 오류: {e}")
-            fail_count += 1
-    
-    print(f"\n예약 업로드 완료: 성공 {success_count}건, 실패 {fail_count}건")
+        },
+        lambda appointment: f"{appointment.get('patient_no') or appointment.get('patient_id')} {appointment['appointment_date']}",
+        batch_size, concurrency
+    )
+
 
 def test_api_connection():
     """API 연결 테스트"""
     print("=== API 연결 테스트 ===")
     try:
-        response = requests.get(f"{BASE_URL}/health")
+        response = session.get(f"{BASE_URL}/health")
         if response.status_code == 200:
             print("✓ API 서버 연결 성공")
             return True
@@ -218,13 +198,14 @@ def test_api_connection():
         print("main.py가 실행 중인지 확인하세요!")
         return False
 
+
 def check_upload_results():
     """업로드 결과 확인"""
     print("\n=== 업로드 결과 확인 ===")
-    
+
     try:
         # 통계 확인
-        response = requests.get(f"{BASE_URL}/api/patients/stats/today")
+        response = session.get(f"{BASE_URL}/api/patients/stats/today")
         if response.status_code == 200:
             stats = response.json()
             print(f"\n[데이터베이스 통계]")
@@ -232,22 +213,22 @@ def check_upload_results():
             print(f"오늘 진료: {stats.get('today_visits', 0)}건")
             print(f"오늘 예약: {stats.get('today_appointments', 0)}건")
             print(f"대기 중인 환자: {stats.get('waiting_patients', 0)}명")
-        
+
         # 샘플 환자 검색
         print(f"\n[환자 검색 테스트]")
         test_names = ['김', '이', '박']
         for name in test_names:
-            response = requests.get(
+            response = session.get(
                 f"{BASE_URL}/api/patients/search",
                 params={"query": name}
             )
             if response.status_code == 200:
                 results = response.json()
                 print(f"'{name}'으로 검색: {len(results)}명 발견")
-        
+
         # 특정 환자 상세 조회
         print(f"\n[환자 상세 조회 테스트]")
-        response = requests.get(
+        response = session.get(
             f"{BASE_URL}/api/patients/search",
             params={"query": "P2024104"}
         )
@@ -259,50 +240,63 @@ def check_upload_results():
                 print(f"이름: {patient['name']}")
                 print(f"성별: {patient['gender']}")
                 print(f"진료 횟수: {patient.get('visit_count', 0)}회")
-                
+
     except Exception as e:
         print(f"결과 확인 오류: {e}")
 
+
 def main():
     """메인 실행 함수"""
+    global BASE_URL, DATA_DIR
+
+    parser = argparse.ArgumentParser(description="병원 CSV 데이터 업로드")
+    parser.add_argument("--base-url", default=BASE_URL, help="API 서버 주소")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="CSV 파일 폴더")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="요청당 행 수 (최대 1000)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="동시 요청 수")
+    parser.add_argument("-y", "--yes", action="store_true", help="확인 없이 바로 업로드")
+    args = parser.parse_args()
+
+    BASE_URL = args.base_url.rstrip("/")
+    DATA_DIR = args.data_dir
+    batch_size = max(1, min(args.batch_size, 1000))
+    concurrency = max(1, args.concurrency)
+    configure_session(concurrency)
+
     print("=" * 50)
     print("병원 CSV 데이터 업로드 스크립트")
     print("=" * 50)
-    
+
     # 1. API 연결 확인
     if not test_api_connection():
         print("\n먼저 main.py를 실행해주세요!")
         print("터미널에서: python main.py")
         return
-    
-    print("\n데이터 업로드를 시작하시겠습니까? (y/n): ", end="")
-    if input().lower() != 'y':
-        print("업로드 취소됨")
-        return
-    
-    # 2. 환자 데이터 업로드
-    patient_mapping = upload_patients()
-    
-    # 3. 진료 기록 업로드
-    if patient_mapping:
-        time.sleep(1)  # 서버 부하 방지
-        upload_visits()
-    
-    # 4. 예약 데이터 업로드
-    if patient_mapping:
-        time.sleep(1)  # 서버 부하 방지
-        upload_appointments()
-    
+
+    if not args.yes:
+        print("\n데이터 업로드를 시작하시겠습니까? (y/n): ", end="")
+        if input().lower() != 'y':
+            print("업로드 취소됨")
+            return
+
+    # 2. 환자 데이터 업로드 (진료/예약이 환자번호를 참조하므로 먼저 완료)
+    patient_totals = upload_patients(batch_size, concurrency)
+
+    # 3. 진료 기록, 4. 예약 데이터 업로드
+    if patient_totals["created"] + patient_totals["exists"] > 0:
+        upload_visits(batch_size, concurrency)
+        upload_appointments(batch_size, concurrency)
+
     # 5. 결과 확인
-    time.sleep(2)
     check_upload_results()
-    
+
     print("\n" + "=" * 50)
     print("업로드 완료!")
     print("브라우저에서 확인:")
-    print("- API 문서: http://localhost:8000/docs")
-    print("- 환자 검색 테스트: http://localhost:8000/api/patients/search?query=김")
+    print(f"- API 문서: {BASE_URL}/docs")
+    print(f"- 환자 검색 테스트: {BASE_URL}/api/patients/search?query=김")
     print("=" * 50)
 
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
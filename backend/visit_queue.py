@@ -0,0 +1,283 @@
+"""
+진료과별 대기열 (진료 상태 '대기' -> '진료중' -> '완료')
+
+- 서버 시작 시 DB 에서 대기/진료중 진료를 읽어 진료과별 접수 순서 대기열을 만들고,
+  이후 QUEUE_REFRESH_INTERVAL 마다 백그라운드에서 다시 만듦 (다른 워커의 변경 반영)
+- 상태 변경/진료 등록은 apply() 로 바로 반영하므로 조회 시 visits 테이블을 읽지 않음
+- 다음 환자는 대기열 맨 앞 (O(1)), 순번은 번호표 차이로 계산
+  (중간에서 빠진 번호표가 있을 때만 그 수만큼 이진 탐색)
+"""
+import asyncio
+import bisect
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from database import execute_query, run_in_db_thread
+
+# 대기열 재구성 주기 (초), 0 이면 시작 시 한 번만
+QUEUE_REFRESH_INTERVAL = float(os.getenv('QUEUE_REFRESH_INTERVAL', 10))
+
+WAITING = '대기'
+IN_PROGRESS = '진료중'
+DONE = '완료'
+CANCELLED = '취소'
+
+# 현재 상태 -> 변경할 수 있는 상태 (각 상태로 바꿀 수 있는 이전 상태는 하나)
+TRANSITIONS = {
+    WAITING: (IN_PROGRESS, CANCELLED),
+    IN_PROGRESS: (DONE, WAITING),
+}
+QUEUE_STATUSES = (WAITING, IN_PROGRESS)
+
+QUEUE_FIELDS = ("visit_id", "patient_id", "patient_name", "patient_no", "visit_date",
+                "department", "doctor_name", "status", "version")
+
+REBUILD_SQL = """
+    SELECT v.visit_id, v.patient_id, p.name as patient_name, p.patient_no, v.visit_date,
+           v.department, v.doctor_name, v.status, v.version
+    FROM visits v
+    JOIN patients p ON v.patient_id = p.patient_id
+    WHERE v.status IN (%s, %s) AND v.department IS NOT NULL
+    ORDER BY v.visit_date ASC, v.visit_id ASC
+"""
+
+
+class StaleVisitError(Exception):
+    """요청한 version 이 현재 version 과 다름 (다른 요청이 먼저 변경)"""
+
+    def __init__(self, visit):
+        super().__init__(f"다른 요청이 먼저 변경했습니다 (현재 상태: {visit['status']}, version: {visit['version']})")
+        self.visit = visit
+
+
+def previous_status(status):
+    """status 로 바꿀 수 있는 이전 상태 (없으면 None)"""
+    for current, targets in TRANSITIONS.items():
+        if status in targets:
+            return current
+    return None
+
+
+def _queue_key(visit):
+    """
+    대기 순서 기준 (REBUILD_SQL 의 ORDER BY 와 같음)
+    - 등록 API 가 받은 문자열 시각도 DB 값과 비교하도록 datetime 으로 변환 (시간대 정보 제거)
+    """
+    visit_date = visit['visit_date']
+    if isinstance(visit_date, str):
+        try:
+            visit_date = datetime.fromisoformat(visit_date.strip())
+        except ValueError:
+            visit_date = datetime.max
+    if visit_date is None:
+        visit_date = datetime.max
+    elif visit_date.tzinfo is not None:
+        visit_date = visit_date.replace(tzinfo=None)
+    return visit_date, visit['visit_id']
+
+
+class _DepartmentQueue:
+    """
+    한 진료과의 대기열
+    - waiting: visit_id -> (번호표, 진료 정보), 접수 순서 (visit_date, visit_id)
+    - holes: 맨 앞이 아닌 위치에서 빠진 번호표 (정렬, 순번 계산 시 제외)
+    """
+
+    def __init__(self):
+        self.waiting = OrderedDict()
+        self.in_progress = OrderedDict()
+        self.holes = []
+        self._next_ticket = 1
+
+    def push(self, visit):
+        """
+        접수 순서((visit_date, visit_id), 재구성과 같은 기준) 위치에 추가
+        - 보통은 맨 뒤 (O(1)), 맨 뒤보다 앞서는 진료(지난 시각 등록, 진료중 -> 대기)는
+          정렬 위치에 넣고 번호표를 다시 발급 (O(n))
+        """
+        if self.waiting and _queue_key(visit) < _queue_key(next(reversed(self.waiting.values()))[1]):
+            visits = [item[1] for item in self.waiting.values()]
+            visits.insert(bisect.bisect([_queue_key(item) for item in visits], _queue_key(visit)), visit)
+            self.waiting.clear()
+            self.holes.clear()
+            for item in visits:
+                self._append(item)
+            return
+        self._append(visit)
+
+    def _append(self, visit):
+        self.waiting[visit['visit_id']] = (self._next_ticket, visit)
+        self._next_ticket += 1
+
+    def remove(self, visit_id):
+        if visit_id in self.in_progress:
+            del self.in_progress[visit_id]
+            return
+        item = self.waiting.pop(visit_id, None)
+        if item is None:
+            return
+        if not self.waiting:
+            self.holes.clear()
+            return
+        head = self._head_ticket()
+        if item[0] < head:
+            # 맨 앞이 빠짐 - 새 맨 앞보다 앞선 빈 번호표는 더 이상 필요 없음
+            del self.holes[:bisect.bisect_left(self.holes, head)]
+        else:
+            bisect.insort(self.holes, item[0])
+
+    def _head_ticket(self):
+        return next(iter(self.waiting.values()))[0]
+
+    def head(self):
+        if not self.waiting:
+            return None
+        return next(iter(self.waiting.values()))[1]
+
+    def position(self, visit_id):
+        """1 부터 시작하는 대기 순번"""
+        ticket = self.waiting[visit_id][0]
+        return ticket - self._head_ticket() + 1 - bisect.bisect_left(self.holes, ticket)
+
+
+class VisitQueue:
+    """
+    진료과별 대기열 (모든 워커가 각자 유지)
+    - 진료 정보는 version 으로 비교해 더 새로운 것만 반영
+    - 재구성 중 반영된 변경은 재구성 결과에 다시 적용 (DB 조회 이후의 변경을 잃지 않음)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._departments = {}
+        self._visits = {}           # visit_id -> 진료 정보 (대기/진료중만)
+        self._pending = None        # 재구성 중 apply() 된 진료 정보
+        self._rebuilt_at = None
+
+    @property
+    def loaded(self):
+        return self._rebuilt_at is not None
+
+    def rebuild(self):
+        """DB 의 대기/진료중 진료로 대기열 재구성 (다른 스레드가 재구성 중이면 건너뜀), 실패 시 기존 유지"""
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                self._pending = {}
+            rows = execute_query(REBUILD_SQL, QUEUE_STATUSES)
+            with self._lock:
+                pending, self._pending = self._pending, None
+                if rows is None:
+                    return
+                self._departments = {}
+                self._visits = {}
+                for row in rows:
+                    self._apply({field: row.get(field) for field in QUEUE_FIELDS})
+                for visit in pending.values():
+                    self._apply(visit)
+                self._rebuilt_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def apply(self, visit):
+        """진료 등록/상태 변경 반영 (대기/진료중이 아니면 대기열에서 제거)"""
+        visit = {field: visit.get(field) for field in QUEUE_FIELDS}
+        visit['version'] = visit['version'] or 0   # 새로 등록한 진료는 0
+        with self._lock:
+            if self._pending is not None:
+                known = self._pending.get(visit['visit_id'])
+                if known is None or (known['version'] or 0) <= (visit['version'] or 0):
+                    self._pending[visit['visit_id']] = visit
+            self._apply(visit)
+
+    def _apply(self, visit):
+        current = self._visits.get(visit['visit_id'])
+        if current is not None:
+            # 같은 version 은 같은 상태 (재구성 후 다시 적용해도 순서가 바뀌지 않도록 무시)
+            if (current['version'] or 0) >= (visit['version'] or 0):
+                return
+            self._departments[current['department']].remove(current['visit_id'])
+            del self._visits[current['visit_id']]
+        if visit['status'] not in QUEUE_STATUSES or not visit['department']:
+            return
+        queue = self._departments.get(visit['department'])
+        if queue is None:
+            queue = self._departments[visit['department']] = _DepartmentQueue()
+        if visit['status'] == WAITING:
+            queue.push(visit)
+        else:
+            queue.in_progress[visit['visit_id']] = visit
+        self._visits[visit['visit_id']] = visit
+
+    def remove(self, visit_id):
+        """DB 에 없는 진료 제거"""
+        with self._lock:
+            visit = self._visits.pop(visit_id, None)
+            if visit is not None:
+                self._departments[visit['department']].remove(visit_id)
+
+    def next_waiting(self, department):
+        """진료과 대기열 맨 앞 진료 (없으면 None)"""
+        with self._lock:
+            queue = self._departments.get(department)
+            visit = queue.head() if queue else None
+            return dict(visit) if visit else None
+
+    def position(self, visit_id):
+        """(진료 정보, 대기 순번) - 진료중이면 순번 0, 대기열에 없으면 None"""
+        with self._lock:
+            visit = self._visits.get(visit_id)
+            if visit is None:
+                return None
+            if visit['status'] != WAITING:
+                return dict(visit), 0
+            return dict(visit), self._departments[visit['department']].position(visit_id)
+
+    def counts(self):
+        """진료과별 {waiting, in_progress} (진료과명 순)"""
+        with self._lock:
+            return {
+                department: {"waiting": len(queue.waiting), "in_progress": len(queue.in_progress)}
+                for department, queue in sorted(self._departments.items())
+                if queue.waiting or queue.in_progress
+            }
+
+    def department(self, department):
+        """진료과 대기열 ({waiting: [순번 포함 진료 정보], in_progress: [...]})"""
+        with self._lock:
+            queue = self._departments.get(department)
+            if queue is None:
+                return {"waiting": [], "in_progress": []}
+            return {
+                "waiting": [
+                    {**visit, "position": position}
+                    for position, (_, visit) in enumerate(queue.waiting.values(), start=1)
+                ],
+                "in_progress": [dict(visit) for visit in queue.in_progress.values()],
+            }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "age_seconds": round(time.monotonic() - self._rebuilt_at, 1) if self._rebuilt_at else None,
+                "visits": len(self._visits),
+            }
+
+
+# 모든 요청이 공유하는 대기열
+visit_queue = VisitQueue()
+
+
+async def keep_queue_fresh(interval=QUEUE_REFRESH_INTERVAL):
+    """서버 시작 시 대기열을 만들고 interval 마다 다시 만듦 (백그라운드 작업)"""
+    while True:
+        await run_in_db_thread(visit_queue.rebuild)
+        if interval <= 0:
+            return
+        await asyncio.sleep(interval)
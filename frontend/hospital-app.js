@@ -4,6 +4,25 @@ const API_BASE_URL = 'http://192.168.0.114:8000';
 // 전역 상태
 let currentPatient = null;
 let searchResults = [];
+let dashboardStats = {};
+let todayVisits = [];
+let statsPollTimer = null;
+
+// 등록 직후 조회는 주 DB에서 읽도록 서버가 알려준 기한 (X-DB-Primary-Until)
+let dbPrimaryUntil = null;
+
+// 등록 응답의 주 DB 읽기 기한 저장
+function rememberPrimaryUntil(response) {
+    const value = response.headers.get('X-DB-Primary-Until');
+    if (value) {
+        dbPrimaryUntil = value;
+    }
+}
+
+// 조회 요청 헤더 (기한이 지났는지는 서버가 판단)
+function readHeaders() {
+    return dbPrimaryUntil ? { 'X-DB-Primary-Until': dbPrimaryUntil } : {};
+}
 
 // DOM 로드 완료 시 초기화
 document.addEventListener('DOMContentLoaded', () => {
@@ -18,11 +37,13 @@ function initializeApp() {
     
     // 통계 로드
     loadDashboardStats();
-    setInterval(loadDashboardStats, 30000);
     
     // 최근 활동 로드
     loadRecentVisits();
     
+    // 실시간 업데이트 (지원하지 않으면 30초마다 폴링)
+    startLiveUpdates();
+    
     // 네비게이션 이벤트 설정
     setupNavigation();
     
@@ -31,6 +52,29 @@ function initializeApp() {
     
     // 탭 이벤트 설정
     setupTabs();
+    
+    // 진료/예약 폼 진료과 목록
+    loadDepartments();
+}
+
+// 진료과 목록을 서버 기준 정보로 채움 (실패 시 HTML 기본 목록 유지)
+async function loadDepartments() {
+    try {
+        const response = await fetch(`${API_BASE_URL}/api/visits/departments`);
+        if (!response.ok) return;
+        
+        const departments = await response.json();
+        if (!departments.length) return;
+        
+        ['department', 'appointmentDept'].forEach(selectId => {
+            const select = document.getElementById(selectId);
+            if (!select) return;
+            select.innerHTML = '<option value="">선택하세요</option>' +
+                departments.map(name => `<option value="${name}">${name}</option>`).join('');
+        });
+    } catch (error) {
+        console.error('진료과 목록 로드 오류:', error);
+    }
 }
 
 // 날짜/시간 업데이트
@@ -51,21 +95,88 @@ function updateDateTime() {
 // 대시보드 통계 로드
 async function loadDashboardStats() {
     try {
-        const response = await fetch(`${API_BASE_URL}/api/patients/stats/today`);
+        const response = await fetch(`${API_BASE_URL}/api/patients/stats/today`, { headers: readHeaders() });
         if (!response.ok) throw new Error('통계 로드 실패');
         
         const stats = await response.json();
-        
-        // 애니메이션과 함께 숫자 업데이트
-        animateNumber('totalPatients', stats.total_patients || 0);
-        animateNumber('todayVisits', stats.today_visits || 0);
-        animateNumber('todayAppointments', stats.today_appointments || 0);
-        animateNumber('waitingPatients', stats.waiting_patients || 0);
+        renderDashboardStats(stats);
     } catch (error) {
         console.error('통계 로드 오류:', error);
     }
 }
 
+// 대시보드 통계 표시
+function renderDashboardStats(stats) {
+    dashboardStats = { ...stats };
+    
+    // 애니메이션과 함께 숫자 업데이트
+    animateNumber('totalPatients', dashboardStats.total_patients || 0);
+    animateNumber('todayVisits', dashboardStats.today_visits || 0);
+    animateNumber('todayAppointments', dashboardStats.today_appointments || 0);
+    animateNumber('waitingPatients', dashboardStats.waiting_patients || 0);
+}
+
+// 실시간 업데이트 시작 (Server-Sent Events)
+function startLiveUpdates() {
+    if (!window.EventSource) {
+        startStatsPolling();
+        return;
+    }
+    
+    // 연결이 끊기면 브라우저가 Last-Event-ID 와 함께 자동 재연결
+    const source = new EventSource(`${API_BASE_URL}/api/live`);
+    
+    source.addEventListener('open', () => stopStatsPolling());
+    
+    // 현재 통계 전체
+    source.addEventListener('snapshot', (event) => {
+        renderDashboardStats(JSON.parse(event.data));
+    });
+    
+    // 통계 증가분
+    source.addEventListener('stats', (event) => {
+        const { delta } = JSON.parse(event.data);
+        const stats = { ...dashboardStats };
+        Object.entries(delta || {}).forEach(([key, amount]) => {
+            stats[key] = (stats[key] || 0) + amount;
+        });
+        renderDashboardStats(stats);
+    });
+    
+    // 새 진료
+    source.addEventListener('visit', (event) => {
+        const visit = JSON.parse(event.data);
+        if (new Date(visit.visit_date).toDateString() !== new Date().toDateString()) return;
+        
+        todayVisits.push(visit);
+        todayVisits.sort((a, b) => new Date(a.visit_date) - new Date(b.visit_date));
+        renderRecentVisits();
+    });
+    
+    // 놓친 이벤트를 이어받을 수 없는 경우 전체 다시 로드
+    source.addEventListener('reset', () => {
+        loadRecentVisits();
+    });
+    
+    source.addEventListener('error', () => {
+        // 서버가 실시간 피드를 지원하지 않으면 폴링으로 전환
+        if (source.readyState === EventSource.CLOSED) {
+            startStatsPolling();
+        }
+    });
+}
+
+function startStatsPolling() {
+    if (statsPollTimer) return;
+    statsPollTimer = setInterval(loadDashboardStats, 30000);
+}
+
+function stopStatsPolling() {
+    if (!statsPollTimer) return;
+    clearInterval(statsPollTimer);
+    statsPollTimer = null;
+}
+
 // 숫자 애니메이션
 function animateNumber(elementId, targetNumber) {
     const element = document.getElementById(elementId);
@@ -87,33 +198,38 @@ function animateNumber(elementId, targetNumber) {
 // 최근 진료 활동 로드
 async function loadRecentVisits() {
     try {
-        const response = await fetch(`${API_BASE_URL}/api/visits/today`);
+        const response = await fetch(`${API_BASE_URL}/api/visits/today`, { headers: readHeaders() });
         if (!response.ok) throw new Error('진료 기록 로드 실패');
         
-        const visits = await response.json();
-        const activityList = document.getElementById('recentActivity');
-        
-        if (visits.length === 0) {
-            activityList.innerHTML = '<div class="empty-state"><h3>오늘 진료 기록이 없습니다</h3></div>';
-            return;
-        }
-        
-        activityList.innerHTML = visits.slice(0, 5).map(visit => `
-            <div class="activity-item">
-                <div class="activity-time">${formatTime(visit.visit_date)}</div>
-                <div class="activity-content">
-                    <p class="activity-patient">${visit.patient_name} (${visit.patient_no})</p>
-                    <p class="activity-details">${visit.department} | ${visit.doctor_name} | ${visit.diagnosis}</p>
-                </div>
-                <span class="activity-status ${getStatusClass(visit.status)}">${visit.status}</span>
-            </div>
-        `).join('');
+        todayVisits = await response.json();
+        renderRecentVisits();
     } catch (error) {
         console.error('최근 활동 로드 오류:', error);
         document.getElementById('recentActivity').innerHTML = '<div class="empty-state"><h3>데이터를 불러올 수 없습니다</h3></div>';
     }
 }
 
+// 최근 진료 활동 표시
+function renderRecentVisits() {
+    const activityList = document.getElementById('recentActivity');
+    
+    if (todayVisits.length === 0) {
+        activityList.innerHTML = '<div class="empty-state"><h3>오늘 진료 기록이 없습니다</h3></div>';
+        return;
+    }
+    
+    activityList.innerHTML = todayVisits.slice(0, 5).map(visit => `
+        <div class="activity-item">
+            <div class="activity-time">${formatTime(visit.visit_date)}</div>
+            <div class="activity-content">
+                <p class="activity-patient">${visit.patient_name} (${visit.patient_no})</p>
+                <p class="activity-details">${visit.department} | ${visit.doctor_name} | ${visit.diagnosis}</p>
+            </div>
+            <span class="activity-status ${getStatusClass(visit.status)}">${visit.status}</span>
+        </div>
+    `).join('');
+}
+
 // 네비게이션 설정
 function setupNavigation() {
     const navItems = document.querySelectorAll('.nav-item');
@@ -185,7 +301,7 @@ async function searchPatients() {
     resultsDiv.innerHTML = '<div class="loading">검색 중...</div>';
     
     try {
-        const response = await fetch(`${API_BASE_URL}/api/patients/search?query=${encodeURIComponent(query)}`);
+        const response = await fetch(`${API_BASE_URL}/api/patients/search?query=${encodeURIComponent(query)}`, { headers: readHeaders() });
         if (!response.ok) throw new Error('검색 실패');
         
         const patients = await response.json();
@@ -247,7 +363,7 @@ async function searchPatients() {
 // 빠른 검색 실행
 async function performSearch(query) {
     try {
-        const response = await fetch(`${API_BASE_URL}/api/patients/search?query=${encodeURIComponent(query)}`);
+        const response = await fetch(`${API_BASE_URL}/api/patients/search?query=${encodeURIComponent(query)}`, { headers: readHeaders() });
         if (!response.ok) throw new Error('검색 실패');
         
         const patients = await response.json();
@@ -275,7 +391,7 @@ async function performSearch(query) {
 // 환자 상세 정보 표시
 async function showPatientDetail(patientId) {
     try {
-        const response = await fetch(`${API_BASE_URL}/api/patients/${patientId}`);
+        const response = await fetch(`${API_BASE_URL}/api/patients/${patientId}`, { headers: readHeaders() });
         if (!response.ok) throw new Error('환자 정보 로드 실패');
         
         const data = await response.json();
@@ -451,6 +567,7 @@ async function saveNewPatient() {
             },
             body: JSON.stringify(patientData)
         });
+        rememberPrimaryUntil(response);
         
         if (!response.ok) {
             if (response.status === 400) {
@@ -544,6 +661,7 @@ async function saveNewVisit() {
             },
             body: JSON.stringify(visitData)
         });
+        rememberPrimaryUntil(response);
         
         if (!response.ok) throw new Error('진료 등록 실패');
         
@@ -619,6 +737,7 @@ async function saveNewAppointment() {
             },
             body: JSON.stringify(appointmentData)
         });
+        rememberPrimaryUntil(response);
         
         if (!response.ok) throw new Error('예약 등록 실패');
         